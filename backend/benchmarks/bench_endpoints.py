@@ -0,0 +1,441 @@
+"""
+End-to-end endpoint benchmark
+Sends traffic mixes through a functions-framework test client to the real
+handlers (served by the "api" gateway function) backed by local repositories
+seeded from backend/data, and reports throughput and p50/p95/p99 latency
+per operation.
+
+Traffic mixes:
+    browse        read-heavy browsing: entity lists and pages, review lists,
+                  the occasional vote or review
+    voting_burst  votes concentrated on a few popular reviews
+    review_spike  many new reviews for a few hot entities, read back at once
+
+Each mix starts from freshly seeded data. Handlers run in this process, so
+with several client threads and no simulated Firestore latency the tail
+latencies mostly measure GIL contention; compare runs at the same settings. Results can be saved as JSON and
+compared against an earlier run with --baseline; --max-regression makes the
+comparison exit with status 1 so it can gate CI.
+
+With --cdn, requests go through a FakeCDN that honours the Cache-Control,
+Surrogate-Key and purge headers, and the CDN hit ratio is reported per
+operation. Time in the CDN is simulated: the clock moves
+--request-interval-ms per request, so cache lifetimes expire as they would
+at that request rate.
+
+Usage (from backend/):
+    python benchmarks/bench_endpoints.py --requests 3000 --output endpoints.json
+    python benchmarks/bench_endpoints.py --backend firestore --firestore-latency-ms 5 --concurrency 8
+    python benchmarks/bench_endpoints.py --baseline endpoints.json --max-regression 0.2
+    python benchmarks/bench_endpoints.py --cdn --request-interval-ms 100
+"""
+import argparse
+import bisect
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FUNCTIONS_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), 'functions')
+sys.path.insert(0, FUNCTIONS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fake_cdn import FakeCDN
+from fake_firestore import FakeFirestore
+from seed_data import seed_fake_firestore
+
+
+# Operation -> (HTTP method, gateway path)
+OPERATIONS = {
+    'get_entities:list': ('GET', '/get-entities'),
+    'get_entities:id': ('GET', '/get-entities'),
+    'get_reviews': ('GET', '/get-reviews'),
+    'create_review': ('POST', '/create-review'),
+    'vote_review': ('POST', '/vote-review')
+}
+
+# Mix -> (operation weights, Zipf exponent of entity and review popularity)
+TRAFFIC_MIXES = {
+    'browse': ({
+        'get_entities:list': 0.20,
+        'get_entities:id': 0.30,
+        'get_reviews': 0.44,
+        'vote_review': 0.05,
+        'create_review': 0.01
+    }, 1.0),
+    'voting_burst': ({
+        'vote_review': 0.70,
+        'get_reviews': 0.25,
+        'get_entities:id': 0.05
+    }, 1.5),
+    'review_spike': ({
+        'create_review': 0.45,
+        'get_reviews': 0.40,
+        'get_entities:id': 0.15
+    }, 1.2)
+}
+
+REVIEW_TEXTS = (
+    "Clear explanations and fair grading.",
+    "Gets crowded at lunch but the food is worth it.",
+    "Clean and well maintained most of the time.",
+    "Aircon is too cold, otherwise fine.",
+    "Would recommend to juniors."
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--mixes', nargs='+', choices=list(TRAFFIC_MIXES), default=list(TRAFFIC_MIXES),
+                        help='Traffic mixes to run, one run each')
+    parser.add_argument('--requests', type=int, default=2000, help='Timed requests per mix')
+    parser.add_argument('--warmup', type=int, default=100, help='Untimed requests before each mix')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Client threads sending requests (above 1, mostly useful with --firestore-latency-ms)')
+    parser.add_argument('--backend', choices=['memory', 'firestore'], default='memory',
+                        help='In-memory repositories, or the Firestore repositories on a FakeFirestore')
+    parser.add_argument('--firestore-latency-ms', type=float, default=0.0,
+                        help='Latency per FakeFirestore round trip (--backend firestore)')
+    parser.add_argument('--copies', type=int, default=1,
+                        help='Copies of the seeded catalog (scales the entity count)')
+    parser.add_argument('--reviews-per-entity', type=int, default=10,
+                        help='Synthetic reviews added to every entity')
+    parser.add_argument('--cdn', action='store_true', help='Send requests through a FakeCDN')
+    parser.add_argument('--request-interval-ms', type=float, default=50.0,
+                        help='Simulated time between requests, for the FakeCDN clock')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for data and traffic')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Earlier --output file to compare against')
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help='Fail if p95 latency grows or throughput drops by more than this fraction')
+    parser.add_argument('--verbose', action='store_true', help='Keep INFO and WARNING logs')
+    return parser.parse_args()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def git_commit():
+    """Short hash of the checked out commit, or None outside a git checkout"""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BENCHMARKS_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+class SimulatedClock:
+    """FakeCDN clock that moves a fixed step per request"""
+    
+    def __init__(self, step_sec):
+        self.step_sec = step_sec
+        self.now = 0.0
+        self._lock = threading.Lock()
+    
+    def __call__(self):
+        return self.now
+    
+    def tick(self):
+        with self._lock:
+            self.now += self.step_sec
+
+
+class ZipfPicker:
+    """Picks items with probability proportional to 1 / rank^exponent"""
+    
+    def __init__(self, items, exponent, rng):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, len(self.items) + 1)))
+    
+    def pick(self, rng):
+        position = bisect.bisect_left(self.cum_weights, rng.random() * self.cum_weights[-1])
+        return self.items[min(position, len(self.items) - 1)]
+
+
+def install_repositories(args):
+    """
+    Seed fresh repositories and make the handlers use them
+    
+    Returns:
+        tuple: (entity repository, review repository, FakeFirestore or None)
+    """
+    from firebase_admin import firestore
+    from repositories import set_repositories
+    from repositories.seed import create_memory_repositories
+    
+    if args.backend == 'memory':
+        entities, reviews = create_memory_repositories(args.copies, args.reviews_per_entity, args.seed)
+        db = None
+    else:
+        from repositories.firestore_repositories import FirestoreEntityRepository, FirestoreReviewRepository
+        db = FakeFirestore(rpc_latency_ms=args.firestore_latency_ms)
+        seed_fake_firestore(db, args.copies, args.reviews_per_entity, args.seed)
+        entities, reviews = FirestoreEntityRepository(db), FirestoreReviewRepository(db)
+        
+        # Deletion jobs and the summary cache still use the client directly
+        firestore.client = lambda *client_args, **client_kwargs: db
+    
+    set_repositories(entities, reviews)
+    return entities, reviews, db
+
+
+def build_plan(mix_name, count, entity_picker, review_picker, entity_types, rng):
+    """
+    Build a sequence of requests for one client thread
+    
+    Args:
+        entity_picker: ZipfPicker over entity documents, shared by all
+                       threads so they agree on which entities are popular
+        review_picker: ZipfPicker over review IDs
+    
+    Returns:
+        list: (operation, request kwargs for the test client) tuples
+    """
+    weights = TRAFFIC_MIXES[mix_name][0]
+    operations = list(weights)
+    
+    plan = []
+    for operation in rng.choices(operations, weights=[weights[op] for op in operations], k=count):
+        if operation == 'get_entities:list':
+            request = {'query_string': {'type': rng.choice(entity_types)}}
+        elif operation == 'get_entities:id':
+            request = {'query_string': {'id': entity_picker.pick(rng).id}}
+        elif operation == 'get_reviews':
+            request = {'query_string': {'entityId': entity_picker.pick(rng).id}}
+        elif operation == 'vote_review':
+            request = {'query_string': {'id': review_picker.pick(rng)}}
+        else:
+            request = {'json': {
+                'authorName': f"bench-{rng.randrange(10000)}",
+                'description': rng.choice(REVIEW_TEXTS),
+                'entityId': entity_picker.pick(rng).id,
+                'rating': rng.randint(1, 5),
+                'tags': [],
+                'moduleCode': 'CS1010S'
+            }}
+        plan.append((operation, request))
+    return plan
+
+
+def send_requests(app, plan, samples=None, cdn=None):
+    """
+    Send a plan's requests in order
+    
+    Args:
+        samples: Optional list to append (operation, status, latency ms,
+                 CDN outcome or None) to
+        cdn: Optional FakeCDN to send the requests through
+    """
+    client = cdn if cdn is not None else app.test_client()
+    for operation, request in plan:
+        method, path = OPERATIONS[operation]
+        if cdn is not None:
+            cdn.clock.tick()
+        start = time.perf_counter()
+        response = client.open(path, method=method, **request)
+        latency_ms = (time.perf_counter() - start) * 1000
+        if samples is not None:
+            samples.append((operation, response.status_code, latency_ms, getattr(response, 'outcome', None)))
+
+
+def summarize_samples(samples, elapsed):
+    """Throughput, error count, latency percentiles and CDN outcomes per operation and overall"""
+    by_operation = {}
+    for operation, status, latency_ms, outcome in samples:
+        by_operation.setdefault(operation, []).append((status, latency_ms, outcome))
+    
+    def stats(entries):
+        latencies = [latency_ms for _, latency_ms, _ in entries]
+        statuses = {}
+        outcomes = {}
+        for status, _, outcome in entries:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if outcome is not None:
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        
+        result = {
+            'requests': len(entries),
+            'errors': sum(1 for status, _, _ in entries if status >= 400),
+            'statuses': statuses,
+            'throughput_rps': round(len(entries) / elapsed, 1) if elapsed else None,
+            'latency_mean_ms': round(sum(latencies) / len(latencies), 2),
+            'latency_p50_ms': round(percentile(latencies, 0.50), 2),
+            'latency_p95_ms': round(percentile(latencies, 0.95), 2),
+            'latency_p99_ms': round(percentile(latencies, 0.99), 2),
+            'latency_max_ms': round(max(latencies), 2)
+        }
+        if outcomes:
+            reads = sum(count for outcome, count in outcomes.items() if outcome != 'write')
+            result['cdn_outcomes'] = outcomes
+            result['cdn_hit_ratio'] = round((outcomes.get('hit', 0) + outcomes.get('stale', 0)) / reads, 3) if reads else None
+        return result
+    
+    return {
+        'total': stats([(status, latency_ms, outcome) for _, status, latency_ms, outcome in samples]),
+        'operations': {operation: stats(entries) for operation, entries in sorted(by_operation.items())}
+    }
+
+
+def run_mix(args, app, mix_name):
+    """Run one traffic mix on freshly seeded data"""
+    entities, reviews, db = install_repositories(args)
+    entity_docs = entities.query().select(['type']).get()
+    review_ids = [doc.id for doc in reviews.query().select([]).get()]
+    
+    rng = random.Random(f"{args.seed}-{mix_name}")
+    exponent = TRAFFIC_MIXES[mix_name][1]
+    pickers = (ZipfPicker(entity_docs, exponent, rng), ZipfPicker(review_ids, exponent, rng))
+    entity_types = sorted({doc.get('type') for doc in entity_docs})
+    
+    per_thread = max(1, args.requests // args.concurrency)
+    plans = [build_plan(mix_name, per_thread, *pickers, entity_types, rng) for _ in range(args.concurrency)]
+    
+    # Warming up through the CDN also fills it, as in steady-state traffic
+    cdn = FakeCDN(app, clock=SimulatedClock(args.request_interval_ms / 1000)) if args.cdn else None
+    send_requests(app, build_plan(mix_name, args.warmup, *pickers, entity_types, rng), cdn=cdn)
+    if db is not None:
+        db.rpc_counts.clear()
+    if cdn is not None:
+        cdn.stats.clear()
+    
+    samples_by_thread = [[] for _ in plans]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix='client') as executor:
+        # Consume the iterator so client exceptions are not silently dropped
+        list(executor.map(send_requests, itertools.repeat(app), plans, samples_by_thread, itertools.repeat(cdn)))
+    elapsed = time.perf_counter() - start
+    
+    result = {
+        'mix': mix_name,
+        'elapsed_sec': round(elapsed, 3),
+        **summarize_samples([sample for samples in samples_by_thread for sample in samples], elapsed)
+    }
+    if db is not None:
+        result['firestore_rpcs'] = dict(db.rpc_counts)
+    if cdn is not None:
+        cdn.close()
+        result['cdn'] = dict(cdn.stats)
+    return result
+
+
+def print_report(results):
+    header = f"{'mix':<13} {'operation':<18} {'requests':>8} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cdn hit':>8}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        rows = list(result['operations'].items()) + [('(all)', result['total'])]
+        for operation, stats in rows:
+            hit_ratio = stats.get('cdn_hit_ratio')
+            print(
+                f"{result['mix']:<13} {operation:<18} {stats['requests']:>8} {stats['errors']:>5} "
+                f"{stats['throughput_rps']:>8} {stats['latency_p50_ms']:>8} {stats['latency_p95_ms']:>8} "
+                f"{stats['latency_p99_ms']:>8} {'-' if hit_ratio is None else f'{hit_ratio:.1%}':>8}"
+            )
+        if 'cdn' in result:
+            cdn = result['cdn']
+            print(
+                f"{result['mix']:<13} cdn: {cdn.get('origin_requests', 0)} origin requests, "
+                f"{cdn.get('purged_entries', 0)} entries purged, {cdn.get('revalidations', 0)} revalidations "
+                f"({cdn.get('not_modified', 0)} not modified)"
+            )
+
+
+def compare_with_baseline(results, baseline, max_regression):
+    """
+    Print p95 latency and throughput changes against a baseline run
+    
+    Returns:
+        list: Regressions over max_regression (empty if it is None)
+    """
+    baseline_results = {result['mix']: result for result in baseline.get('results', [])}
+    regressions = []
+    
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    print(f"{'mix':<13} {'operation':<18} {'p95 ms':>16} {'change':>8} {'req/s':>16} {'change':>8}")
+    for result in results:
+        previous = baseline_results.get(result['mix'])
+        if previous is None:
+            continue
+        
+        rows = [('(all)', result['total'], previous['total'])] + [
+            (operation, stats, previous['operations'][operation])
+            for operation, stats in result['operations'].items()
+            if operation in previous['operations']
+        ]
+        for operation, stats, old in rows:
+            p95_change = stats['latency_p95_ms'] / old['latency_p95_ms'] - 1 if old['latency_p95_ms'] else 0
+            rps_change = stats['throughput_rps'] / old['throughput_rps'] - 1 if old['throughput_rps'] else 0
+            print(
+                f"{result['mix']:<13} {operation:<18} "
+                f"{old['latency_p95_ms']:>7} -> {stats['latency_p95_ms']:<6} {p95_change:>+8.1%} "
+                f"{old['throughput_rps']:>7} -> {stats['throughput_rps']:<6} {rps_change:>+8.1%}"
+            )
+            
+            if max_regression is None:
+                continue
+            if p95_change > max_regression:
+                regressions.append(f"{result['mix']} {operation}: p95 latency {p95_change:+.1%}")
+            if operation == '(all)' and rps_change < -max_regression:
+                regressions.append(f"{result['mix']}: throughput {rps_change:+.1%}")
+    
+    return regressions
+
+
+def main():
+    args = parse_args()
+    
+    # Serve every endpoint from the single "api" function, as with API_GATEWAY=on
+    os.environ['API_GATEWAY'] = 'on'
+    
+    import functions_framework
+    from utils.logger import logger
+    if not args.verbose:
+        logger.logger.setLevel(logging.ERROR)
+    
+    app = functions_framework.create_app(target='api', source=os.path.join(FUNCTIONS_DIR, 'main.py'))
+    
+    results = [run_mix(args, app, mix_name) for mix_name in args.mixes]
+    print_report(results)
+    
+    output = {
+        'benchmark': 'endpoints',
+        'commit': git_commit(),
+        'config': vars(args),
+        'results': results
+    }
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, default=str)
+        print(f"\nResults written to {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.max_regression)
+        if regressions:
+            print("\nREGRESSED:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
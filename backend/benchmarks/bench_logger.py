@@ -0,0 +1,111 @@
+"""
+Logger micro-benchmark
+Measures the per-call cost of utils.logger for a filtered-out debug call, an
+emitted info call and an emitted error call, next to the previous eager
+implementation (timestamp and json.dumps before the level check). The
+queued column is the request-thread cost with LOG_QUEUE on. Output goes to
+an in-memory stream so terminal I/O is not measured.
+
+Usage (from backend/):
+    python benchmarks/bench_logger.py --calls 200000
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'functions'))
+
+from utils.logger import StructuredLogger
+
+
+class EagerLogger:
+    """The previous StructuredLogger: serializes before checking the level"""
+    
+    def __init__(self, name, stream):
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.handlers.clear()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(
+            '{"severity": "%(levelname)s", "time": "%(asctime)s", "message": "%(message)s"}'
+        ))
+        self.logger.addHandler(handler)
+    
+    def _log(self, level, message, **kwargs):
+        log_message = json.dumps({"message": message, "timestamp": datetime.utcnow().isoformat(), **kwargs})
+        if level == "DEBUG":
+            self.logger.debug(log_message)
+        elif level == "INFO":
+            self.logger.info(log_message)
+        elif level == "ERROR":
+            self.logger.error(log_message)
+    
+    def debug(self, message, **kwargs):
+        self._log("DEBUG", message, **kwargs)
+    
+    def info(self, message, **kwargs):
+        self._log("INFO", message, **kwargs)
+    
+    def error(self, message, **kwargs):
+        self._log("ERROR", message, **kwargs)
+
+
+def build_loggers(stream):
+    current = StructuredLogger("bench-current", level="INFO", queued=False)
+    current.logger.handlers[0].setStream(stream)
+    queued = StructuredLogger("bench-queued", level="INFO", queued=True)
+    queued._stream_handler.setStream(stream)
+    return {'eager': EagerLogger("bench-eager", stream), 'current': current, 'queued': queued}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--calls', type=int, default=100000, help='Calls per measurement')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+    
+    stream = io.StringIO()
+    loggers = build_loggers(stream)
+    context = {'entity_id': 'P001', 'review_id': 'abc123', 'rating': 4, 'tags': ['helpful', 'clear']}
+    
+    cases = {
+        'debug_filtered': lambda log: log.debug("Review payload validated", **context),
+        'info_emitted': lambda log: log.info("Review created", **context),
+        'error_emitted': lambda log: log.error("Error creating review", error='timeout', **context)
+    }
+    
+    results = {}
+    print(f"{'case':<16} {'eager ns':>10} {'current ns':>11} {'queued ns':>10} {'speedup':>8}")
+    for case, call in cases.items():
+        row = {}
+        for name, log in loggers.items():
+            seconds = min(timeit.repeat(lambda: call(log), number=args.calls, repeat=3))
+            row[f'{name}_ns_per_call'] = round(seconds / args.calls * 1e9, 1)
+            if name == 'queued':
+                row['queued_dropped'] = log.dropped_count
+            stream.seek(0)
+            stream.truncate()
+        results[case] = row
+        print(
+            f"{case:<16} {row['eager_ns_per_call']:>10} {row['current_ns_per_call']:>11} "
+            f"{row['queued_ns_per_call']:>10} {row['eager_ns_per_call'] / row['current_ns_per_call']:>7.1f}x"
+        )
+    
+    # Every emitted line must be valid JSON on its own
+    loggers['current'].info('Quoted "message"', detail='line\nbreak')
+    json.loads(stream.getvalue().splitlines()[-1])
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'benchmark': 'logger', 'calls': args.calls, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Cold import benchmark
+Imports each function entry point in a fresh interpreter and reports the
+median import time. Every deployed function loads main.py on a cold start,
+so "main" is the cost all of them pay; the other entry points show what each
+module pulls in on its own, and "summarizer" is the stack loaded lazily on
+the first summary request.
+
+Exits with status 1 when an entry point is over its budget, or when it loads
+a module that should only be imported lazily. With --lazy-only only the lazy
+module check fails the run and budget overruns are reported as warnings,
+since timings depend on the machine. That is how it runs as the functions
+predeploy hook in firebase.json, so an eager heavy import stops
+`firebase deploy --only functions` but a slow laptop does not.
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --budget-scale 2  # slower CI machines
+    python benchmarks/bench_startup.py --runs 3 --lazy-only  # predeploy hook
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'functions')
+
+# Entry point -> (module imported, budget in ms). Most of the time is the
+# Firebase and Google Cloud SDKs shared by every entry point; the budgets
+# leave room for machine noise, and LAZY_MODULES catches the regressions
+# that matter most
+ENTRY_POINTS = {
+    'main': ('main', 1500),
+    'healthcheck': ('api.health', 1200),
+    'get_entities': ('api.entities', 1200),
+    'get_reviews': ('api.get_reviews', 1200),
+    'create_review': ('api.reviews', 1200),
+    'update_entity_rating': ('triggers.update_rating', 1200),
+    'trigger_summaries': ('api.trigger_summaries', 1200),
+    'summarizer': ('utils.summarizer', 1500)
+}
+
+# Modules no entry point may load at import time (except the summarizer
+# itself); they are imported on first use
+LAZY_MODULES = ('numpy', 'openai', 'utils.summarizer', 'utils.summary_runs', 'utils.summary_batch')
+
+IMPORT_SCRIPT = """
+import importlib, json, sys, time
+sys.path.insert(0, {functions_dir!r})
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{'ms': elapsed_ms, 'loaded': [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, runs):
+    """
+    Import module in runs fresh interpreters
+    
+    Returns:
+        tuple: (median ms, lazy modules loaded by the import)
+    """
+    timings = []
+    loaded = []
+    for _ in range(runs):
+        script = IMPORT_SCRIPT.format(functions_dir=FUNCTIONS_DIR, module=module, lazy=LAZY_MODULES)
+        result = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=FUNCTIONS_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(data['ms'])
+        loaded = data['loaded']
+    return statistics.median(timings), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per entry point')
+    parser.add_argument('--budget-scale', type=float, default=1.0, help='Multiply every budget by this')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--lazy-only', action='store_true',
+                        help='Fail only on lazy module imports; report budget overruns as warnings')
+    args = parser.parse_args()
+    
+    results = {}
+    failures = []
+    warnings = []
+    print(f"{'entry point':<22} {'module':<24} {'median ms':>10} {'budget ms':>10}")
+    for name, (module, budget_ms) in ENTRY_POINTS.items():
+        median_ms, loaded = measure(module, args.runs)
+        budget_ms *= args.budget_scale
+        results[name] = {
+            'module': module,
+            'median_ms': round(median_ms, 1),
+            'budget_ms': budget_ms,
+            'lazy_modules_loaded': loaded
+        }
+        print(f"{name:<22} {module:<24} {median_ms:>10.1f} {budget_ms:>10.0f}")
+        
+        if median_ms > budget_ms:
+            over_budget = f"{name} took {median_ms:.1f} ms, budget {budget_ms:.0f} ms"
+            (warnings if args.lazy_only else failures).append(over_budget)
+        if name != 'summarizer' and loaded:
+            failures.append(f"{module} loads {', '.join(loaded)} at import time")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'benchmark': 'startup',
+                'runs': args.runs,
+                'results': results,
+                'failures': failures,
+                'warnings': warnings
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    
+    if warnings:
+        print("\nOver budget (not enforced with --lazy-only):\n  " + "\n  ".join(warnings))
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nNo lazy modules imported eagerly" if args.lazy_only else "\nAll entry points within budget")
+
+
+if __name__ == '__main__':
+    main()
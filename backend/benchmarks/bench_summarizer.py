@@ -0,0 +1,177 @@
+"""
+Summarizer throughput benchmark
+Runs generate_summaries_for_all_entities() against a FakeFirestore seeded
+from backend/data and a FakeLLMServer, once per concurrency level, and
+reports entities/sec, p50/p99 per-entity latency, LLM calls and Firestore
+round trips (summary cache reads and writes included).
+
+Usage (from backend/):
+    python benchmarks/bench_summarizer.py --concurrency 1 4 8 --copies 5 \\
+        --reviews-per-entity 12 --latency-ms 400 --error-rate 0.02 --rpm 3000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), 'functions'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fake_firestore import FakeFirestore
+from fake_llm_server import FakeLLMServer
+from seed_data import seed_fake_firestore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8],
+                        help='Concurrency levels to run, one run each')
+    parser.add_argument('--copies', type=int, default=1,
+                        help='Copies of the seeded catalog (scales the entity count)')
+    parser.add_argument('--reviews-per-entity', type=int, default=12,
+                        help='Synthetic reviews added to every entity')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum entities per run')
+    parser.add_argument('--review-fetch', choices=['auto', 'per_entity', 'grouped'], default=None)
+    parser.add_argument('--latency-ms', type=float, default=300.0, help='Mean fake LLM latency')
+    parser.add_argument('--jitter-ms', type=float, default=100.0, help='Fake LLM latency jitter')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of LLM calls failing with 500')
+    parser.add_argument('--rpm', type=float, default=None, help='Fake LLM requests per minute limit (429 above)')
+    parser.add_argument('--client-rpm', type=float, default=100000.0,
+                        help='Client-side OPENAI_REQUESTS_PER_MINUTE')
+    parser.add_argument('--firestore-latency-ms', type=float, default=0.0, help='Latency per Firestore round trip')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for data, latency and errors')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--verbose', action='store_true', help='Keep INFO and WARNING logs')
+    return parser.parse_args()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def run_once(args, server, concurrency):
+    """Summarize the seeded catalog once at the given concurrency"""
+    from repositories import set_repositories
+    from repositories.firestore_repositories import FirestoreEntityRepository, FirestoreReviewRepository
+    from utils import llm_client, summarizer
+    from utils.summary_cache import FirestoreSummaryCacheStore, summary_cache
+    
+    db = FakeFirestore(rpc_latency_ms=args.firestore_latency_ms)
+    entity_count, review_count = seed_fake_firestore(db, args.copies, args.reviews_per_entity, args.seed)
+    set_repositories(FirestoreEntityRepository(db), FirestoreReviewRepository(db))
+    summary_cache.store = FirestoreSummaryCacheStore(db)
+    
+    # Fresh client, rate limiter and cache per run so runs are comparable
+    llm_client._llm_client = None
+    summarizer._rate_limiter = None
+    summary_cache.clear()
+    server.reset_counts()
+    
+    latencies_ms = []
+    summarize_entity = summarizer.summarize_entity
+    
+    def timed_summarize_entity(*call_args, **call_kwargs):
+        start = time.perf_counter()
+        try:
+            return summarize_entity(*call_args, **call_kwargs)
+        finally:
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+    
+    summarizer.summarize_entity = timed_summarize_entity
+    try:
+        start = time.perf_counter()
+        stats = summarizer.generate_summaries_for_all_entities(
+            limit=args.limit,
+            concurrency=concurrency,
+            review_fetch=args.review_fetch
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        summarizer.summarize_entity = summarize_entity
+    
+    processed = len(latencies_ms)
+    stats.pop('workers', None)
+    return {
+        'concurrency': concurrency,
+        'entities': entity_count,
+        'reviews': review_count,
+        'processed': processed,
+        'elapsed_sec': round(elapsed, 3),
+        'entities_per_sec': round(processed / elapsed, 2) if elapsed else None,
+        'latency_p50_ms': round(percentile(latencies_ms, 0.50) or 0, 1),
+        'latency_p99_ms': round(percentile(latencies_ms, 0.99) or 0, 1),
+        'llm_calls': dict(server.counts),
+        'firestore_rpcs': dict(db.rpc_counts),
+        'outcomes': {key: stats[key] for key in summarizer.OUTCOME_COUNTS},
+        'writes': stats['writes'],
+        'cache': stats['cache']
+    }
+
+
+def print_report(results):
+    header = f"{'conc':>4} {'entities':>8} {'ent/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'llm':>6} {'429':>5} {'5xx':>5} {'fs rpc':>7}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        llm = result['llm_calls']
+        print(
+            f"{result['concurrency']:>4} {result['processed']:>8} {result['entities_per_sec']:>8} "
+            f"{result['latency_p50_ms']:>8} {result['latency_p99_ms']:>8} {llm.get('requests', 0):>6} "
+            f"{llm.get('rate_limited', 0):>5} {llm.get('errors', 0):>5} {sum(result['firestore_rpcs'].values()):>7}"
+        )
+
+
+def main():
+    args = parse_args()
+    
+    server = FakeLLMServer(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        requests_per_minute=args.rpm,
+        seed=args.seed
+    ).start()
+    
+    # Module-level settings are read at import, so they are set first
+    os.environ.update({
+        'OPENAI_API_KEY': 'benchmark',
+        'OPENAI_BASE_URL': server.base_url,
+        'OPENAI_REQUESTS_PER_MINUTE': str(args.client_rpm),
+        'LLM_CLIENT': 'openai',
+        'SUMMARY_BACKEND': 'openai'
+    })
+    
+    # The SDK import is slow; done up front so it is not counted as latency
+    import openai  # noqa: F401
+    from utils.logger import logger
+    if not args.verbose:
+        logger.logger.setLevel(logging.ERROR)
+    
+    results = []
+    try:
+        for concurrency in args.concurrency:
+            results.append(run_once(args, server, concurrency))
+    finally:
+        server.stop()
+    
+    print_report(results)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'benchmark': 'summarizer',
+                'config': vars(args),
+                'results': results
+            }, f, indent=2, default=str)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Local CDN stand-in for benchmarks
+Sits in front of a WSGI app (e.g. the functions-framework app) and caches
+GET responses the way a shared cache reads the functions' headers:
+- responses with `public` and s-maxage (or max-age) are stored; no-store,
+  private and non-200 responses are not
+- the cache key is the path, the query string and the request headers
+  named in Vary
+- within s-maxage a request is a hit; within the following
+  stale-while-revalidate window the stale copy is served and refreshed in
+  the background with If-None-Match (a 304 just renews it)
+- a response carrying X-Cache-Purge drops every entry tagged with one of
+  its surrogate keys
+
+Time comes from `clock`, so benchmarks can replay traffic at a simulated
+request rate and still see entries expire.
+"""
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+SURROGATE_KEY_HEADER = 'Surrogate-Key'
+PURGE_HEADER = 'X-Cache-Purge'
+
+
+def parse_cache_control(value):
+    """Cache-Control directives as a dict (valueless directives map to True)"""
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else True
+    return directives
+
+
+class CDNResponse:
+    """Status, headers and body of a response served by the FakeCDN"""
+    
+    def __init__(self, status_code, headers, data, outcome):
+        self.status_code = status_code
+        self.headers = headers
+        self.data = data
+        # 'hit', 'stale', 'miss', 'pass' (not cacheable) or 'write'
+        self.outcome = outcome
+    
+    def get_data(self):
+        return self.data
+
+
+class CacheEntry:
+
+    def __init__(self, response, stored_at, fresh_sec, stale_sec, keys):
+        self.response = response
+        self.stored_at = stored_at
+        self.fresh_sec = fresh_sec
+        self.stale_sec = stale_sec
+        self.keys = keys
+        self.revalidating = False
+
+
+class FakeCDN:
+    """
+    Caching proxy for a WSGI app, with hit/miss counters in `stats`
+    
+    open() takes the same arguments as a Flask test client's open().
+    """
+    
+    def __init__(self, app, clock=time.monotonic):
+        self.app = app
+        self.clock = clock
+        self.stats = Counter()
+        self._entries = {}
+        self._keys = {}
+        # Request headers each path's responses vary on, from their Vary header
+        self._vary_by_path = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._revalidator = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cdn-revalidate')
+    
+    def close(self):
+        """Wait for background revalidations to finish"""
+        self._revalidator.shutdown(wait=True)
+    
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+    
+    def _client(self):
+        # Test clients are not shared between threads
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client
+    
+    def _fetch(self, path, method, **request):
+        self._count('origin_requests')
+        return self._client().open(path, method=method, **request)
+    
+    def _cache_key(self, path, query_string, headers, vary=None):
+        query = tuple(sorted((query_string or {}).items()))
+        varied = tuple((name, (headers or {}).get(name)) for name in (vary or ()))
+        return path, query, varied
+    
+    def _store(self, cache_key, origin, now):
+        """Store an origin response if it is cacheable; returns whether it was"""
+        directives = parse_cache_control(origin.headers.get('Cache-Control'))
+        if origin.status_code != 200 or 'no-store' in directives or 'private' in directives:
+            return False
+        if 'public' not in directives:
+            return False
+        
+        fresh_sec = int(directives.get('s-maxage') or directives.get('max-age') or 0)
+        if fresh_sec <= 0:
+            return False
+        
+        stale_sec = int(directives.get('stale-while-revalidate') or 0)
+        keys = set((origin.headers.get(SURROGATE_KEY_HEADER) or '').split())
+        response = CDNResponse(200, dict(origin.headers), origin.get_data(), 'hit')
+        
+        with self._lock:
+            self._drop(cache_key)
+            self._entries[cache_key] = CacheEntry(response, now, fresh_sec, stale_sec, keys)
+            for key in keys:
+                self._keys.setdefault(key, set()).add(cache_key)
+        return True
+    
+    def _drop(self, cache_key):
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            for key in entry.keys:
+                tagged = self._keys.get(key)
+                if tagged is not None:
+                    tagged.discard(cache_key)
+    
+    def purge(self, surrogate_keys):
+        """Drop every entry tagged with one of the keys"""
+        with self._lock:
+            for key in surrogate_keys:
+                for cache_key in list(self._keys.pop(key, ())):
+                    self._drop(cache_key)
+                    self._count('purged_entries')
+            self._count('purge_requests')
+    
+    def _revalidate(self, cache_key, path, request):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+        if entry is None:
+            return
+        
+        headers = dict(request.get('headers') or {})
+        etag = entry.response.headers.get('ETag')
+        if etag:
+            headers['If-None-Match'] = etag
+        
+        origin = self._fetch(path, 'GET', **{**request, 'headers': headers})
+        self._count('revalidations')
+        if origin.status_code == 304:
+            self._count('not_modified')
+            with self._lock:
+                entry.stored_at = self.clock()
+                entry.revalidating = False
+        elif not self._store(cache_key, origin, self.clock()):
+            with self._lock:
+                self._drop(cache_key)
+    
+    def open(self, path, method='GET', **request):
+        """
+        Send a request through the cache
+        
+        Returns:
+            CDNResponse: The response, with `outcome` set
+        """
+        if method not in ('GET', 'HEAD'):
+            origin = self._fetch(path, method, **request)
+            purge_keys = (origin.headers.get(PURGE_HEADER) or '').split()
+            if purge_keys:
+                self.purge(purge_keys)
+            self._count('write')
+            return CDNResponse(origin.status_code, dict(origin.headers), origin.get_data(), 'write')
+        
+        query_string = request.get('query_string')
+        headers = request.get('headers')
+        now = self.clock()
+        
+        cache_key = self._cache_key(path, query_string, headers, self._vary_by_path.get(path))
+        
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                age = now - entry.stored_at
+                if age <= entry.fresh_sec:
+                    self._count('hit')
+                    return entry.response
+                if age <= entry.fresh_sec + entry.stale_sec:
+                    self._count('stale')
+                    if not entry.revalidating:
+                        entry.revalidating = True
+                        self._revalidator.submit(self._revalidate, cache_key, path, request)
+                    return CDNResponse(200, entry.response.headers, entry.response.data, 'stale')
+                self._drop(cache_key)
+        
+        origin = self._fetch(path, method, **request)
+        vary_header = origin.headers.get('Vary')
+        if vary_header:
+            vary = tuple(name.strip() for name in vary_header.split(','))
+            self._vary_by_path[path] = vary
+            cache_key = self._cache_key(path, query_string, headers, vary)
+        
+        stored = self._store(cache_key, origin, now)
+        outcome = 'miss' if stored else 'pass'
+        self._count(outcome)
+        return CDNResponse(origin.status_code, dict(origin.headers), origin.get_data(), outcome)
+    
+    def hit_ratio(self):
+        """Share of GET requests answered from the cache (fresh or stale)"""
+        served = self.stats['hit'] + self.stats['stale']
+        total = served + self.stats['miss'] + self.stats['pass']
+        return served / total if total else None
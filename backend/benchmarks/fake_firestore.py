@@ -0,0 +1,535 @@
+"""
+In-memory Firestore stand-in for benchmarks
+Implements the subset of the firestore.Client API the functions use:
+collections and documents (nested too), where/order_by/limit/offset/
+start_after/select queries, count(), batches, BulkWriter with
+on_write_error retries, preconditions via write_option(last_update_time=)
+and the SERVER_TIMESTAMP, DELETE_FIELD, Increment and ArrayUnion/ArrayRemove
+transforms.
+
+Each collection is stored in an InMemoryCollection, the store behind the
+in-memory repositories, so filtering, ordering, cursors, projections and
+update times behave the same in both. This module only adds the client API
+on top: references and snapshots, atomic multi-document commits, merges and
+nested field paths.
+
+Every RPC (document get, query stream, commit, BulkWriter batch) sleeps for
+`rpc_latency_ms` so round-trip counts show up in timings, and is counted in
+`rpc_counts`.
+"""
+import copy
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from google.cloud.firestore_v1 import transforms
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'functions'))
+
+from repositories.base import DOCUMENT_ID_FIELD, Document, Query
+from repositories.memory_repositories import INDEXED_FIELDS, InMemoryCollection, _MISSING, get_field
+
+
+# Operations per BulkWriter batch, as in the real client
+BULK_WRITER_BATCH_SIZE = 20
+
+FAILED_PRECONDITION_CODE = 9
+NOT_FOUND_CODE = 5
+
+# Firestore filter operators -> repository query operators
+FILTER_OPERATORS = {
+    '==': '==',
+    '!=': '!=',
+    '<': '<',
+    '<=': '<=',
+    '>': '>',
+    '>=': '>=',
+    'in': 'in',
+    'array-contains': 'array_contains'
+}
+
+
+def _apply_value(target, key, value, now):
+    """Store one value, resolving transforms against the current value"""
+    if value is transforms.DELETE_FIELD:
+        target.pop(key, None)
+    elif value is transforms.SERVER_TIMESTAMP:
+        target[key] = now
+    elif isinstance(value, transforms.Increment):
+        current = target.get(key)
+        target[key] = (current if isinstance(current, (int, float)) else 0) + value.value
+    elif isinstance(value, transforms.ArrayUnion):
+        current = list(target.get(key) or [])
+        target[key] = current + [item for item in value.values if item not in current]
+    elif isinstance(value, transforms.ArrayRemove):
+        target[key] = [item for item in target.get(key) or [] if item not in value.values]
+    elif isinstance(value, dict):
+        nested = target.get(key)
+        target[key] = nested = {} if not isinstance(nested, dict) else nested
+        for nested_key in list(nested):
+            if nested_key not in value:
+                nested.pop(nested_key)
+        for nested_key, nested_value in value.items():
+            _apply_value(nested, nested_key, nested_value, now)
+    else:
+        target[key] = copy.deepcopy(value)
+
+
+def _merge_value(target, key, value, now):
+    """Like _apply_value, but nested dicts are merged instead of replaced"""
+    if isinstance(value, dict) and isinstance(target.get(key), dict):
+        for nested_key, nested_value in value.items():
+            _merge_value(target[key], nested_key, nested_value, now)
+    else:
+        _apply_value(target, key, value, now)
+
+
+class FakeDocumentSnapshot:
+
+    def __init__(self, reference, data, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.update_time = update_time
+        self.exists = data is not None
+    
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+    
+    def get(self, field_path):
+        value = get_field(self.id, self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class FakeWriteOption:
+
+    def __init__(self, last_update_time=None, exists=None):
+        self.last_update_time = last_update_time
+        self.exists = exists
+
+
+class FakeFirestore:
+    """
+    Thread-safe in-memory database
+    
+    Keeps one InMemoryCollection per collection path. Commits and queries
+    hold the database lock, so a batch is never seen half-applied.
+    """
+    
+    def __init__(self, rpc_latency_ms=0.0):
+        self.rpc_latency_ms = rpc_latency_ms
+        self.rpc_counts = Counter()
+        self._collections = {}
+        self._lock = threading.RLock()
+    
+    # Client API
+    
+    def collection(self, collection_id):
+        return FakeCollectionReference(self, collection_id)
+    
+    def document(self, path):
+        collection_path, _, document_id = path.rpartition('/')
+        return FakeCollectionReference(self, collection_path).document(document_id)
+    
+    def batch(self):
+        return FakeWriteBatch(self)
+    
+    def bulk_writer(self):
+        return FakeBulkWriter(self)
+    
+    def write_option(self, last_update_time=None, exists=None):
+        return FakeWriteOption(last_update_time=last_update_time, exists=exists)
+    
+    # Helpers
+    
+    def rpc(self, name):
+        """Count one round trip and wait out the simulated latency"""
+        with self._lock:
+            self.rpc_counts[name] += 1
+        if self.rpc_latency_ms:
+            time.sleep(self.rpc_latency_ms / 1000)
+    
+    def store(self, collection_path):
+        """The InMemoryCollection holding a collection's documents"""
+        with self._lock:
+            collection = self._collections.get(collection_path)
+            if collection is None:
+                collection = InMemoryCollection(INDEXED_FIELDS.get(collection_path, ()))
+                self._collections[collection_path] = collection
+            return collection
+    
+    def seed(self, collection_id, documents):
+        """Insert documents (id -> data) without counting any RPCs"""
+        self.store(collection_id).seed(documents)
+    
+    def reset_counts(self):
+        self.rpc_counts.clear()
+    
+    def read(self, path):
+        """
+        Read one document by path
+        
+        Returns:
+            Document or None
+        """
+        collection_path, _, document_id = path.rpartition('/')
+        with self._lock:
+            return self.store(collection_path).document(document_id)
+    
+    def run_query(self, collection_path, query):
+        with self._lock:
+            return self.store(collection_path).run(query)
+    
+    def commit(self, writes):
+        """
+        Apply (kind, path, data, option) writes atomically
+        
+        Returns:
+            The update time of the last document written
+        
+        Raises:
+            FailedPrecondition: A precondition did not hold
+            NotFound: An update targeted a missing document
+            AlreadyExists: A create targeted an existing document
+        """
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            staged = {}
+            
+            # Staged entries are (data, update time) or None for a deletion;
+            # documents written earlier in the commit have no update time yet
+            for kind, path, data, option in writes:
+                if path in staged:
+                    stored = staged[path]
+                else:
+                    document = self.read(path)
+                    stored = (document.to_dict(), document.update_time) if document is not None else None
+                self._check(kind, path, stored, option)
+                staged[path] = self._apply(kind, stored, data, now)
+            
+            update_time = now
+            for path, stored in staged.items():
+                collection_path, _, document_id = path.rpartition('/')
+                collection = self.store(collection_path)
+                if stored is None:
+                    collection.delete(document_id)
+                else:
+                    collection.seed({document_id: stored[0]})
+                    update_time = collection.document(document_id).update_time
+            return update_time
+    
+    def _check(self, kind, path, stored, option):
+        if option is not None:
+            if option.last_update_time is not None and (stored is None or stored[1] != option.last_update_time):
+                raise FailedPrecondition(f"{path} was modified since {option.last_update_time}")
+            if option.exists is not None and (stored is not None) != option.exists:
+                raise FailedPrecondition(f"{path} existence precondition failed")
+        if kind == 'update' and stored is None:
+            raise NotFound(f"No document to update: {path}")
+        if kind == 'create' and stored is not None:
+            raise AlreadyExists(f"Document already exists: {path}")
+    
+    def _apply(self, kind, stored, data, now):
+        if kind == 'delete':
+            return None
+        
+        current = copy.deepcopy(stored[0]) if stored is not None else {}
+        
+        if kind in ('set', 'create'):
+            current = {}
+            for key, value in data.items():
+                _apply_value(current, key, value, now)
+        elif kind == 'merge':
+            for key, value in data.items():
+                _merge_value(current, key, value, now)
+        else:
+            for field_path, value in data.items():
+                *parents, leaf = field_path.split('.')
+                target = current
+                for part in parents:
+                    if not isinstance(target.get(part), dict):
+                        target[part] = {}
+                    target = target[part]
+                _apply_value(target, leaf, value, now)
+        
+        return (current, None)
+
+
+class FakeDocumentReference:
+
+    def __init__(self, db, collection_path, document_id):
+        self._db = db
+        self.id = document_id
+        self.path = f"{collection_path}/{document_id}"
+        self._collection_path = collection_path
+    
+    @property
+    def parent(self):
+        return FakeCollectionReference(self._db, self._collection_path)
+    
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentReference) and other.path == self.path
+    
+    def __hash__(self):
+        return hash(self.path)
+    
+    def collection(self, collection_id):
+        return FakeCollectionReference(self._db, f"{self.path}/{collection_id}")
+    
+    def get(self, field_paths=None, transaction=None):
+        self._db.rpc('get')
+        document = self._db.read(self.path)
+        if document is None:
+            return FakeDocumentSnapshot(self, None)
+        return FakeDocumentSnapshot(self, document.to_dict(), document.update_time)
+    
+    def _write(self, kind, data=None, option=None):
+        self._db.rpc('commit')
+        return self._db.commit([(kind, self.path, data, option)])
+    
+    def set(self, document_data, merge=False):
+        return self._write('merge' if merge else 'set', document_data)
+    
+    def create(self, document_data):
+        return self._write('create', document_data)
+    
+    def update(self, field_updates, option=None):
+        return self._write('update', field_updates, option)
+    
+    def delete(self, option=None):
+        return self._write('delete', option=option)
+
+
+class FakeQuery:
+
+    def __init__(self, db, collection_path, filters=(), orders=(), limit_count=None,
+                 offset_count=0, cursor=None, projection=None):
+        self._db = db
+        self._collection_path = collection_path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit_count
+        self._offset = offset_count
+        self._cursor = cursor
+        self._projection = projection
+    
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters,
+            'orders': self._orders,
+            'limit_count': self._limit,
+            'offset_count': self._offset,
+            'cursor': self._cursor,
+            'projection': self._projection,
+            **changes
+        }
+        return FakeQuery(self._db, self._collection_path, **state)
+    
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported operator: {op_string}")
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+    
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+    
+    def limit(self, count):
+        return self._copy(limit_count=count)
+    
+    def offset(self, count):
+        return self._copy(offset_count=count)
+    
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(cursor=document_fields_or_snapshot)
+    
+    def select(self, field_paths):
+        return self._copy(projection=list(field_paths))
+    
+    def _query(self):
+        """Translate into a repository Query for InMemoryCollection.run"""
+        filters = []
+        for field, op, value in self._filters:
+            if field == DOCUMENT_ID_FIELD:
+                # Document ID filters take references
+                value = [getattr(item, 'id', item) for item in value] if op == 'in' else getattr(value, 'id', value)
+            filters.append((field, FILTER_OPERATORS[op], value))
+        
+        cursor = self._cursor
+        if isinstance(cursor, FakeDocumentSnapshot):
+            # Cursor values come from the stored document, so a snapshot read
+            # with select() still positions on its ordered fields
+            cursor = self._db.read(cursor.reference.path) or Document(cursor.id, cursor.to_dict() or {})
+        
+        return Query(
+            None,
+            filters=filters,
+            orders=[(field, direction == 'DESCENDING') for field, direction in self._orders],
+            limit_count=None if self._offset else self._limit,
+            cursor=cursor,
+            fields=self._projection
+        )
+    
+    def _results(self):
+        documents = self._db.run_query(self._collection_path, self._query())
+        if self._offset:
+            documents = documents[self._offset:]
+            if self._limit is not None:
+                documents = documents[:self._limit]
+        return documents
+    
+    def stream(self, transaction=None):
+        self._db.rpc('query')
+        for document in self._results():
+            reference = FakeDocumentReference(self._db, self._collection_path, document.id)
+            yield FakeDocumentSnapshot(reference, document.to_dict(), document.update_time)
+    
+    def get(self, transaction=None):
+        return list(self.stream(transaction=transaction))
+    
+    def count(self, alias=None):
+        return FakeCountQuery(self)
+
+
+class FakeAggregationResult:
+
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class FakeCountQuery:
+
+    def __init__(self, query):
+        self._query = query
+    
+    def get(self, transaction=None):
+        self._query._db.rpc('aggregate')
+        return [[FakeAggregationResult('count', len(self._query._results()))]]
+
+
+class FakeCollectionReference(FakeQuery):
+
+    def __init__(self, db, collection_path):
+        super().__init__(db, collection_path)
+        self.id = collection_path.rsplit('/', 1)[-1]
+    
+    def document(self, document_id=None):
+        return FakeDocumentReference(self._db, self._collection_path, document_id or uuid.uuid4().hex[:20])
+    
+    def add(self, document_data, document_id=None):
+        reference = self.document(document_id)
+        update_time = reference.create(document_data)
+        return update_time, reference
+
+
+class FakeWriteBatch:
+
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+    
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(('merge' if merge else 'set', reference.path, document_data, None))
+    
+    def create(self, reference, document_data):
+        self._writes.append(('create', reference.path, document_data, None))
+    
+    def update(self, reference, field_updates, option=None):
+        self._writes.append(('update', reference.path, field_updates, option))
+    
+    def delete(self, reference, option=None):
+        self._writes.append(('delete', reference.path, None, option))
+    
+    def commit(self):
+        self._db.rpc('commit')
+        writes, self._writes = self._writes, []
+        return self._db.commit(writes)
+
+
+class FakeBulkWriterOperation:
+
+    def __init__(self, kind, reference, data, option):
+        self.kind = kind
+        self.reference = reference
+        self.data = data
+        self.option = option
+        self.attempts = 0
+
+
+class FakeBulkWriteFailure:
+
+    def __init__(self, operation, code, message):
+        self.operation = operation
+        self.code = code
+        self.message = message
+    
+    @property
+    def attempts(self):
+        return self.operation.attempts
+
+
+class FakeBulkWriter:
+    """
+    BulkWriter stand-in
+    
+    Operations are sent in batches of BULK_WRITER_BATCH_SIZE, each write
+    applied on its own. A failed write is handed to the on_write_error
+    callback, which decides whether it is retried, like the real client.
+    """
+    
+    def __init__(self, db):
+        self._db = db
+        self._pending = []
+        self._lock = threading.Lock()
+        self._on_write_error = lambda failure, bulk_writer: failure.attempts < 10
+    
+    def on_write_error(self, callback):
+        self._on_write_error = callback
+    
+    def _queue(self, kind, reference, data=None, option=None):
+        with self._lock:
+            self._pending.append(FakeBulkWriterOperation(kind, reference, data, option))
+            if len(self._pending) >= BULK_WRITER_BATCH_SIZE:
+                self._send()
+    
+    def set(self, reference, document_data, merge=False):
+        self._queue('merge' if merge else 'set', reference, document_data)
+    
+    def create(self, reference, document_data):
+        self._queue('create', reference, document_data)
+    
+    def update(self, reference, field_updates, option=None):
+        self._queue('update', reference, field_updates, option)
+    
+    def delete(self, reference, option=None):
+        self._queue('delete', reference, option=option)
+    
+    def _send(self):
+        while self._pending:
+            batch = self._pending[:BULK_WRITER_BATCH_SIZE]
+            self._pending = self._pending[BULK_WRITER_BATCH_SIZE:]
+            self._db.rpc('bulk_write')
+            
+            for operation in batch:
+                operation.attempts += 1
+                try:
+                    self._db.commit([(operation.kind, operation.reference.path, operation.data, operation.option)])
+                except (FailedPrecondition, NotFound, AlreadyExists) as e:
+                    code = FAILED_PRECONDITION_CODE if isinstance(e, FailedPrecondition) else NOT_FOUND_CODE
+                    if self._on_write_error(FakeBulkWriteFailure(operation, code, str(e)), self):
+                        self._pending.append(operation)
+    
+    def flush(self):
+        with self._lock:
+            self._send()
+    
+    def close(self):
+        self.flush()
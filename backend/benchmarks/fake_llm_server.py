@@ -0,0 +1,160 @@
+"""
+Fake OpenAI-compatible chat completions server
+Serves POST /v1/chat/completions on a local port with configurable latency,
+error rate and a requests-per-minute limit (answered with 429 and a
+Retry-After header), and counts every call. Point the OpenAI SDK at it with
+OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMServer:
+    """
+    Threaded fake LLM server
+    
+    Args:
+        latency_ms: Mean response latency
+        jitter_ms: Latency varies uniformly by up to this much either way
+        error_rate: Fraction of requests answered with a 500
+        requests_per_minute: Sliding-window rate limit; None disables it
+        seed: Random seed for latency and errors
+    """
+    
+    def __init__(self, latency_ms=300.0, jitter_ms=100.0, error_rate=0.0, requests_per_minute=None, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests_per_minute = requests_per_minute
+        self.counts = Counter()
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+    
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def start(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if self.path.rstrip('/') != '/v1/chat/completions':
+                    self._reply(404, {'error': {'message': 'Not found'}})
+                    return
+                self._reply(*server.handle_completion(json.loads(body or b'{}')))
+            
+            def _reply(self, status, payload, headers=None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+        
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-llm', daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def reset_counts(self):
+        with self._lock:
+            self.counts.clear()
+            self._recent.clear()
+    
+    def _admit(self):
+        """
+        Apply the rate limit
+        
+        Returns:
+            float or None: Seconds to wait if the request is rejected
+        """
+        if not self.requests_per_minute:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] >= 60:
+                self._recent.popleft()
+            if len(self._recent) >= self.requests_per_minute:
+                return 60 - (now - self._recent[0])
+            self._recent.append(now)
+        return None
+    
+    def handle_completion(self, request):
+        """
+        Answer one chat completion request
+        
+        Returns:
+            tuple: (status, payload, headers)
+        """
+        with self._lock:
+            self.counts['requests'] += 1
+        
+        wait = self._admit()
+        if wait is not None:
+            with self._lock:
+                self.counts['rate_limited'] += 1
+            return 429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_error'}}, {
+                'Retry-After': f"{max(wait, 0.1):.1f}"
+            }
+        
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            failed = self._random.random() < self.error_rate
+        time.sleep(delay)
+        
+        if failed:
+            with self._lock:
+                self.counts['errors'] += 1
+            return 500, {'error': {'message': 'Injected server error', 'type': 'server_error'}}, None
+        
+        prompt = ' '.join(str(message.get('content', '')) for message in request.get('messages', []))
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion = (
+            "Reviewers are broadly positive, praising the clear explanations and "
+            "helpful staff, though some mention crowding at peak hours."
+        )
+        
+        with self._lock:
+            self.counts['completed'] += 1
+            self.counts['prompt_tokens'] += prompt_tokens
+        
+        return 200, {
+            'id': f"chatcmpl-fake-{self.counts['requests']}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': completion},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': 30,
+                'total_tokens': prompt_tokens + 30
+            }
+        }, None
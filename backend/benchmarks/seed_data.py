@@ -0,0 +1,24 @@
+"""
+Seed a FakeFirestore from backend/data/*.json
+The documents are built by repositories.seed, the same data the in-memory
+repositories start with.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'functions'))
+
+from repositories.seed import build_dataset
+
+
+def seed_fake_firestore(db, copies=1, reviews_per_entity=0, seed=0):
+    """
+    Seed the entities and reviews collections of a FakeFirestore
+    
+    Returns:
+        tuple: (entity count, review count)
+    """
+    entities, reviews = build_dataset(copies, reviews_per_entity, seed)
+    db.seed('entities', entities)
+    db.seed('reviews', reviews)
+    return len(entities), len(reviews)
@@ -0,0 +1,225 @@
+from firebase_functions import https_fn
+from google.api_core.exceptions import AlreadyExists
+import json
+import time
+from utils.logger import logger
+from utils.tracing import traced
+from utils.http_cache import ALL_ENTITIES_KEY, entity_type_key, purge_headers
+from repositories import get_entity_repository
+from api.create_entity import validate_entity_payload, build_entity_document
+
+
+# Maximum number of entities accepted in one request
+MAX_BULK_ENTITIES = 1000
+
+# Firestore allows at most 500 writes per batch commit
+BATCH_SIZE = 500
+
+
+def get_cors_headers():
+    """Return CORS headers for API responses"""
+    return {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, Authorization",
+        "Access-Control-Max-Age": "3600",
+        "Content-Type": "application/json"
+    }
+
+
+def assign_entity_ids(payloads, reserved):
+    """
+    Assign reserved IDs to payloads, preserving input order within each type
+    
+    Returns:
+        list: Entity IDs aligned with `payloads`
+    """
+    next_position = {entity_type: 0 for entity_type in reserved}
+    entity_ids = []
+    
+    for payload in payloads:
+        entity_type = payload['type']
+        entity_ids.append(reserved[entity_type][next_position[entity_type]])
+        next_position[entity_type] += 1
+    
+    return entity_ids
+
+
+@https_fn.on_request()
+@traced
+def bulk_create_entities(req: https_fn.Request) -> https_fn.Response:
+    """
+    Create many entities in one request
+    POST /bulk_create_entities
+    
+    Request body:
+    {
+        "entities": [
+            {"name": "COM1 Level 1 Toilet", "type": "TOILET"},
+            {"name": "COM1-0204", "type": "CLASSROOM", "tags": ["SoC"]}
+        ]
+    }
+    
+    Each entity is validated with the same rules as create_entity. The whole
+    request is rejected if any entity is invalid. IDs are reserved as one
+    contiguous range per type in a single transaction, and documents are
+    written in batched commits.
+    
+    Response contains the assigned IDs in input order.
+    """
+    # Handle CORS preflight request
+    if req.method == "OPTIONS":
+        return https_fn.Response(
+            "",
+            status=204,
+            headers=get_cors_headers()
+        )
+    
+    # Only accept POST requests
+    if req.method != "POST":
+        return https_fn.Response(
+            json.dumps({"error": "Method not allowed. Use POST."}),
+            status=405,
+            headers=get_cors_headers()
+        )
+    
+    start_time = time.time()
+    created_ids = []
+    
+    try:
+        logger.log_request(req.method, req.path)
+        
+        # Parse request body
+        try:
+            data = req.get_json()
+        except Exception as e:
+            logger.warning("Invalid JSON in request body", error=str(e))
+            return https_fn.Response(
+                json.dumps({"error": "Invalid JSON in request body"}),
+                status=400,
+                headers=get_cors_headers()
+            )
+        
+        payloads = data.get('entities') if isinstance(data, dict) else None
+        
+        if not isinstance(payloads, list) or not payloads:
+            return https_fn.Response(
+                json.dumps({"error": "entities must be a non-empty array"}),
+                status=400,
+                headers=get_cors_headers()
+            )
+        
+        if len(payloads) > MAX_BULK_ENTITIES:
+            return https_fn.Response(
+                json.dumps({"error": f"At most {MAX_BULK_ENTITIES} entities can be created per request"}),
+                status=400,
+                headers=get_cors_headers()
+            )
+        
+        # Validate every payload before reserving any IDs
+        errors = []
+        for index, payload in enumerate(payloads):
+            validation_error = validate_entity_payload(payload)
+            if validation_error:
+                errors.append({"index": index, "error": validation_error})
+        
+        if errors:
+            logger.warning("Invalid entity payloads", invalid_count=len(errors))
+            return https_fn.Response(
+                json.dumps({
+                    "error": "Invalid entity payloads",
+                    "errors": errors
+                }),
+                status=400,
+                headers=get_cors_headers()
+            )
+        
+        entity_docs = [build_entity_document(payload) for payload in payloads]
+        
+        # Count entities per type and reserve all ranges in one transaction
+        counts = {}
+        for payload in payloads:
+            counts[payload['type']] = counts.get(payload['type'], 0) + 1
+        
+        entities = get_entity_repository()
+        reserved = entities.reserve_ids(counts)
+        entity_ids = assign_entity_ids(payloads, reserved)
+        
+        logger.info("Entity IDs reserved", counts=counts)
+        
+        # Write documents in batched commits
+        for batch_start in range(0, len(entity_docs), BATCH_SIZE):
+            batch_ids = entity_ids[batch_start:batch_start + BATCH_SIZE]
+            batch_docs = dict(zip(batch_ids, entity_docs[batch_start:batch_start + BATCH_SIZE]))
+            
+            entities.create_batch(batch_docs)
+            created_ids.extend(batch_ids)
+            
+            # Keep the duplicate-detection name index in sync (one write per
+            # type) batch by batch, so a later failed batch cannot leave
+            # committed entities out of it
+            entities.index_names(batch_docs)
+            
+            logger.log_firestore_operation(
+                "batch_create",
+                "entities",
+                batch_size=len(batch_ids)
+            )
+        
+        duration = (time.time() - start_time) * 1000
+        logger.info(
+            "Entities created successfully",
+            count=len(entity_ids)
+        )
+        logger.log_response(req.method, req.path, 201, duration)
+        
+        return https_fn.Response(
+            json.dumps({
+                "count": len(entity_ids),
+                "ids": entity_ids
+            }),
+            status=201,
+            headers={
+                **get_cors_headers(),
+                **purge_headers([ALL_ENTITIES_KEY] + [entity_type_key(entity_type) for entity_type in counts])
+            }
+        )
+    
+    except AlreadyExists as e:
+        # Only if entities with explicit IDs were written since the IDs were
+        # reserved; committed batches are kept and reported
+        duration = (time.time() - start_time) * 1000
+        logger.warning("Allocated entity ID already exists", created_count=len(created_ids), error=str(e))
+        logger.log_response(req.method, req.path, 409, duration)
+        
+        return https_fn.Response(
+            json.dumps({
+                "error": "Allocated entity ID already exists, please retry the entities not created",
+                "created": created_ids
+            }),
+            status=409,
+            headers={
+                **get_cors_headers(),
+                **purge_headers([ALL_ENTITIES_KEY] + [entity_type_key(entity_type) for entity_type in counts])
+            }
+        )
+    
+    except Exception as e:
+        duration = (time.time() - start_time) * 1000
+        logger.error(
+            "Error creating entities in bulk",
+            error=e,
+            created_count=len(created_ids),
+            duration_ms=duration
+        )
+        logger.log_response(req.method, req.path, 500, duration)
+        
+        # Batches committed before the failure are not rolled back
+        return https_fn.Response(
+            json.dumps({
+                "error": str(e),
+                "created": created_ids
+            }),
+            status=500,
+            headers=get_cors_headers()
+        )
@@ -1,10 +1,15 @@
 from firebase_functions import https_fn
-from firebase_admin import firestore
 from google.cloud.firestore import GeoPoint
+from google.api_core.exceptions import AlreadyExists
 from datetime import datetime
 import json
 import time
 from utils.logger import logger
+from utils.tracing import traced
+from utils.entity_index import DuplicateEntityError
+from utils.http_cache import entity_keys, purge_headers
+from repositories import get_entity_repository
+from api.entities import INTERNAL_ENTITY_FIELDS
 
 
 def get_cors_headers():
@@ -18,53 +23,89 @@ def get_cors_headers():
     }
 
 
-def generate_entity_id(db, entity_type):
-    """Generate next available ID for entity type"""
-    # Define prefix for each type
-    prefix_map = {
-        'CANTEEN': 'C',
-        'DORM': 'D',
-        'CLASSROOM': 'CR',
-        'PROFESSOR': 'P',
-        'TOILET': 'T'
+VALID_ENTITY_TYPES = ['CANTEEN', 'DORM', 'CLASSROOM', 'PROFESSOR', 'TOILET']
+
+
+def validate_entity_payload(data):
+    """
+    Validate an entity creation payload
+    
+    Returns:
+        str or None: Error message, or None if the payload is valid
+    """
+    if not isinstance(data, dict):
+        return "Entity payload must be a JSON object"
+    
+    # Validate required fields (removed 'id' from required)
+    required_fields = ['name', 'type']
+    missing_fields = [field for field in required_fields if field not in data]
+    
+    if missing_fields:
+        return f"Missing required fields: {', '.join(missing_fields)}"
+    
+    # Validate entity type
+    if data['type'] not in VALID_ENTITY_TYPES:
+        return f"Invalid entity type. Must be one of: {', '.join(VALID_ENTITY_TYPES)}"
+    
+    return None
+
+
+def build_entity_document(data):
+    """Build the Firestore entity document from a validated payload"""
+    entity_doc = {
+        'name': data['name'],
+        'type': data['type'],
+        'avgRating': 0.0,
+        'ratingCount': 0,
+        'createdAt': datetime.now(),
+        # Picked up by the next incremental summary run
+        'summaryStale': True
     }
     
-    prefix = prefix_map[entity_type]
-    entities_ref = db.collection('entities')
-    
-    # Query all entities of this type to find the highest index
-    query = entities_ref.where('type', '==', entity_type).stream()
-    
-    max_index = 0
-    for doc in query:
-        doc_id = doc.id
-        # Extract numeric part from ID
-        if doc_id.startswith(prefix):
-            try:
-                # For CLASSROOM (CR001), remove 'CR' and parse the rest
-                # For others (P001, T001, etc.), remove single letter prefix
-                numeric_part = doc_id[len(prefix):]
-                index = int(numeric_part)
-                max_index = max(max_index, index)
-            except ValueError:
-                continue
-    
-    # Generate next ID
-    next_index = max_index + 1
-    
-    # Format with appropriate padding
-    if entity_type == 'CLASSROOM':
-        # CR001, CR002, etc.
-        return f"{prefix}{next_index:03d}"
-    elif entity_type in ['PROFESSOR', 'TOILET']:
-        # P001, T001, etc.
-        return f"{prefix}{next_index:03d}"
-    else:
-        # C01, D01, etc.
-        return f"{prefix}{next_index:02d}"
+    # Add optional fields
+    if 'description' in data and data['description']:
+        entity_doc['description'] = data['description']
+    
+    if 'tags' in data and data['tags']:
+        entity_doc['tags'] = data['tags']
+    
+    if 'location' in data and data['location']:
+        # Convert location dict to GeoPoint
+        if isinstance(data['location'], dict):
+            if 'latitude' in data['location'] and 'longitude' in data['location']:
+                entity_doc['location'] = GeoPoint(
+                    data['location']['latitude'],
+                    data['location']['longitude']
+                )
+        elif isinstance(data['location'], GeoPoint):
+            entity_doc['location'] = data['location']
+    
+    return entity_doc
+
+
+def entity_to_response(entity_id, entity_doc):
+    """Convert a created entity document into a JSON-serializable dict"""
+    response_data = entity_doc.copy()
+    response_data['id'] = entity_id
+    for field in INTERNAL_ENTITY_FIELDS:
+        response_data.pop(field, None)
+    
+    # Convert timestamp to ISO format
+    if 'createdAt' in response_data:
+        response_data['createdAt'] = response_data['createdAt'].isoformat()
+    
+    # Convert GeoPoint to dict
+    if 'location' in response_data and isinstance(response_data['location'], GeoPoint):
+        response_data['location'] = {
+            'latitude': response_data['location'].latitude,
+            'longitude': response_data['location'].longitude
+        }
+    
+    return response_data
 
 
 @https_fn.on_request()
+@traced
 def create_entity(req: https_fn.Request) -> https_fn.Response:
     """
     Create a new entity in Firestore with auto-generated ID
@@ -74,6 +115,11 @@ def create_entity(req: https_fn.Request) -> https_fn.Response:
         - description: Description text (optional)
         - tags: Array of tags (optional)
         - location: Object with latitude and longitude (optional)
+        - allowDuplicate: Create even if a likely duplicate exists (optional)
+    
+    Returns 409 with the existing match if the normalized name is a near
+    duplicate of an existing entity of the same type (and, when both have
+    locations, the two are close together).
     
     ID is automatically generated based on type:
         - PROFESSOR: P001, P002, ...
@@ -106,94 +152,56 @@ def create_entity(req: https_fn.Request) -> https_fn.Response:
                 headers=get_cors_headers()
             )
         
-        # Validate required fields (removed 'id' from required)
-        required_fields = ['name', 'type']
-        missing_fields = [field for field in required_fields if field not in data]
-        
-        if missing_fields:
-            logger.warning("Missing required fields", fields=missing_fields)
+        # Validate payload
+        validation_error = validate_entity_payload(data)
+        if validation_error:
+            logger.warning("Invalid entity payload", error=validation_error)
             return https_fn.Response(
-                json.dumps({
-                    "error": f"Missing required fields: {', '.join(missing_fields)}"
-                }),
+                json.dumps({"error": validation_error}),
                 status=400,
                 headers=get_cors_headers()
             )
         
-        # Validate entity type
-        valid_types = ['CANTEEN', 'DORM', 'CLASSROOM', 'PROFESSOR', 'TOILET']
-        if data['type'] not in valid_types:
-            logger.warning("Invalid entity type", type=data['type'])
+        entity_doc = build_entity_document(data)
+        
+        # Allocate ID and create entity in a single transaction
+        try:
+            entity_id, matches = get_entity_repository().create(
+                data['type'],
+                entity_doc,
+                allow_duplicate=bool(data.get('allowDuplicate'))
+            )
+        except DuplicateEntityError as e:
+            logger.warning(
+                "Likely duplicate entity",
+                entity_type=data['type'],
+                name=data['name'],
+                existing_entity_id=e.match['id']
+            )
             return https_fn.Response(
                 json.dumps({
-                    "error": f"Invalid entity type. Must be one of: {', '.join(valid_types)}"
+                    "error": f"Entity '{data['name']}' looks like a duplicate of existing entity '{e.match['id']}'. Set allowDuplicate to create it anyway.",
+                    "match": e.match
                 }),
-                status=400,
+                status=409,
                 headers=get_cors_headers()
             )
-        
-        db = firestore.client()
-        entities_ref = db.collection('entities')
-        
-        # Generate entity ID automatically
-        entity_id = generate_entity_id(db, data['type'])
-        
-        # Check if generated ID already exists (shouldn't happen, but safety check)
-        existing_doc = entities_ref.document(entity_id).get()
-        
-        if existing_doc.exists:
-            logger.warning("Entity already exists", entity_id=entity_id)
+        except AlreadyExists as e:
+            # Still taken after the repository resynced the counter, i.e.
+            # entities with explicit IDs are being written concurrently
+            logger.warning("Allocated entity ID already exists", entity_type=data['type'], error=str(e))
             return https_fn.Response(
-                json.dumps({"error": f"Entity with ID '{entity_id}' already exists"}),
+                json.dumps({"error": "Allocated entity ID already exists, please retry"}),
                 status=409,
                 headers=get_cors_headers()
             )
-        
-        # Build entity document
-        entity_doc = {
-            'name': data['name'],
-            'type': data['type'],
-            'avgRating': 0.0,
-            'ratingCount': 0,
-            'createdAt': datetime.now()
-        }
-        
-        # Add optional fields
-        if 'description' in data and data['description']:
-            entity_doc['description'] = data['description']
-        
-        if 'tags' in data and data['tags']:
-            entity_doc['tags'] = data['tags']
-        
-        if 'location' in data and data['location']:
-            # Convert location dict to GeoPoint
-            if isinstance(data['location'], dict):
-                if 'latitude' in data['location'] and 'longitude' in data['location']:
-                    entity_doc['location'] = GeoPoint(
-                        data['location']['latitude'],
-                        data['location']['longitude']
-                    )
-            elif isinstance(data['location'], GeoPoint):
-                entity_doc['location'] = data['location']
-        
-        # Create entity in Firestore
         logger.log_firestore_operation("create", "entities", entity_id)
-        entities_ref.document(entity_id).set(entity_doc)
         
-        # Prepare response
-        response_data = entity_doc.copy()
-        response_data['id'] = entity_id
+        response_data = entity_to_response(entity_id, entity_doc)
         
-        # Convert timestamp to ISO format
-        if 'createdAt' in response_data:
-            response_data['createdAt'] = response_data['createdAt'].isoformat()
-        
-        # Convert GeoPoint to dict
-        if 'location' in response_data and isinstance(response_data['location'], GeoPoint):
-            response_data['location'] = {
-                'latitude': response_data['location'].latitude,
-                'longitude': response_data['location'].longitude
-            }
+        # Report weaker name matches as warnings
+        if matches:
+            response_data['possibleDuplicates'] = matches
         
         duration = (time.time() - start_time) * 1000
         logger.info(
@@ -206,9 +214,12 @@ def create_entity(req: https_fn.Request) -> https_fn.Response:
         return https_fn.Response(
             json.dumps(response_data),
             status=201,
-            headers=get_cors_headers()
+            headers={
+                **get_cors_headers(),
+                **purge_headers(entity_keys(entity_id, data['type']), entity_id=entity_id)
+            }
         )
-        
+    
     except Exception as e:
         duration = (time.time() - start_time) * 1000
         logger.error(
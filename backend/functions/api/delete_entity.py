@@ -3,6 +3,16 @@ from firebase_admin import firestore
 import json
 import time
 from utils.logger import logger
+from utils.tracing import span, traced
+from utils.http_cache import entity_keys, entity_reviews_key, purge_headers
+from repositories import get_entity_repository
+from utils.entity_deletion import (
+    SYNC_DELETE_MAX_REVIEWS,
+    count_entity_reviews,
+    delete_entity_cascade,
+    resume_deletion_job_if_stale,
+    start_deletion_job
+)
 
 
 def get_cors_headers():
@@ -16,12 +26,53 @@ def get_cors_headers():
     }
 
 
+def job_to_response(job_id, job_data):
+    """Convert a deletion job document into a JSON-serializable dict"""
+    return {
+        "jobId": job_id,
+        "id": job_data.get('entityId'),
+        "name": job_data.get('entityName'),
+        "type": job_data.get('entityType'),
+        "status": job_data.get('status'),
+        "totalReviews": job_data.get('totalReviews', 0),
+        "deletedReviews": job_data.get('deletedReviews', 0),
+        "error": job_data.get('error')
+    }
+
+
+def accepted_response(req, start_time, job_id, job_data):
+    """Build the 202 response for a deletion handled by a background job"""
+    duration = (time.time() - start_time) * 1000
+    logger.info(
+        "Entity deletion running as background job",
+        job_id=job_id,
+        entity_id=job_data.get('entityId'),
+        status=job_data.get('status')
+    )
+    logger.log_response(req.method, req.path, 202, duration)
+    
+    response_data = job_to_response(job_id, job_data)
+    response_data["message"] = "Entity deletion started"
+    
+    return https_fn.Response(
+        json.dumps(response_data),
+        status=202,
+        headers=get_cors_headers()
+    )
+
+
 @https_fn.on_request()
+@traced
 def delete_entity(req: https_fn.Request) -> https_fn.Response:
     """
-    Delete an entity from Firestore
+    Delete an entity and all of its reviews from Firestore
     Query params:
-        - id: Entity ID to delete (required)
+        - id: Entity ID to delete (required unless jobId is given)
+        - jobId: Get the progress of a background deletion job
+    
+    Entities with few reviews are deleted within the request (200). Larger
+    ones are deleted by a background job (202 with jobId); repeating the
+    request returns the same job and resumes it if it failed or stalled.
     """
     # Handle CORS preflight request
     if req.method == "OPTIONS":
@@ -36,6 +87,29 @@ def delete_entity(req: https_fn.Request) -> https_fn.Response:
     try:
         logger.log_request(req.method, req.path, query_params=dict(req.args))
         
+        # Report progress of a background deletion job
+        job_id = req.args.get('jobId')
+        if job_id:
+            # Polling also re-fires a job that has stalled
+            with span('firestore.deletionJobs.get'):
+                job_data = resume_deletion_job_if_stale(firestore.client(), job_id, retry_failed=False)
+            if job_data is None:
+                logger.warning("Deletion job not found", job_id=job_id)
+                return https_fn.Response(
+                    json.dumps({"error": f"Deletion job '{job_id}' not found"}),
+                    status=404,
+                    headers=get_cors_headers()
+                )
+            
+            duration = (time.time() - start_time) * 1000
+            logger.log_response(req.method, req.path, 200, duration)
+            
+            return https_fn.Response(
+                json.dumps(job_to_response(job_id, job_data)),
+                status=200,
+                headers=get_cors_headers()
+            )
+        
         # Get entity ID from query params
         entity_id = req.args.get('id')
         
@@ -47,13 +121,10 @@ def delete_entity(req: https_fn.Request) -> https_fn.Response:
                 headers=get_cors_headers()
             )
         
-        db = firestore.client()
-        entities_ref = db.collection('entities')
-        
         # Check if entity exists
-        entity_doc = entities_ref.document(entity_id).get()
+        entity_doc = get_entity_repository().get(entity_id)
         
-        if not entity_doc.exists:
+        if entity_doc is None:
             logger.warning("Entity not found", entity_id=entity_id)
             return https_fn.Response(
                 json.dumps({"error": f"Entity with ID '{entity_id}' not found"}),
@@ -66,16 +137,40 @@ def delete_entity(req: https_fn.Request) -> https_fn.Response:
         entity_type = entity_data.get('type', 'UNKNOWN')
         entity_name = entity_data.get('name', 'Unknown')
         
-        # Delete the entity
-        logger.log_firestore_operation("delete", "entities", entity_id)
-        entities_ref.document(entity_id).delete()
+        # Deletion already handed to a background job - report it (and resume if stalled)
+        existing_job_id = entity_data.get('deletionJobId')
+        if existing_job_id:
+            job_data = resume_deletion_job_if_stale(firestore.client(), existing_job_id)
+            if job_data is not None:
+                return accepted_response(req, start_time, existing_job_id, job_data)
+        
+        review_count = count_entity_reviews(entity_id)
+        
+        if review_count > SYNC_DELETE_MAX_REVIEWS:
+            # Deletion jobs are Firestore-only; the client is only created
+            # here so small deletions work on any DATA_BACKEND
+            job_id = start_deletion_job(firestore.client(), entity_id, entity_data, review_count)
+            job_data = {
+                'entityId': entity_id,
+                'entityName': entity_name,
+                'entityType': entity_type,
+                'status': 'pending',
+                'totalReviews': review_count,
+                'deletedReviews': 0
+            }
+            return accepted_response(req, start_time, job_id, job_data)
+        
+        # Delete the reviews, then the entity (and its name index entry)
+        logger.log_firestore_operation("delete", "entities", entity_id, review_count=review_count)
+        deleted_reviews = delete_entity_cascade(entity_id, entity_data.get('type'))
         
         duration = (time.time() - start_time) * 1000
         logger.info(
             "Entity deleted successfully",
             entity_id=entity_id,
             entity_type=entity_type,
-            entity_name=entity_name
+            entity_name=entity_name,
+            deleted_reviews=deleted_reviews
         )
         logger.log_response(req.method, req.path, 200, duration)
         
@@ -84,12 +179,19 @@ def delete_entity(req: https_fn.Request) -> https_fn.Response:
                 "message": "Entity deleted successfully",
                 "id": entity_id,
                 "name": entity_name,
-                "type": entity_type
+                "type": entity_type,
+                "deletedReviews": deleted_reviews
             }),
             status=200,
-            headers=get_cors_headers()
+            headers={
+                **get_cors_headers(),
+                **purge_headers(
+                    entity_keys(entity_id, entity_data.get('type')) + [entity_reviews_key(entity_id)],
+                    entity_id=entity_id
+                )
+            }
         )
-        
+    
     except Exception as e:
         duration = (time.time() - start_time) * 1000
         logger.error(
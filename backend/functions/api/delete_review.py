@@ -1,8 +1,10 @@
 from firebase_functions import https_fn
-from firebase_admin import firestore
 import json
 import time
 from utils.logger import logger
+from utils.tracing import traced
+from utils.http_cache import entity_reviews_key, purge_headers
+from repositories import get_review_repository
 
 
 def get_cors_headers():
@@ -17,6 +19,7 @@ def get_cors_headers():
 
 
 @https_fn.on_request()
+@traced
 def delete_review(req: https_fn.Request) -> https_fn.Response:
     """
     Delete a review by ID
@@ -56,13 +59,11 @@ def delete_review(req: https_fn.Request) -> https_fn.Response:
                 headers=get_cors_headers()
             )
         
-        # Delete from Firestore
-        db = firestore.client()
-        review_ref = db.collection('reviews').document(review_id)
+        reviews = get_review_repository()
         
         # Check if review exists
-        review_doc = review_ref.get()
-        if not review_doc.exists:
+        review_doc = reviews.get(review_id)
+        if review_doc is None:
             logger.warning("Review not found", review_id=review_id)
             return https_fn.Response(
                 json.dumps({"error": f"Review with ID '{review_id}' not found"}),
@@ -75,7 +76,7 @@ def delete_review(req: https_fn.Request) -> https_fn.Response:
         entity_id = review_data.get('entityId', 'unknown')
         
         # Delete the review
-        review_ref.delete()
+        reviews.delete(review_id)
         
         logger.log_firestore_operation(
             "delete",
@@ -98,9 +99,15 @@ def delete_review(req: https_fn.Request) -> https_fn.Response:
                 "id": review_id
             }),
             status=200,
-            headers=get_cors_headers()
+            headers={
+                **get_cors_headers(),
+                **purge_headers(
+                    [entity_reviews_key(entity_id)] if 'entityId' in review_data else [],
+                    entity_id=entity_id
+                )
+            }
         )
-        
+    
     except Exception as e:
         duration = (time.time() - start_time) * 1000
         logger.error(
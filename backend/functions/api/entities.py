@@ -1,8 +1,14 @@
 from firebase_functions import https_fn
-from firebase_admin import firestore
 import json
 import time
 from utils.logger import logger
+from utils.tracing import span, traced
+from utils.http_cache import ALL_ENTITIES_KEY, cacheable_response, entity_key, entity_type_key
+from repositories import get_entity_repository
+
+
+# Bookkeeping fields of the summarizer that are not part of the API
+INTERNAL_ENTITY_FIELDS = ('summaryWatermark', 'summaryStale')
 
 
 def get_cors_headers():
@@ -17,6 +23,7 @@ def get_cors_headers():
 
 
 @https_fn.on_request()
+@traced
 def get_entities(req: https_fn.Request) -> https_fn.Response:
     """
     Get entities from Firestore
@@ -42,16 +49,15 @@ def get_entities(req: https_fn.Request) -> https_fn.Response:
             query_params=dict(req.args)
         )
         
-        db = firestore.client()
-        entities_ref = db.collection('entities')
+        entities = get_entity_repository()
         
         # Get specific entity by ID
         entity_id = req.args.get('id')
         if entity_id:
             logger.log_firestore_operation("read", "entities", entity_id)
             
-            doc = entities_ref.document(entity_id).get()
-            if not doc.exists:
+            doc = entities.get(entity_id)
+            if doc is None:
                 logger.warning(
                     "Entity not found",
                     entity_id=entity_id
@@ -64,6 +70,8 @@ def get_entities(req: https_fn.Request) -> https_fn.Response:
             
             entity_data = doc.to_dict()
             entity_data['id'] = doc.id
+            for field in INTERNAL_ENTITY_FIELDS:
+                entity_data.pop(field, None)
             
             # Convert timestamp to ISO format
             if 'createdAt' in entity_data and entity_data['createdAt']:
@@ -78,17 +86,18 @@ def get_entities(req: https_fn.Request) -> https_fn.Response:
                     }
                 # If location is already a dict, leave it as-is
             
+            with span('serialize'):
+                body = json.dumps(entity_data)
+            
+            response = cacheable_response(req, body, 'get_entities', [entity_key(entity_id)], get_cors_headers())
+            
             duration = (time.time() - start_time) * 1000
-            logger.log_response(req.method, req.path, 200, duration)
+            logger.log_response(req.method, req.path, response.status_code, duration)
             
-            return https_fn.Response(
-                json.dumps(entity_data),
-                status=200,
-                headers=get_cors_headers()
-            )
+            return response
         
         # Build query with optional filters
-        query = entities_ref
+        query = entities.query()
         
         # Filter by type
         entity_type = req.args.get('type')
@@ -103,46 +112,50 @@ def get_entities(req: https_fn.Request) -> https_fn.Response:
         logger.log_firestore_operation("query", "entities", limit=limit)
         
         # Execute query
-        docs = query.stream()
+        docs = query.get()
         
-        entities = []
-        for doc in docs:
-            entity_data = doc.to_dict()
-            entity_data['id'] = doc.id
+        results = []
+        with span('serialize'):
+            for doc in docs:
+                entity_data = doc.to_dict()
+                entity_data['id'] = doc.id
+                for field in INTERNAL_ENTITY_FIELDS:
+                    entity_data.pop(field, None)
+                
+                # Convert timestamp to ISO format
+                if 'createdAt' in entity_data and entity_data['createdAt']:
+                    entity_data['createdAt'] = entity_data['createdAt'].isoformat()
+                
+                # Convert geopoint to dict (if it's a GeoPoint object)
+                if 'location' in entity_data and entity_data['location']:
+                    if hasattr(entity_data['location'], 'latitude'):
+                        entity_data['location'] = {
+                            'latitude': entity_data['location'].latitude,
+                            'longitude': entity_data['location'].longitude
+                        }
+                    # If location is already a dict, leave it as-is
+                
+                results.append(entity_data)
             
-            # Convert timestamp to ISO format
-            if 'createdAt' in entity_data and entity_data['createdAt']:
-                entity_data['createdAt'] = entity_data['createdAt'].isoformat()
-            
-            # Convert geopoint to dict (if it's a GeoPoint object)
-            if 'location' in entity_data and entity_data['location']:
-                if hasattr(entity_data['location'], 'latitude'):
-                    entity_data['location'] = {
-                        'latitude': entity_data['location'].latitude,
-                        'longitude': entity_data['location'].longitude
-                    }
-                # If location is already a dict, leave it as-is
-            
-            entities.append(entity_data)
+            body = json.dumps({
+                "count": len(results),
+                "entities": results
+            })
+        
+        surrogate_keys = [entity_type_key(entity_type) if entity_type else ALL_ENTITIES_KEY]
+        response = cacheable_response(req, body, 'get_entities', surrogate_keys, get_cors_headers())
         
         duration = (time.time() - start_time) * 1000
         logger.log_response(
             req.method, 
             req.path, 
-            200, 
+            response.status_code, 
             duration,
-            entities_count=len(entities)
-        )
-        
-        return https_fn.Response(
-            json.dumps({
-                "count": len(entities),
-                "entities": entities
-            }),
-            status=200,
-            headers=get_cors_headers()
+            entities_count=len(results)
         )
         
+        return response
+    
     except Exception as e:
         duration = (time.time() - start_time) * 1000
         logger.error(
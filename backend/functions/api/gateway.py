@@ -0,0 +1,114 @@
+"""
+Single entry point for the HTTP API
+Routes /<endpoint> to the existing handlers, so one pool of warm instances
+serves every route instead of each function keeping its own. CORS
+preflights, CORS headers and uncaught errors are handled here for all routes.
+
+trigger_summaries is not routed: it needs the OpenAI secret, more memory and
+a longer timeout, so it stays a separate function.
+"""
+from firebase_functions import https_fn
+import json
+import time
+from utils.logger import logger
+from api.health import healthcheck
+from api.entities import get_entities
+from api.create_entity import create_entity
+from api.bulk_create_entities import bulk_create_entities
+from api.delete_entity import delete_entity
+from api.reviews import create_review
+from api.get_reviews import get_reviews
+from api.delete_review import delete_review
+from api.vote_review import vote_review
+from api.metrics import metrics
+
+
+# Path (the separate function's Cloud Run service name) -> handler
+ROUTES = {
+    '/healthcheck': healthcheck,
+    '/get-entities': get_entities,
+    '/create-entity': create_entity,
+    '/bulk-create-entities': bulk_create_entities,
+    '/delete-entity': delete_entity,
+    '/create-review': create_review,
+    '/get-reviews': get_reviews,
+    '/delete-review': delete_review,
+    '/vote-review': vote_review,
+    '/metrics': metrics
+}
+
+# Function names are accepted too, e.g. /get_reviews
+ROUTES.update({path.replace('-', '_'): handler for path, handler in list(ROUTES.items())})
+
+# Optional prefix in front of every route, e.g. /api/get-reviews behind Hosting rewrites
+ROUTE_PREFIX = '/api'
+
+
+def get_cors_headers():
+    """Return CORS headers for API responses"""
+    return {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, Authorization, traceparent",
+        "Access-Control-Max-Age": "3600"
+    }
+
+
+def resolve_route(path):
+    """
+    Find the handler for a request path
+    
+    Returns:
+        callable or None: The handler, or None if no route matches
+    """
+    path = path.rstrip('/') or '/'
+    if path.startswith(ROUTE_PREFIX + '/'):
+        path = path[len(ROUTE_PREFIX):]
+    return ROUTES.get(path)
+
+
+@https_fn.on_request()
+def api(req: https_fn.Request) -> https_fn.Response:
+    """
+    Dispatch a request to the handler for its path
+    GET /get-reviews?entityId=P001
+    
+    Handlers receive the request unchanged and trace themselves, so their
+    logs, metrics and Server-Timing headers are the same as when they are
+    deployed as separate functions.
+    """
+    handler = resolve_route(req.path)
+    
+    if handler is None:
+        logger.warning("No route for path", request_method=req.method, request_path=req.path)
+        return https_fn.Response(
+            json.dumps({"error": f"Not found: {req.path}"}),
+            status=404,
+            headers={**get_cors_headers(), "Content-Type": "application/json"}
+        )
+    
+    # Handle CORS preflight request
+    if req.method == "OPTIONS":
+        return https_fn.Response(
+            "",
+            status=204,
+            headers=get_cors_headers()
+        )
+    
+    start_time = time.time()
+    
+    try:
+        response = handler(req)
+    except Exception as e:
+        duration = (time.time() - start_time) * 1000
+        logger.error("Unhandled error in API handler", error=e, endpoint=handler.__name__)
+        logger.log_response(req.method, req.path, 500, duration)
+        return https_fn.Response(
+            json.dumps({"error": "Internal server error"}),
+            status=500,
+            headers={**get_cors_headers(), "Content-Type": "application/json"}
+        )
+    
+    for header, value in get_cors_headers().items():
+        response.headers.setdefault(header, value)
+    return response
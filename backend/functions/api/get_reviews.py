@@ -1,8 +1,10 @@
 from firebase_functions import https_fn
-from firebase_admin import firestore
 import json
 import time
 from utils.logger import logger
+from utils.tracing import span, traced
+from utils.http_cache import cacheable_response, entity_reviews_key
+from repositories import get_review_repository
 
 
 def get_cors_headers():
@@ -17,6 +19,7 @@ def get_cors_headers():
 
 
 @https_fn.on_request()
+@traced
 def get_reviews(req: https_fn.Request) -> https_fn.Response:
     """
     Get reviews for an entity
@@ -56,12 +59,8 @@ def get_reviews(req: https_fn.Request) -> https_fn.Response:
                 headers=get_cors_headers()
             )
         
-        # Query Firestore
-        db = firestore.client()
-        reviews_ref = db.collection('reviews')
-        
         # Filter by entityId and order by createdAt descending
-        query = reviews_ref.where('entityId', '==', entity_id).order_by('createdAt', direction=firestore.Query.DESCENDING)
+        query = get_review_repository().for_entity(entity_id).order_by('createdAt', descending=True)
         
         logger.log_firestore_operation(
             "query",
@@ -71,37 +70,38 @@ def get_reviews(req: https_fn.Request) -> https_fn.Response:
         )
         
         # Get results
-        results = query.stream()
-        reviews = []
+        docs = query.get()
         
-        for doc in results:
-            review_data = doc.to_dict()
-            review_data['id'] = doc.id
-            
-            # Convert timestamp to ISO format
-            if 'createdAt' in review_data and review_data['createdAt']:
-                review_data['createdAt'] = review_data['createdAt'].isoformat()
+        reviews = []
+        with span('serialize'):
+            for doc in docs:
+                review_data = doc.to_dict()
+                review_data['id'] = doc.id
+                
+                # Convert timestamp to ISO format
+                if 'createdAt' in review_data and review_data['createdAt']:
+                    review_data['createdAt'] = review_data['createdAt'].isoformat()
+                
+                reviews.append(review_data)
             
-            reviews.append(review_data)
+            body = json.dumps({
+                "entityId": entity_id,
+                "count": len(reviews),
+                "reviews": reviews
+            })
+        
+        response = cacheable_response(req, body, 'get_reviews', [entity_reviews_key(entity_id)], get_cors_headers())
         
         duration = (time.time() - start_time) * 1000
-        logger.log_response(req.method, req.path, 200, duration)
+        logger.log_response(req.method, req.path, response.status_code, duration)
         logger.info(
             "Reviews retrieved successfully",
             entity_id=entity_id,
             count=len(reviews)
         )
         
-        return https_fn.Response(
-            json.dumps({
-                "entityId": entity_id,
-                "count": len(reviews),
-                "reviews": reviews
-            }),
-            status=200,
-            headers=get_cors_headers()
-        )
-        
+        return response
+    
     except Exception as e:
         duration = (time.time() - start_time) * 1000
         logger.error(
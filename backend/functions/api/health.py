@@ -1,5 +1,6 @@
 from firebase_functions import https_fn
 from utils.logger import logger
+from utils.tracing import traced
 
 
 def get_cors_headers():
@@ -13,6 +14,7 @@ def get_cors_headers():
 
 
 @https_fn.on_request()
+@traced
 def healthcheck(req: https_fn.Request) -> https_fn.Response:
     """Health check endpoint to verify API is running"""
     # Handle CORS preflight request
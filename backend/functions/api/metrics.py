@@ -0,0 +1,66 @@
+from firebase_functions import https_fn
+import json
+from utils.logger import logger
+from utils.metrics import metrics as metrics_registry
+
+
+def get_cors_headers():
+    """Return CORS headers for API responses"""
+    return {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, Authorization",
+        "Access-Control-Max-Age": "3600",
+        "Cache-Control": "no-store"
+    }
+
+
+@https_fn.on_request()
+def metrics(req: https_fn.Request) -> https_fn.Response:
+    """
+    Export the metrics of the instance serving the request
+    GET /metrics?format=prometheus
+    
+    Query parameters:
+    - format (optional): "prometheus" (text exposition format, default) or "json"
+    
+    Every function instance keeps its own registry, so this shows one
+    instance's view; the periodic "Metrics snapshot" log lines cover all.
+    """
+    # Handle CORS preflight request
+    if req.method == "OPTIONS":
+        return https_fn.Response(
+            "",
+            status=204,
+            headers=get_cors_headers()
+        )
+    
+    if req.method != "GET":
+        return https_fn.Response(
+            json.dumps({"error": "Method not allowed. Use GET."}),
+            status=405,
+            headers={**get_cors_headers(), "Content-Type": "application/json"}
+        )
+    
+    export_format = req.args.get('format', 'prometheus')
+    
+    if export_format == 'json':
+        return https_fn.Response(
+            json.dumps(metrics_registry.to_json()),
+            status=200,
+            headers={**get_cors_headers(), "Content-Type": "application/json"}
+        )
+    
+    if export_format == 'prometheus':
+        return https_fn.Response(
+            metrics_registry.to_prometheus(),
+            status=200,
+            headers={**get_cors_headers(), "Content-Type": "text/plain; version=0.0.4"}
+        )
+    
+    logger.warning("Invalid metrics format", format=export_format)
+    return https_fn.Response(
+        json.dumps({"error": "Invalid format parameter, must be 'prometheus' or 'json'"}),
+        status=400,
+        headers={**get_cors_headers(), "Content-Type": "application/json"}
+    )
@@ -4,6 +4,9 @@ import json
 import time
 import uuid
 from utils.logger import logger
+from utils.tracing import span, traced
+from utils.http_cache import entity_reviews_key, purge_headers
+from repositories import get_entity_repository, get_review_repository
 
 
 # Subratings configuration by entity type
@@ -29,6 +32,7 @@ def get_cors_headers():
 
 
 @https_fn.on_request()
+@traced
 def create_review(req: https_fn.Request) -> https_fn.Response:
     """
     Create a new review
@@ -99,11 +103,9 @@ def create_review(req: https_fn.Request) -> https_fn.Response:
             )
         
         # Validate entityId exists and get entity type
-        db = firestore.client()
-        entity_ref = db.collection('entities').document(data['entityId'])
-        entity_doc = entity_ref.get()
+        entity_doc = get_entity_repository().get(data['entityId'])
         
-        if not entity_doc.exists:
+        if entity_doc is None:
             logger.warning("Entity not found", entity_id=data['entityId'])
             return https_fn.Response(
                 json.dumps({"error": f"Entity with ID '{data['entityId']}' not found"}),
@@ -222,20 +224,18 @@ def create_review(req: https_fn.Request) -> https_fn.Response:
         if module_code:
             review_data['moduleCode'] = module_code
         
-        # Add review to Firestore
-        review_ref = db.collection('reviews').document()
-        review_ref.set(review_data)
+        # Add review, read back with the server timestamp
+        review_doc = get_review_repository().add(review_data)
         
         logger.log_firestore_operation(
             "create",
             "reviews",
-            review_ref.id,
+            review_doc.id,
             entity_id=data['entityId']
         )
         
-        # Get the created review with server timestamp
-        created_review = review_ref.get().to_dict()
-        created_review['id'] = review_ref.id
+        created_review = review_doc.to_dict()
+        created_review['id'] = review_doc.id
         
         # Convert timestamp to ISO format
         if 'createdAt' in created_review and created_review['createdAt']:
@@ -245,19 +245,26 @@ def create_review(req: https_fn.Request) -> https_fn.Response:
         logger.log_response(req.method, req.path, 201, duration)
         logger.info(
             "Review created successfully",
-            review_id=review_ref.id,
+            review_id=review_doc.id,
             entity_id=data['entityId']
         )
         
-        return https_fn.Response(
-            json.dumps({
+        with span('serialize'):
+            body = json.dumps({
                 "message": "Review created successfully",
                 "review": created_review
-            }),
+            })
+        
+        # The rating trigger purges the entity itself once its rating changes
+        return https_fn.Response(
+            body,
             status=201,
-            headers=get_cors_headers()
+            headers={
+                **get_cors_headers(),
+                **purge_headers([entity_reviews_key(data['entityId'])], entity_id=data['entityId'])
+            }
         )
-        
+    
     except Exception as e:
         duration = (time.time() - start_time) * 1000
         logger.error(
@@ -1,10 +1,14 @@
 from firebase_functions import https_fn
-from utils.summarizer import generate_summaries_for_all_entities
 from utils.logger import logger
+from utils.tracing import traced
 import json
 import time
 
 
+# Upper bound for the concurrency query parameter
+MAX_CONCURRENCY = 32
+
+
 def get_cors_headers():
     """Return CORS headers for API responses"""
     return {
@@ -21,14 +25,19 @@ def get_cors_headers():
     memory=512,  # Increased memory for processing
     timeout_sec=300  # 5 minutes timeout
 )
+@traced
 def trigger_summaries(req: https_fn.Request) -> https_fn.Response:
     """
     Manually trigger review summary generation for all entities
     
     Query parameters:
         - limit: Optional maximum number of entities to process
+        - concurrency: Optional number of entities to summarize in parallel
+        - incremental: If "true", only process entities whose reviews changed
+        - review_fetch: Optional "grouped" (one pass over all reviews),
+          "per_entity" (one query per entity) or "auto" (grouped for large runs)
     
-    Example: GET /trigger_summaries?limit=10
+    Example: GET /trigger_summaries?limit=10&concurrency=4
     """
     # Handle CORS preflight request
     if req.method == "OPTIONS":
@@ -38,6 +47,9 @@ def trigger_summaries(req: https_fn.Request) -> https_fn.Response:
             headers=get_cors_headers()
         )
     
+    # Imported here so other functions' cold starts skip the summarizer stack
+    from utils.summarizer import generate_summaries_for_all_entities, REVIEW_FETCH_MODES
+    
     start_time = time.time()
     
     try:
@@ -58,10 +70,49 @@ def trigger_summaries(req: https_fn.Request) -> https_fn.Response:
                     headers=get_cors_headers()
                 )
         
-        logger.info("Starting manual summary generation", limit=limit)
+        # Get concurrency from query params (optional)
+        concurrency_param = req.args.get('concurrency')
+        concurrency = None
+        
+        if concurrency_param:
+            try:
+                concurrency = int(concurrency_param)
+                if concurrency < 1 or concurrency > MAX_CONCURRENCY:
+                    raise ValueError(concurrency_param)
+            except ValueError:
+                logger.warning("Invalid concurrency parameter", concurrency=concurrency_param)
+                return https_fn.Response(
+                    json.dumps({"error": f"Invalid concurrency parameter, must be an integer between 1 and {MAX_CONCURRENCY}"}),
+                    status=400,
+                    headers=get_cors_headers()
+                )
+        
+        incremental = req.args.get('incremental', '').lower() == 'true'
+        
+        review_fetch = req.args.get('review_fetch')
+        if review_fetch and review_fetch not in REVIEW_FETCH_MODES:
+            logger.warning("Invalid review_fetch parameter", review_fetch=review_fetch)
+            return https_fn.Response(
+                json.dumps({"error": f"Invalid review_fetch parameter, must be one of: {', '.join(REVIEW_FETCH_MODES)}"}),
+                status=400,
+                headers=get_cors_headers()
+            )
+        
+        logger.info(
+            "Starting manual summary generation",
+            limit=limit,
+            concurrency=concurrency,
+            incremental=incremental,
+            review_fetch=review_fetch
+        )
         
         # Generate summaries
-        stats = generate_summaries_for_all_entities(limit=limit)
+        stats = generate_summaries_for_all_entities(
+            limit=limit,
+            concurrency=concurrency,
+            incremental=incremental,
+            review_fetch=review_fetch
+        )
         
         duration = (time.time() - start_time) * 1000
         
@@ -81,7 +132,7 @@ def trigger_summaries(req: https_fn.Request) -> https_fn.Response:
             status=200,
             headers=get_cors_headers()
         )
-        
+    
     except Exception as e:
         duration = (time.time() - start_time) * 1000
         logger.error(
@@ -1,8 +1,9 @@
 from firebase_functions import https_fn
-from firebase_admin import firestore
 import json
 import time
 from utils.logger import logger
+from utils.tracing import span, traced
+from repositories import get_review_repository
 
 
 def get_cors_headers():
@@ -17,6 +18,7 @@ def get_cors_headers():
 
 
 @https_fn.on_request()
+@traced
 def vote_review(req: https_fn.Request) -> https_fn.Response:
     """
     Increment vote count for a review
@@ -56,13 +58,10 @@ def vote_review(req: https_fn.Request) -> https_fn.Response:
                 headers=get_cors_headers()
             )
         
-        # Update vote count in Firestore
-        db = firestore.client()
-        review_ref = db.collection('reviews').document(review_id)
-        
-        # Check if review exists
-        review_doc = review_ref.get()
-        if not review_doc.exists:
+        # Increment voteCount by 1; a missing review fails the update itself,
+        # so no read is needed beforehand
+        review_doc = get_review_repository().increment_votes(review_id)
+        if review_doc is None:
             logger.warning("Review not found", review_id=review_id)
             return https_fn.Response(
                 json.dumps({"error": f"Review with ID '{review_id}' not found"}),
@@ -70,19 +69,13 @@ def vote_review(req: https_fn.Request) -> https_fn.Response:
                 headers=get_cors_headers()
             )
         
-        # Increment voteCount by 1
-        review_ref.update({
-            'voteCount': firestore.Increment(1)
-        })
-        
         logger.log_firestore_operation(
             operation="increment_vote",
             collection="reviews",
             document_id=review_id
         )
         
-        # Get updated review
-        updated_review = review_ref.get().to_dict()
+        updated_review = review_doc.to_dict()
         updated_review['id'] = review_id
         
         # Convert timestamp to ISO format
@@ -97,15 +90,18 @@ def vote_review(req: https_fn.Request) -> https_fn.Response:
             new_vote_count=updated_review.get('voteCount', 0)
         )
         
-        return https_fn.Response(
-            json.dumps({
+        with span('serialize'):
+            body = json.dumps({
                 "message": "Vote added successfully",
                 "review": updated_review
-            }),
+            })
+        
+        return https_fn.Response(
+            body,
             status=200,
             headers=get_cors_headers()
         )
-        
+    
     except Exception as e:
         duration = (time.time() - start_time) * 1000
         logger.error(
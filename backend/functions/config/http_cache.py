@@ -0,0 +1,58 @@
+# HTTP Caching Configuration
+#
+# Successful responses of the read endpoints carry a Cache-Control header so
+# browsers and the Firebase Hosting CDN can serve them without reaching a
+# function instance:
+# - max-age is how long a browser reuses a response
+# - s-maxage is how long a shared cache (the CDN) reuses it
+# - stale-while-revalidate is how much longer a stale response may be served
+#   while a fresh one is fetched in the background
+# Responses also carry surrogate keys naming the entities they contain.
+# Writes send purge hints with the keys they invalidate; vote counts are not
+# purged and are at most s-maxage + stale-while-revalidate seconds old.
+
+import os
+
+
+# Set to false to send no caching headers or purge hints at all
+HTTP_CACHE_ENABLED = os.environ.get('HTTP_CACHE', 'true').lower() == 'true'
+
+# Request headers a cached response varies on; CORS allows every origin, so
+# Origin is not one of them
+CACHE_VARY = 'Accept-Encoding'
+
+# Cache lifetimes (seconds) by endpoint (handler function name); endpoints
+# not listed are not cacheable
+CACHE_POLICIES = {
+    'get_entities': {
+        'max_age': 60,
+        's_maxage': 300,
+        'stale_while_revalidate': 600
+    },
+    'get_reviews': {
+        'max_age': 30,
+        's_maxage': 120,
+        'stale_while_revalidate': 300
+    }
+}
+
+
+def get_cache_policy(endpoint):
+    """
+    Cache lifetimes for an endpoint
+    
+    Environment variables override single values, e.g.
+    CACHE_GET_REVIEWS_S_MAXAGE=60.
+    
+    Returns:
+        dict or None: max_age, s_maxage and stale_while_revalidate, or None
+                      if the endpoint is not cacheable
+    """
+    policy = CACHE_POLICIES.get(endpoint)
+    if policy is None:
+        return None
+    
+    return {
+        name: int(os.environ.get(f"CACHE_{endpoint.upper()}_{name.upper()}", seconds))
+        for name, seconds in policy.items()
+    }
@@ -0,0 +1,59 @@
+# Log Sampling Configuration
+#
+# Log lines written while a traced request is handled are held back until the
+# request finishes, then kept or dropped as a whole per level:
+# - ERROR and CRITICAL lines are always kept
+# - every line of a request that failed (5xx) or was slow is kept
+# - otherwise a line is kept when the request's trace ID falls inside the
+#   sample rate for its endpoint and level
+# Sampled lines carry a sample_weight field (1 / rate) so counts built from
+# the logs can be scaled back up.
+
+import os
+
+
+# Set to false to write every log line as it happens
+LOG_SAMPLING_ENABLED = os.environ.get('LOG_SAMPLING', 'true').lower() == 'true'
+
+# Requests at least this slow (ms) keep all their log lines
+SLOW_REQUEST_MS = float(os.environ.get('LOG_SLOW_REQUEST_MS', '1000'))
+
+# Slow request thresholds (ms) that differ from SLOW_REQUEST_MS, by endpoint
+ENDPOINT_SLOW_REQUEST_MS = {}
+
+# Share of requests whose lines are kept, by level, for endpoints without
+# their own rates
+DEFAULT_SAMPLE_RATES = {
+    'DEBUG': 1.0,
+    'INFO': 1.0,
+    'WARNING': 1.0
+}
+
+# Rates for high-volume endpoints (handler function names); levels not
+# listed use DEFAULT_SAMPLE_RATES
+ENDPOINT_SAMPLE_RATES = {
+    'get_entities': {
+        'DEBUG': 0.01,
+        'INFO': 0.1
+    },
+    'get_reviews': {
+        'DEBUG': 0.01,
+        'INFO': 0.1
+    }
+}
+
+
+def get_sample_rate(endpoint, level_name):
+    """
+    Share of requests to endpoint whose level_name lines are kept
+    
+    Returns:
+        float: Between 0 and 1
+    """
+    rates = ENDPOINT_SAMPLE_RATES.get(endpoint, {})
+    return rates.get(level_name, DEFAULT_SAMPLE_RATES.get(level_name, 1.0))
+
+
+def get_slow_request_ms(endpoint):
+    """Latency (ms) above which every line of a request to endpoint is kept"""
+    return ENDPOINT_SLOW_REQUEST_MS.get(endpoint, SLOW_REQUEST_MS)
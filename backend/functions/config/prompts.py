@@ -1,5 +1,9 @@
 # OpenAI Review Summary Prompt Template
 
+# Bump whenever a prompt below changes. The version is part of every summary
+# cache key, so cached summaries from older prompts are never served.
+PROMPT_VERSION = "1"
+
 # System prompt for the AI to follow
 SYSTEM_PROMPT = """You are a helpful assistant that summarizes student reviews for university entities.
 Your summaries should be:
@@ -23,6 +27,29 @@ Reviews:
 
 Provide a concise 2-3 sentence summary that captures the main sentiment and common themes from these reviews. Focus on the most frequently mentioned aspects."""
 
+# Map step for entities with too many reviews for one prompt: summarize one chunk
+CHUNK_SUMMARY_PROMPT = """Summarize part {part} of {part_count} of the reviews for {entity_name} ({entity_type}).
+
+Reviews:
+{reviews_text}
+
+List the main praises and complaints in 3-5 short bullet points, noting roughly how often each comes up."""
+
+# Reduce step: combine the chunk summaries into the final summary
+FINAL_SUMMARY_PROMPT = """Summarize the reviews for {entity_name} ({entity_type}).
+
+Entity Details:
+- Name: {entity_name}
+- Type: {entity_type}
+- Average Rating: {avg_rating}/5
+- Total Reviews: {review_count}
+
+The following notes each summarize a part of {selected_count} representative reviews:
+
+{chunk_summaries}
+
+Provide a concise 2-3 sentence summary that captures the main sentiment and common themes across all parts. Focus on the most frequently mentioned aspects."""
+
 # Template for formatting individual reviews
 REVIEW_FORMAT = """Review {index} (Rating: {rating}/5):
 {description}
@@ -2,6 +2,7 @@
 # To get started, simply uncomment the below code or create your own.
 # Deploy with `firebase deploy`
 
+import os
 from firebase_functions.options import set_global_options
 from firebase_admin import initialize_app
 
@@ -20,19 +21,35 @@ set_global_options(
 
 initialize_app()
 
+# Serve the HTTP endpoints from one "api" function (see api/gateway.py):
+# "off" (default), "on" (next to the separate functions) or "only"
+# (instead of them; trigger_summaries always stays separate)
+API_GATEWAY = os.environ.get('API_GATEWAY', 'off').lower()
+
 # Import all API endpoints
-from api.health import healthcheck
-from api.entities import get_entities
-from api.create_entity import create_entity
-from api.delete_entity import delete_entity
-from api.reviews import create_review
-from api.get_reviews import get_reviews
-from api.delete_review import delete_review
-from api.vote_review import vote_review
+if API_GATEWAY != 'only':
+    from api.health import healthcheck
+    from api.entities import get_entities
+    from api.create_entity import create_entity
+    from api.bulk_create_entities import bulk_create_entities
+    from api.delete_entity import delete_entity
+    from api.reviews import create_review
+    from api.get_reviews import get_reviews
+    from api.delete_review import delete_review
+    from api.vote_review import vote_review
+    from api.metrics import metrics
 from api.trigger_summaries import trigger_summaries
 
+if API_GATEWAY in ('on', 'only'):
+    from api.gateway import api
+
 # Import Firestore triggers
 from triggers.update_rating import update_entity_rating
+from triggers.process_deletion_job import process_deletion_job
 
 # Import scheduled functions
 from scheduled.generate_summaries import generate_summaries
+from scheduled.resume_deletion_jobs import resume_deletion_jobs
+
+# Import task queue functions
+from tasks.process_summary_shard import process_summary_shard
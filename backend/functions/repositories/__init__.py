@@ -0,0 +1,14 @@
+# Data access layer for entities and reviews
+from .base import Document, Query, EntityRepository, ReviewRepository, EntityWriter
+from .provider import get_entity_repository, get_review_repository, set_repositories
+
+__all__ = [
+    'Document',
+    'Query',
+    'EntityRepository',
+    'ReviewRepository',
+    'EntityWriter',
+    'get_entity_repository',
+    'get_review_repository',
+    'set_repositories'
+]
@@ -0,0 +1,268 @@
+"""
+Data access interfaces for entities and reviews
+Handlers, triggers and the summarizer read and write the entities and
+reviews collections only through an EntityRepository and a
+ReviewRepository, never through firestore.client() directly. Queries are
+built like Firestore queries (where, order_by, limit, start_after, select)
+and return Document objects, so the Firestore implementation and the
+in-memory one (for local runs and benchmarks) are interchangeable.
+"""
+
+
+# Filter operators every implementation supports
+QUERY_OPERATORS = ('==', '!=', '<', '<=', '>', '>=', 'in', 'array_contains')
+
+# Field name that refers to the document ID in filters and orderings
+DOCUMENT_ID_FIELD = '__name__'
+
+
+class Document:
+    """
+    A stored document: ID, data and last update time
+    
+    Has the parts of a Firestore DocumentSnapshot the code relies on, so
+    code written against snapshots keeps working.
+    """
+    
+    __slots__ = ('id', 'update_time', 'source', '_data')
+    
+    exists = True
+    
+    def __init__(self, document_id, data, update_time=None, source=None):
+        self.id = document_id
+        self.update_time = update_time
+        # Snapshot the document was read from, when there is one (Firestore
+        # cursors need it)
+        self.source = source
+        self._data = data
+    
+    def to_dict(self):
+        """Return a copy of the document's fields"""
+        return dict(self._data)
+    
+    def get(self, field, default=None):
+        return self._data.get(field, default)
+    
+    def __repr__(self):
+        return f"Document({self.id!r})"
+
+
+class Query:
+    """
+    Immutable query over a repository's collection
+    
+    Every builder method returns a new query. Semantics follow Firestore:
+    documents without an ordered field are left out, ties are broken by
+    document ID, start_after takes a Document from an earlier page (or a
+    dict of the ordered fields' values), and `__name__` filters and
+    orderings use the document ID.
+    """
+    
+    def __init__(self, repository, filters=(), orders=(), limit_count=None, cursor=None, fields=None):
+        self.repository = repository
+        self.filters = tuple(filters)
+        self.orders = tuple(orders)
+        self.limit_count = limit_count
+        self.cursor = cursor
+        self.fields = fields
+    
+    def _copy(self, **changes):
+        values = {
+            'filters': self.filters,
+            'orders': self.orders,
+            'limit_count': self.limit_count,
+            'cursor': self.cursor,
+            'fields': self.fields
+        }
+        values.update(changes)
+        return Query(self.repository, **values)
+    
+    def where(self, field, op, value):
+        if op not in QUERY_OPERATORS:
+            raise ValueError(f"Unsupported query operator '{op}', must be one of: {', '.join(QUERY_OPERATORS)}")
+        return self._copy(filters=self.filters + ((field, op, value),))
+    
+    def order_by(self, field, descending=False):
+        return self._copy(orders=self.orders + ((field, descending),))
+    
+    def limit(self, count):
+        return self._copy(limit_count=count)
+    
+    def start_after(self, cursor):
+        return self._copy(cursor=cursor)
+    
+    def select(self, fields):
+        """Only fetch these fields; select([]) fetches document IDs only"""
+        return self._copy(fields=list(fields))
+    
+    def get(self):
+        """Run the query and return all matching documents"""
+        return self.repository.run_query(self)
+    
+    def stream(self):
+        """Iterate over matching documents as they are read"""
+        return self.repository.stream_query(self)
+    
+    def count(self):
+        """Number of matching documents (limit applies, cursors and select do not)"""
+        return self.repository.count_query(self)
+
+
+class Repository:
+    """Operations shared by the entity and review repositories"""
+    
+    # Collection the repository stores its documents in
+    collection = None
+    
+    def get(self, document_id):
+        """
+        Read one document
+        
+        Returns:
+            Document or None: The document, or None if it does not exist
+        """
+        raise NotImplementedError
+    
+    def query(self):
+        """Return a Query over the whole collection"""
+        return Query(self)
+    
+    def run_query(self, query):
+        raise NotImplementedError
+    
+    def stream_query(self, query):
+        raise NotImplementedError
+    
+    def count_query(self, query):
+        raise NotImplementedError
+    
+    def update(self, document_id, fields, last_update_time=None):
+        """
+        Update fields of an existing document
+        
+        Values may be firestore.SERVER_TIMESTAMP, firestore.DELETE_FIELD or
+        firestore.Increment(n).
+        
+        Args:
+            last_update_time: Optional update time the document must still have
+        
+        Raises:
+            NotFound: If the document does not exist
+            FailedPrecondition: If last_update_time no longer matches
+        """
+        raise NotImplementedError
+
+
+class EntityWriter:
+    """
+    Queues many entity updates and applies them in bulk
+    
+    Updates with a last_update_time that no longer matches are recorded in
+    deferred_ids, updates that keep failing in failed_ids. Safe to share
+    between threads.
+    """
+    
+    def __init__(self):
+        self.deferred_ids = []
+        self.failed_ids = []
+    
+    def update(self, entity_id, fields, last_update_time=None):
+        raise NotImplementedError
+    
+    def close(self):
+        """Apply every queued update and wait for them"""
+        raise NotImplementedError
+
+
+class EntityRepository(Repository):
+    """Entities, their ID counters and the duplicate-detection name index"""
+    
+    collection = 'entities'
+    
+    def create(self, entity_type, entity_doc, allow_duplicate=False):
+        """
+        Check for duplicates, allocate the next ID and create the entity atomically
+        
+        Returns:
+            tuple: (entity_id, possible duplicate matches)
+        
+        Raises:
+            DuplicateEntityError: If a likely duplicate exists and allow_duplicate is False
+            AlreadyExists: If the allocated ID is still taken after resyncing the counter
+        """
+        raise NotImplementedError
+    
+    def reserve_ids(self, counts):
+        """
+        Reserve contiguous ID ranges for several entity types at once
+        
+        Reserved IDs are free: a counter that fell behind the existing
+        entities is moved past them first.
+        
+        Args:
+            counts: Dict mapping entity type to the number of IDs to reserve
+        
+        Returns:
+            dict: Entity type -> reserved entity IDs in ascending order
+        """
+        raise NotImplementedError
+    
+    def create_batch(self, entity_docs_by_id):
+        """Create up to 500 entities with reserved IDs in one atomic write"""
+        raise NotImplementedError
+    
+    def index_names(self, entity_docs_by_id):
+        """Add entities to the name index of their types"""
+        raise NotImplementedError
+    
+    def delete(self, entity_id, entity_type=None):
+        """Delete an entity and remove it from its type's name index together"""
+        raise NotImplementedError
+    
+    def writer(self, max_attempts=5):
+        """Return an EntityWriter for bulk updates"""
+        raise NotImplementedError
+
+
+class ReviewRepository(Repository):
+    """Reviews, queried mostly by entity"""
+    
+    collection = 'reviews'
+    
+    def for_entity(self, entity_id):
+        """Query over one entity's reviews"""
+        return self.query().where('entityId', '==', entity_id)
+    
+    def add(self, review_data):
+        """
+        Create a review with a generated ID
+        
+        Returns:
+            Document: The review as stored, with server timestamps resolved
+        """
+        raise NotImplementedError
+    
+    def increment_votes(self, review_id, amount=1):
+        """
+        Add to a review's vote count
+        
+        Returns:
+            Document or None: The updated review, or None if it does not exist
+        """
+        raise NotImplementedError
+    
+    def delete(self, review_id):
+        raise NotImplementedError
+    
+    def count_for_entity(self, entity_id):
+        """Number of reviews of an entity"""
+        return self.for_entity(entity_id).count()
+    
+    def delete_page_for_entity(self, entity_id, page_size):
+        """
+        Delete up to page_size of an entity's reviews
+        
+        Returns:
+            int: Number of reviews deleted (0 once none are left)
+        """
+        raise NotImplementedError
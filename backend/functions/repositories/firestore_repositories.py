@@ -0,0 +1,308 @@
+"""
+Firestore implementation of the entity and review repositories
+Every Firestore call is timed as a span named "firestore.<collection>.<operation>",
+which also feeds the Firestore operation metrics.
+"""
+import threading
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, NotFound
+from repositories.base import (
+    DOCUMENT_ID_FIELD,
+    Document,
+    EntityRepository,
+    EntityWriter,
+    ReviewRepository
+)
+from utils.entity_ids import reserve_entity_id_ranges, reserve_entity_ids, resync_entity_counter
+from utils.entity_index import (
+    DuplicateEntityError,
+    find_similar_entities,
+    index_entities,
+    read_name_index,
+    unindex_entity
+)
+from utils.logger import logger
+from utils.tracing import span
+
+
+# gRPC status code of a failed write precondition
+FAILED_PRECONDITION_CODE = 9
+
+# Attempts at creating an entity; an allocated ID that is already taken
+# means the counter fell behind, so it is resynced before the next attempt
+CREATE_ATTEMPTS = 3
+
+
+def to_document(snapshot):
+    """Wrap a DocumentSnapshot as a Document"""
+    return Document(snapshot.id, snapshot.to_dict() or {}, snapshot.update_time, snapshot)
+
+
+@firestore.transactional
+def create_entity_in_transaction(transaction, db, entity_type, entity_doc, allow_duplicate=False):
+    """
+    Check for duplicates, allocate the next ID and create the entity atomically
+    
+    Returns:
+        tuple: (entity_id, possible duplicate matches)
+    
+    Raises:
+        DuplicateEntityError: If a likely duplicate exists and allow_duplicate is False
+    """
+    # All reads must happen before any transaction writes
+    index_entries = read_name_index(db, entity_type, transaction=transaction)
+    matches = find_similar_entities(index_entries, entity_doc['name'], entity_doc.get('location'))
+    
+    if matches and matches[0]['duplicate'] and not allow_duplicate:
+        raise DuplicateEntityError(matches[0])
+    
+    entity_id = reserve_entity_ids(transaction, db, entity_type)[0]
+    entity_ref = db.collection('entities').document(entity_id)
+    
+    # create() fails instead of overwriting if the document already exists
+    transaction.create(entity_ref, entity_doc)
+    index_entities(transaction, db, entity_type, {entity_id: entity_doc})
+    
+    return entity_id, matches
+
+
+@firestore.transactional
+def reserve_ids_in_transaction(transaction, db, counts):
+    """
+    Reserve contiguous ID ranges for every requested type in one transaction
+    
+    The ranges are checked against existing entities, since bulk creation
+    writes them in several batches and cannot retry a batch part-way.
+    """
+    return reserve_entity_id_ranges(transaction, db, counts, check_taken=True)
+
+
+class FirestoreRepository:
+    """Reads, queries and updates shared by the Firestore repositories"""
+    
+    def __init__(self, db=None):
+        # Without a client, firestore.client() is looked up on every call
+        self._db = db
+    
+    @property
+    def db(self):
+        return self._db or firestore.client()
+    
+    def _collection(self):
+        return self.db.collection(self.collection)
+    
+    def _span(self, operation):
+        return span(f"firestore.{self.collection}.{operation}")
+    
+    def get(self, document_id):
+        with self._span('get'):
+            snapshot = self._collection().document(document_id).get()
+        return to_document(snapshot) if snapshot.exists else None
+    
+    def _cursor(self, query):
+        cursor = query.cursor
+        if isinstance(cursor, Document):
+            if cursor.source is not None:
+                return cursor.source
+            return {field: cursor.get(field) for field, _ in query.orders}
+        return cursor
+    
+    def build_query(self, query, paged=True):
+        """Translate a Query into a Firestore query (without cursor, fields and limit if not paged)"""
+        collection_ref = self._collection()
+        result = collection_ref
+        
+        for field, op, value in query.filters:
+            if field == DOCUMENT_ID_FIELD:
+                value = [collection_ref.document(item) for item in value] if op == 'in' else collection_ref.document(value)
+            result = result.where(field, op, value)
+        
+        for field, descending in query.orders:
+            result = result.order_by(
+                field,
+                direction=firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+            )
+        
+        if paged:
+            if query.fields is not None:
+                result = result.select(query.fields)
+            if query.cursor is not None:
+                result = result.start_after(self._cursor(query))
+        if query.limit_count is not None:
+            result = result.limit(query.limit_count)
+        
+        return result
+    
+    def run_query(self, query):
+        with self._span('query'):
+            return [to_document(snapshot) for snapshot in self.build_query(query).stream()]
+    
+    def stream_query(self, query):
+        for snapshot in self.build_query(query).stream():
+            yield to_document(snapshot)
+    
+    def count_query(self, query):
+        # Server-side aggregation, no documents are read
+        with self._span('count'):
+            result = self.build_query(query, paged=False).count().get()
+        return int(result[0][0].value)
+    
+    def update(self, document_id, fields, last_update_time=None):
+        option = self.db.write_option(last_update_time=last_update_time) if last_update_time else None
+        with self._span('update'):
+            self._collection().document(document_id).update(fields, option=option)
+
+
+class FirestoreEntityWriter(EntityWriter):
+    """
+    Entity updates sent in the background through a BulkWriter
+    
+    Writes go out in batches instead of one round trip per entity.
+    Precondition failures are not retried; other failures are retried up
+    to max_attempts times.
+    """
+    
+    def __init__(self, db, max_attempts):
+        super().__init__()
+        self.max_attempts = max_attempts
+        self._db = db
+        self._entities_ref = db.collection('entities')
+        self._lock = threading.Lock()
+        self._bulk_writer = db.bulk_writer()
+        self._bulk_writer.on_write_error(self._on_write_error)
+    
+    def _on_write_error(self, failure, bulk_writer):
+        if failure.code == FAILED_PRECONDITION_CODE:
+            self.deferred_ids.append(failure.operation.reference.id)
+            return False
+        if failure.attempts < self.max_attempts:
+            return True
+        self.failed_ids.append(failure.operation.reference.id)
+        return False
+    
+    def update(self, entity_id, fields, last_update_time=None):
+        option = self._db.write_option(last_update_time=last_update_time) if last_update_time else None
+        with self._lock:
+            self._bulk_writer.update(self._entities_ref.document(entity_id), fields, option=option)
+    
+    def close(self):
+        with span('firestore.entities.bulk_update'):
+            self._bulk_writer.close()
+
+
+class FirestoreEntityRepository(FirestoreRepository, EntityRepository):
+    """Entities stored in the entities collection"""
+    
+    def create(self, entity_type, entity_doc, allow_duplicate=False):
+        db = self.db
+        for attempt in range(1, CREATE_ATTEMPTS + 1):
+            try:
+                with self._span('create_transaction'):
+                    return create_entity_in_transaction(
+                        db.transaction(),
+                        db,
+                        entity_type,
+                        entity_doc,
+                        allow_duplicate=allow_duplicate
+                    )
+            except AlreadyExists:
+                if attempt == CREATE_ATTEMPTS:
+                    raise
+                with span('firestore.entityCounters.resync_transaction'):
+                    last_index = resync_entity_counter(db.transaction(), db, entity_type)
+                logger.warning(
+                    "Allocated entity ID already exists, counter resynced",
+                    entity_type=entity_type,
+                    last_index=last_index,
+                    attempt=attempt
+                )
+    
+    def reserve_ids(self, counts):
+        db = self.db
+        with span('firestore.entityCounters.reserve_transaction'):
+            return reserve_ids_in_transaction(db.transaction(), db, counts)
+    
+    def create_batch(self, entity_docs_by_id):
+        batch = self.db.batch()
+        entities_ref = self._collection()
+        for entity_id, entity_doc in entity_docs_by_id.items():
+            batch.create(entities_ref.document(entity_id), entity_doc)
+        
+        with self._span('batch_commit'):
+            batch.commit()
+    
+    def index_names(self, entity_docs_by_id):
+        # One index document write per type
+        docs_by_type = {}
+        for entity_id, entity_doc in entity_docs_by_id.items():
+            docs_by_type.setdefault(entity_doc['type'], {})[entity_id] = entity_doc
+        
+        db = self.db
+        batch = db.batch()
+        for entity_type, docs_by_id in docs_by_type.items():
+            index_entities(batch, db, entity_type, docs_by_id)
+        with span('firestore.entityNameIndex.batch_commit'):
+            batch.commit()
+    
+    def delete(self, entity_id, entity_type=None):
+        db = self.db
+        batch = db.batch()
+        batch.delete(self._collection().document(entity_id))
+        if entity_type:
+            unindex_entity(batch, db, entity_type, entity_id)
+        with self._span('delete'):
+            batch.commit()
+    
+    def writer(self, max_attempts=5):
+        return FirestoreEntityWriter(self.db, max_attempts)
+
+
+class FirestoreReviewRepository(FirestoreRepository, ReviewRepository):
+    """Reviews stored in the reviews collection"""
+    
+    def add(self, review_data):
+        review_ref = self._collection().document()
+        with self._span('set'):
+            review_ref.set(review_data)
+        
+        # Read back for the server timestamps
+        with self._span('readback'):
+            return to_document(review_ref.get())
+    
+    def increment_votes(self, review_id, amount=1):
+        review_ref = self._collection().document(review_id)
+        try:
+            with self._span('update'):
+                review_ref.update({'voteCount': firestore.Increment(amount)})
+        except NotFound:
+            return None
+        
+        with self._span('readback'):
+            return to_document(review_ref.get())
+    
+    def delete(self, review_id):
+        with self._span('delete'):
+            self._collection().document(review_id).delete()
+    
+    def delete_page_for_entity(self, entity_id, page_size):
+        # Only document IDs are needed, so fetch no fields
+        query = self.build_query(self.for_entity(entity_id).select([]).limit(page_size))
+        with self._span('query'):
+            page = list(query.stream())
+        
+        if not page:
+            return 0
+        
+        bulk_writer = self.db.bulk_writer()
+        for review_doc in page:
+            bulk_writer.delete(review_doc.reference)
+        with self._span('bulk_delete'):
+            bulk_writer.close()
+        
+        logger.log_firestore_operation(
+            "bulk_delete",
+            "reviews",
+            entity_id=entity_id,
+            batch_size=len(page)
+        )
+        return len(page)
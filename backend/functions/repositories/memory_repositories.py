@@ -0,0 +1,498 @@
+"""
+In-memory implementation of the entity and review repositories
+For local runs, load tests and benchmarks without a Firebase project.
+Documents live in dicts with hash indexes on the fields queries filter on
+(entity type and summaryStale, review entityId), so an equality query only
+visits matching documents. Query results follow Firestore semantics: type
+ordering of mixed values, documents missing an ordered field left out, ties
+broken by document ID, and start_after cursors. Writes resolve the
+SERVER_TIMESTAMP, DELETE_FIELD and Increment sentinels, and naive datetimes
+are stored as UTC like the Firestore client does.
+
+Nothing is persisted, and there are no Firestore triggers: a review write
+does not update the entity's rating here.
+"""
+import functools
+import random
+import string
+import threading
+from datetime import datetime, timedelta, timezone
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from google.cloud.firestore_v1 import transforms
+from repositories.base import (
+    DOCUMENT_ID_FIELD,
+    Document,
+    EntityRepository,
+    EntityWriter,
+    ReviewRepository
+)
+from utils.entity_ids import format_entity_id, parse_entity_index
+from utils.entity_index import DuplicateEntityError, build_index_entry, find_similar_entities
+from utils.tracing import span
+
+
+# Fields with a hash index, per collection
+INDEXED_FIELDS = {
+    'entities': ('type', 'summaryStale'),
+    'reviews': ('entityId',)
+}
+
+AUTO_ID_ALPHABET = string.ascii_letters + string.digits
+
+_MISSING = object()
+
+
+def type_rank(value):
+    """Position of a value's type in Firestore's cross-type ordering"""
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    return 6
+
+
+def compare_values(a, b):
+    """Compare two field values like Firestore: by type first, then by value"""
+    rank_a = type_rank(a)
+    rank_b = type_rank(b)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    if rank_a == 6:
+        # Maps, arrays and GeoPoints are not ordered against each other here
+        return 0
+    if a == b:
+        return 0
+    return -1 if a < b else 1
+
+
+def index_key(value):
+    """Hashable index key that keeps True and 1 apart, or None if unindexable"""
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return (type_rank(value), value)
+
+
+def get_field(doc_id, data, field):
+    """Read a (dotted) field, with __name__ as the document ID"""
+    if field == DOCUMENT_ID_FIELD:
+        return doc_id
+    value = data
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def matches_filter(value, op, expected):
+    """Whether a stored value satisfies one filter"""
+    if value is _MISSING:
+        return False
+    if op == '==':
+        return type_rank(value) == type_rank(expected) and value == expected
+    if op == '!=':
+        return value is not None and not matches_filter(value, '==', expected)
+    if op == 'in':
+        return any(matches_filter(value, '==', item) for item in expected)
+    if op == 'array_contains':
+        return isinstance(value, list) and any(matches_filter(item, '==', expected) for item in value)
+    
+    # Range filters only match values of the same type
+    if type_rank(value) != type_rank(expected) or type_rank(value) == 6:
+        return False
+    result = compare_values(value, expected)
+    if op == '<':
+        return result < 0
+    if op == '<=':
+        return result <= 0
+    if op == '>':
+        return result > 0
+    return result >= 0
+
+
+def normalize_value(value):
+    """Copy a value for storage, storing naive datetimes as UTC"""
+    if isinstance(value, dict):
+        return {key: normalize_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [normalize_value(item) for item in value]
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class InMemoryCollection:
+    """Documents of one collection with hash indexes on selected fields"""
+    
+    def __init__(self, indexed_fields=()):
+        self.indexed_fields = tuple(indexed_fields)
+        self._docs = {}
+        self._indexes = {field: {} for field in self.indexed_fields}
+        self._lock = threading.RLock()
+        self._last_update_time = None
+    
+    def __len__(self):
+        return len(self._docs)
+    
+    def _next_update_time(self):
+        """Strictly increasing update time, so preconditions see every write"""
+        now = datetime.now(timezone.utc)
+        if self._last_update_time is not None and now <= self._last_update_time:
+            now = self._last_update_time + timedelta(microseconds=1)
+        update_time = DatetimeWithNanoseconds(
+            now.year, now.month, now.day, now.hour, now.minute, now.second,
+            nanosecond=now.microsecond * 1000, tzinfo=timezone.utc
+        )
+        self._last_update_time = update_time
+        return update_time
+    
+    def _index(self, doc_id, data):
+        for field in self.indexed_fields:
+            key = index_key(data.get(field, _MISSING))
+            if key is not None:
+                self._indexes[field].setdefault(key, set()).add(doc_id)
+    
+    def _unindex(self, doc_id, data):
+        for field in self.indexed_fields:
+            key = index_key(data.get(field, _MISSING))
+            ids = self._indexes[field].get(key) if key is not None else None
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._indexes[field][key]
+    
+    def _store(self, doc_id, data):
+        previous = self._docs.get(doc_id)
+        if previous is not None:
+            self._unindex(doc_id, previous[0])
+        self._docs[doc_id] = (data, self._next_update_time())
+        self._index(doc_id, data)
+    
+    def _apply(self, target, fields, now):
+        for key, value in fields.items():
+            if value is transforms.DELETE_FIELD:
+                target.pop(key, None)
+            elif value is transforms.SERVER_TIMESTAMP:
+                target[key] = now
+            elif isinstance(value, transforms.Increment):
+                current = target.get(key)
+                target[key] = (current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0) + value.value
+            else:
+                target[key] = normalize_value(value)
+        return target
+    
+    def document(self, doc_id):
+        """
+        Read one document
+        
+        Returns:
+            Document or None
+        """
+        with self._lock:
+            stored = self._docs.get(doc_id)
+        if stored is None:
+            return None
+        return Document(doc_id, dict(stored[0]), stored[1])
+    
+    def seed(self, documents):
+        """Store documents as-is (dict of ID -> data), replacing existing ones"""
+        with self._lock:
+            for doc_id, data in documents.items():
+                self._store(doc_id, normalize_value(data))
+    
+    def create(self, doc_id, data):
+        with self._lock:
+            if doc_id in self._docs:
+                raise AlreadyExists(f"Document already exists: {doc_id}")
+            self._store(doc_id, self._apply({}, data, datetime.now(timezone.utc)))
+    
+    def update(self, doc_id, fields, last_update_time=None):
+        with self._lock:
+            stored = self._docs.get(doc_id)
+            if stored is None:
+                raise NotFound(f"No document to update: {doc_id}")
+            if last_update_time is not None and stored[1] != last_update_time:
+                raise FailedPrecondition(f"Document {doc_id} was updated since {last_update_time}")
+            self._store(doc_id, self._apply(dict(stored[0]), fields, datetime.now(timezone.utc)))
+    
+    def delete(self, doc_id):
+        with self._lock:
+            stored = self._docs.pop(doc_id, None)
+            if stored is not None:
+                self._unindex(doc_id, stored[0])
+    
+    def _candidate_ids(self, filters):
+        """Smallest set of IDs an index narrows the filters to, or None for a full scan"""
+        best = None
+        for field, op, value in filters:
+            if field == DOCUMENT_ID_FIELD and op in ('==', 'in'):
+                ids = {value} if op == '==' else set(value)
+            elif field in self._indexes and op in ('==', 'in'):
+                values = [value] if op == '==' else value
+                ids = set()
+                for item in values:
+                    key = index_key(item)
+                    ids.update(self._indexes[field].get(key, ()) if key is not None else ())
+            else:
+                continue
+            if best is None or len(ids) < len(best):
+                best = ids
+        return best
+    
+    def _matches(self, query, unbounded=False):
+        """
+        IDs and stored entries matching a query, in query order
+        
+        Args:
+            unbounded: Ignore the cursor and limit
+        """
+        filters = [(field, op, normalize_value(value)) for field, op, value in query.filters]
+        with self._lock:
+            candidate_ids = self._candidate_ids(filters)
+            if candidate_ids is None:
+                candidates = list(self._docs.items())
+            else:
+                candidates = [(doc_id, self._docs[doc_id]) for doc_id in candidate_ids if doc_id in self._docs]
+        
+        results = []
+        for doc_id, stored in candidates:
+            data = stored[0]
+            if all(matches_filter(get_field(doc_id, data, field), op, value) for field, op, value in filters):
+                results.append((doc_id, stored))
+        
+        # Documents missing an ordered field are not returned, as in Firestore
+        orders = [(field, descending) for field, descending in query.orders if field != DOCUMENT_ID_FIELD]
+        if orders:
+            results = [
+                (doc_id, stored) for doc_id, stored in results
+                if all(get_field(doc_id, stored[0], field) is not _MISSING for field, _ in orders)
+            ]
+        
+        # Ties are broken by document ID, in the direction of the last ordering
+        id_descending = query.orders[-1][1] if query.orders else False
+        sort_orders = list(query.orders)
+        if not any(field == DOCUMENT_ID_FIELD for field, _ in sort_orders):
+            sort_orders.append((DOCUMENT_ID_FIELD, id_descending))
+        
+        def compare(a, b):
+            for field, descending in sort_orders:
+                result = compare_values(get_field(a[0], a[1][0], field), get_field(b[0], b[1][0], field))
+                if result:
+                    return -result if descending else result
+            return 0
+        
+        results.sort(key=functools.cmp_to_key(compare))
+        
+        if unbounded:
+            return results
+        
+        if query.cursor is not None:
+            results = self._after_cursor(results, query.cursor, sort_orders)
+        if query.limit_count is not None:
+            results = results[:query.limit_count]
+        return results
+    
+    def _after_cursor(self, results, cursor, sort_orders):
+        """Drop results at or before a cursor"""
+        if isinstance(cursor, Document):
+            cursor_values = [get_field(cursor.id, cursor.to_dict(), field) for field, _ in sort_orders]
+            compared_orders = sort_orders
+        else:
+            # A dict cursor only names the explicitly ordered fields
+            compared_orders = [(field, descending) for field, descending in sort_orders if field in cursor]
+            cursor_values = [cursor[field] for field, _ in compared_orders]
+        
+        def after(entry):
+            for (field, descending), cursor_value in zip(compared_orders, cursor_values):
+                result = compare_values(get_field(entry[0], entry[1][0], field), cursor_value)
+                if result:
+                    return (result < 0) if descending else (result > 0)
+            return False
+        
+        for position, entry in enumerate(results):
+            if after(entry):
+                return results[position:]
+        return []
+    
+    def run(self, query):
+        documents = []
+        for doc_id, (data, update_time) in self._matches(query):
+            if query.fields is not None:
+                data = {field: data[field] for field in query.fields if field in data}
+            documents.append(Document(doc_id, dict(data), update_time))
+        return documents
+    
+    def count(self, query):
+        results = self._matches(query, unbounded=True)
+        if query.limit_count is not None:
+            return min(len(results), query.limit_count)
+        return len(results)
+
+
+class InMemoryRepository:
+    """Reads, queries and updates shared by the in-memory repositories"""
+    
+    def __init__(self, documents=None):
+        self.store = InMemoryCollection(INDEXED_FIELDS.get(self.collection, ()))
+        if documents:
+            self.store.seed(documents)
+    
+    def _span(self, operation):
+        return span(f"memory.{self.collection}.{operation}")
+    
+    def get(self, document_id):
+        with self._span('get'):
+            return self.store.document(document_id)
+    
+    def run_query(self, query):
+        with self._span('query'):
+            return self.store.run(query)
+    
+    def stream_query(self, query):
+        return iter(self.store.run(query))
+    
+    def count_query(self, query):
+        with self._span('count'):
+            return self.store.count(query)
+    
+    def update(self, document_id, fields, last_update_time=None):
+        with self._span('update'):
+            self.store.update(document_id, fields, last_update_time)
+
+
+class InMemoryEntityWriter(EntityWriter):
+    """Applies each entity update immediately, recording rejected ones"""
+    
+    def __init__(self, repository):
+        super().__init__()
+        self.repository = repository
+        self._lock = threading.Lock()
+    
+    def update(self, entity_id, fields, last_update_time=None):
+        try:
+            self.repository.store.update(entity_id, fields, last_update_time)
+        except FailedPrecondition:
+            with self._lock:
+                self.deferred_ids.append(entity_id)
+        except NotFound:
+            with self._lock:
+                self.failed_ids.append(entity_id)
+    
+    def close(self):
+        pass
+
+
+class InMemoryEntityRepository(InMemoryRepository, EntityRepository):
+    """
+    Entities kept in memory
+    
+    ID counters start after the highest seeded ID of each type, and the name
+    index is built from the seeded entities.
+    """
+    
+    def __init__(self, documents=None):
+        super().__init__(documents)
+        self._counters = {}
+        self._name_index = {}
+        self._lock = threading.Lock()
+        self.index_names(documents or {})
+    
+    def _reserve(self, entity_type, count):
+        if entity_type not in self._counters:
+            type_ids = self.store.run(self.query().where('type', '==', entity_type).select([]))
+            indexes = [parse_entity_index(entity_type, doc.id) for doc in type_ids]
+            self._counters[entity_type] = max([index for index in indexes if index is not None], default=0)
+        
+        last_index = self._counters[entity_type]
+        self._counters[entity_type] = last_index + count
+        return [format_entity_id(entity_type, index) for index in range(last_index + 1, last_index + count + 1)]
+    
+    def create(self, entity_type, entity_doc, allow_duplicate=False):
+        with self._span('create'), self._lock:
+            index_entries = self._name_index.get(entity_type, {})
+            matches = find_similar_entities(index_entries, entity_doc['name'], entity_doc.get('location'))
+            
+            if matches and matches[0]['duplicate'] and not allow_duplicate:
+                raise DuplicateEntityError(matches[0])
+            
+            entity_id = self._reserve(entity_type, 1)[0]
+            self.store.create(entity_id, entity_doc)
+            self._name_index.setdefault(entity_type, {})[entity_id] = build_index_entry(entity_doc)
+        
+        return entity_id, matches
+    
+    def reserve_ids(self, counts):
+        with self._lock:
+            return {entity_type: self._reserve(entity_type, count) for entity_type, count in counts.items()}
+    
+    def create_batch(self, entity_docs_by_id):
+        with self._span('batch_create'), self._lock:
+            existing = [entity_id for entity_id in entity_docs_by_id if self.store.document(entity_id) is not None]
+            if existing:
+                raise AlreadyExists(f"Documents already exist: {', '.join(existing)}")
+            for entity_id, entity_doc in entity_docs_by_id.items():
+                self.store.create(entity_id, entity_doc)
+    
+    def index_names(self, entity_docs_by_id):
+        with self._lock:
+            for entity_id, entity_doc in entity_docs_by_id.items():
+                if entity_doc.get('type'):
+                    self._name_index.setdefault(entity_doc['type'], {})[entity_id] = build_index_entry(entity_doc)
+    
+    def delete(self, entity_id, entity_type=None):
+        with self._span('delete'), self._lock:
+            self.store.delete(entity_id)
+            if entity_type:
+                self._name_index.get(entity_type, {}).pop(entity_id, None)
+    
+    def writer(self, max_attempts=5):
+        return InMemoryEntityWriter(self)
+
+
+class InMemoryReviewRepository(InMemoryRepository, ReviewRepository):
+    """Reviews kept in memory, indexed by entity"""
+    
+    def __init__(self, documents=None, seed=None):
+        super().__init__(documents)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def _auto_id(self):
+        with self._lock:
+            return ''.join(self._random.choice(AUTO_ID_ALPHABET) for _ in range(20))
+    
+    def add(self, review_data):
+        review_id = self._auto_id()
+        with self._span('set'):
+            self.store.create(review_id, review_data)
+        return self.store.document(review_id)
+    
+    def increment_votes(self, review_id, amount=1):
+        try:
+            with self._span('update'):
+                self.store.update(review_id, {'voteCount': transforms.Increment(amount)})
+        except NotFound:
+            return None
+        return self.store.document(review_id)
+    
+    def delete(self, review_id):
+        with self._span('delete'):
+            self.store.delete(review_id)
+    
+    def delete_page_for_entity(self, entity_id, page_size):
+        with self._span('bulk_delete'):
+            page = self.store.run(self.for_entity(entity_id).select([]).limit(page_size))
+            for review_doc in page:
+                self.store.delete(review_doc.id)
+        return len(page)
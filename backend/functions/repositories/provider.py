@@ -0,0 +1,55 @@
+"""
+Shared repository instances
+get_entity_repository() and get_review_repository() return the
+implementation selected by the DATA_BACKEND environment variable. Tests,
+benchmarks and local servers can install their own with set_repositories().
+"""
+import os
+import threading
+
+
+# Which repositories are used: 'firestore' or 'memory' (seeded from backend/data)
+DATA_BACKEND = os.environ.get('DATA_BACKEND', 'firestore')
+
+_repositories = None
+_repositories_lock = threading.Lock()
+
+
+def _create_repositories():
+    if DATA_BACKEND == 'memory':
+        from repositories.seed import create_memory_repositories
+        return create_memory_repositories()
+    
+    from repositories.firestore_repositories import FirestoreEntityRepository, FirestoreReviewRepository
+    return FirestoreEntityRepository(), FirestoreReviewRepository()
+
+
+def _get_repositories():
+    global _repositories
+    with _repositories_lock:
+        if _repositories is None:
+            _repositories = _create_repositories()
+        return _repositories
+
+
+def get_entity_repository():
+    """Return the shared EntityRepository"""
+    return _get_repositories()[0]
+
+
+def get_review_repository():
+    """Return the shared ReviewRepository"""
+    return _get_repositories()[1]
+
+
+def set_repositories(entities, reviews):
+    """
+    Replace the shared repositories
+    
+    Args:
+        entities: EntityRepository to use from now on
+        reviews: ReviewRepository to use from now on
+    """
+    global _repositories
+    with _repositories_lock:
+        _repositories = (entities, reviews)
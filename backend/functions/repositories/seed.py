@@ -0,0 +1,139 @@
+"""
+Seed data for the in-memory repositories
+Builds entity and review documents from backend/data/*.json, with the entity
+IDs and fields of the scripts/seed_*.py scripts. The catalog can be scaled up
+with copies of every entity, and synthetic reviews (sampled from the seeded
+review texts) can be added so every entity has something to summarize.
+"""
+import json
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+
+# Directory with the seed JSON files (backend/data in the repository)
+DATA_DIR = os.environ.get(
+    'SEED_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+)
+
+# Entity files, in seeding order: (file name, entity type, ID prefix, ID width)
+ENTITY_FILES = (
+    ('canteen.json', 'CANTEEN', 'C', 2),
+    ('classroom.json', 'CLASSROOM', 'CR', 3),
+    ('dorm.json', 'DORM', 'D', 2),
+    ('professor.json', 'PROFESSOR', 'P', 3),
+    ('toilet.json', 'TOILET', 'T', 3)
+)
+
+REVIEW_FILES = ('professor-reviews.json', 'toilet-reviews.json')
+
+# Entity fields kept from the data files
+ENTITY_FIELDS = (
+    'name', 'description', 'avgRating', 'ratingCount', 'building', 'zone',
+    'floor', 'capacity', 'cubicles', 'features'
+)
+
+
+def load_json(file_name):
+    with open(os.path.join(DATA_DIR, file_name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_entity(record, entity_type):
+    tags = record.get('tags') or []
+    if isinstance(tags, dict):
+        tags = list(tags.values())
+    
+    entity = {field: record[field] for field in ENTITY_FIELDS if field in record}
+    entity.update({
+        'type': entity_type,
+        'tags': tags,
+        'createdAt': datetime.now(timezone.utc)
+    })
+    return entity
+
+
+def build_review(record):
+    return {
+        'entityId': record['entityId'],
+        'authorName': record['authorName'],
+        'rating': record['rating'],
+        'voteCount': record.get('voteCount', 0),
+        'tags': record.get('tags', []),
+        'description': record.get('description', ''),
+        'subratings': record.get('subratings', {}),
+        'createdAt': datetime.fromisoformat(record['createdAt'])
+    }
+
+
+def copy_id(entity_id, copy_index):
+    """ID of the n-th copy of an entity; the first copy keeps the seeded ID"""
+    return entity_id if copy_index == 0 else f"{entity_id}-{copy_index}"
+
+
+def build_dataset(copies=1, reviews_per_entity=0, seed=0):
+    """
+    Build entity and review documents
+    
+    Args:
+        copies: Number of copies of the seeded catalog (1 = as seeded)
+        reviews_per_entity: Synthetic reviews added to every entity
+        seed: Random seed for the synthetic reviews
+    
+    Returns:
+        tuple: (entities, reviews), each a dict of document ID -> data
+    """
+    rng = random.Random(seed)
+    seeded_entities = {}
+    for file_name, entity_type, prefix, width in ENTITY_FILES:
+        for index, record in enumerate(load_json(file_name), start=1):
+            seeded_entities[f"{prefix}{index:0{width}d}"] = build_entity(record, entity_type)
+    
+    seeded_reviews = [build_review(record) for file_name in REVIEW_FILES for record in load_json(file_name)]
+    
+    entities = {}
+    reviews = {}
+    for copy_index in range(copies):
+        for entity_id, entity in seeded_entities.items():
+            entities[copy_id(entity_id, copy_index)] = dict(entity)
+        
+        for review in seeded_reviews:
+            if review['entityId'] in seeded_entities:
+                reviews[str(uuid.UUID(int=rng.getrandbits(128)))] = {
+                    **review,
+                    'entityId': copy_id(review['entityId'], copy_index)
+                }
+    
+    now = datetime.now(timezone.utc)
+    for entity_id in entities:
+        for _ in range(reviews_per_entity):
+            template = rng.choice(seeded_reviews)
+            reviews[str(uuid.UUID(int=rng.getrandbits(128)))] = {
+                **template,
+                'entityId': entity_id,
+                'rating': rng.randint(1, 5),
+                'voteCount': rng.randint(0, 20),
+                'createdAt': now - timedelta(days=rng.randint(0, 365))
+            }
+    
+    return entities, reviews
+
+
+def create_memory_repositories(copies=1, reviews_per_entity=0, seed=0):
+    """
+    Create in-memory repositories seeded from the data files
+    
+    Args:
+        copies: Number of copies of the seeded catalog (1 = as seeded)
+        reviews_per_entity: Synthetic reviews added to every entity
+        seed: Random seed for the synthetic reviews and generated review IDs
+    
+    Returns:
+        tuple: (InMemoryEntityRepository, InMemoryReviewRepository)
+    """
+    from repositories.memory_repositories import InMemoryEntityRepository, InMemoryReviewRepository
+    
+    entities, reviews = build_dataset(copies, reviews_per_entity, seed)
+    return InMemoryEntityRepository(entities), InMemoryReviewRepository(reviews, seed=seed)
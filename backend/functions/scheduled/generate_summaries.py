@@ -2,11 +2,18 @@
 Scheduled function to generate review summaries twice per day
 Runs at 6 AM and 6 PM SGT (UTC+8)
 """
+import os
 from firebase_functions import scheduler_fn
-from utils.summarizer import generate_summaries_for_all_entities
 from utils.logger import logger
 
 
+# 'sync' summarizes each entity with a chat completion during the run;
+# 'batch' submits stale entities to the Batch API and applies the results
+# of earlier batches on the next run; 'sharded' fans stale entities out to
+# checkpointed process_summary_shard tasks
+SUMMARY_MODE = os.environ.get('SUMMARY_MODE', 'sync')
+
+
 @scheduler_fn.on_schedule(
     schedule="0 6,18 * * *",  # Runs at 6 AM and 6 PM daily (cron format)
     timezone="Asia/Singapore",
@@ -16,22 +23,48 @@ from utils.logger import logger
 )
 def generate_summaries(event: scheduler_fn.ScheduledEvent) -> None:
     """
-    Scheduled function to generate summaries for all entities
+    Scheduled function to generate summaries for entities whose reviews changed
     Runs twice daily at 6 AM and 6 PM Singapore time
     """
-    logger.info("Starting scheduled summary generation")
+    # Imported here so other functions' cold starts skip the summarizer stack
+    from utils.summarizer import generate_summaries_for_all_entities
+    from utils.summary_batch import run_summary_batch_cycle
+    from utils.summary_runs import start_summary_run
+    
+    logger.info("Starting scheduled summary generation", mode=SUMMARY_MODE)
     
     try:
-        # Process all entities (no limit for scheduled runs)
-        stats = generate_summaries_for_all_entities(limit=None)
+        if SUMMARY_MODE == 'batch':
+            stats = run_summary_batch_cycle()
+            
+            # Both stat dicts have deferred_count, so they are logged nested
+            logger.info(
+                "Scheduled summary batch run completed",
+                collected=stats['collected'],
+                submitted=stats['submitted']
+            )
+            return
+        
+        if SUMMARY_MODE == 'sharded':
+            run = start_summary_run(incremental=True)
+            
+            logger.info("Scheduled sharded summary run dispatched", **run)
+            return
+        
+        # Process only entities whose reviews changed (no limit for scheduled runs)
+        stats = generate_summaries_for_all_entities(limit=None, incremental=True)
         
         logger.info(
             "Scheduled summary generation completed",
             success_count=stats['success_count'],
+            fallback_count=stats['fallback_count'],
             error_count=stats['error_count'],
-            skipped_count=stats['skipped_count']
+            skipped_count=stats['skipped_count'],
+            unchanged_count=stats['unchanged_count'],
+            deferred_count=stats['deferred_count'],
+            aborted_count=stats['aborted_count']
         )
-        
+    
     except Exception as e:
         logger.error(
             "Error in scheduled summary generation",
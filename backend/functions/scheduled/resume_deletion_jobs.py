@@ -0,0 +1,28 @@
+"""
+Scheduled function to re-fire stalled entity deletion jobs
+Runs every 30 minutes
+"""
+from firebase_functions import scheduler_fn
+from firebase_admin import firestore
+from utils.entity_deletion import resume_stale_deletion_jobs
+from utils.logger import logger
+
+
+@scheduler_fn.on_schedule(
+    schedule="*/30 * * * *",
+    timezone="Asia/Singapore",
+)
+def resume_deletion_jobs(event: scheduler_fn.ScheduledEvent) -> None:
+    """
+    Re-queue deletion jobs that have not moved for STALE_JOB_SECONDS
+    
+    Covers jobs whose trigger was dropped (stuck in 'pending') and jobs
+    whose worker died (stuck in 'running'); otherwise their entities stay
+    flagged as deleting until someone deletes or polls them again.
+    """
+    try:
+        resumed = resume_stale_deletion_jobs(firestore.client())
+        logger.info("Deletion job sweep completed", resumed_count=len(resumed))
+    except Exception as e:
+        logger.error("Error resuming deletion jobs", error=e)
+        raise
@@ -0,0 +1 @@
+# Task queue functions module
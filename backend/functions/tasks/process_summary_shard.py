@@ -0,0 +1,50 @@
+import os
+from firebase_functions import tasks_fn
+from firebase_functions.options import RetryConfig, RateLimits
+from utils.logger import logger
+
+
+# Shards processed at the same time. Each instance has its own OpenAI rate
+# limiter, so the account quota is shared by up to this many instances
+MAX_CONCURRENT_SHARDS = int(os.environ.get('SUMMARY_MAX_CONCURRENT_SHARDS', '4'))
+
+
+@tasks_fn.on_task_dispatched(
+    retry_config=RetryConfig(max_attempts=5, min_backoff_seconds=60),
+    rate_limits=RateLimits(max_concurrent_dispatches=MAX_CONCURRENT_SHARDS),
+    secrets=["OPENAI_API_KEY"],
+    memory=512,
+    timeout_sec=540
+)
+def process_summary_shard(req: tasks_fn.CallableRequest) -> None:
+    """
+    Summarize one shard of a summary run.
+    
+    Trigger: Cloud Tasks queue, enqueued by start_summary_run
+    
+    Payload: {"runId": ..., "shardId": ..., "generation": ...}
+    
+    Resumes from the shard's saved cursor. When the time budget runs out the
+    shard re-enqueues itself; if the invocation is killed, the Cloud Tasks
+    retry resumes from the last checkpoint.
+    """
+    # Imported here so other functions' cold starts skip the summarizer stack
+    from utils.summary_runs import handle_summary_shard_task
+    
+    payload = req.data or {}
+    
+    logger.info(
+        "Summary shard task received",
+        run_id=payload.get('runId'),
+        shard_id=payload.get('shardId'),
+        generation=payload.get('generation')
+    )
+    
+    outcome = handle_summary_shard_task(payload)
+    
+    logger.info(
+        "Summary shard task finished",
+        run_id=payload.get('runId'),
+        shard_id=payload.get('shardId'),
+        outcome=outcome
+    )
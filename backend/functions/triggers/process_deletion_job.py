@@ -0,0 +1,121 @@
+import time
+import uuid
+from firebase_functions import firestore_fn
+from firebase_admin import firestore
+from utils.entity_deletion import (
+    DELETION_JOBS_COLLECTION,
+    claim_deletion_job,
+    delete_entity_reviews,
+    delete_entity_document
+)
+from utils.http_cache import entity_keys, entity_reviews_key, log_purge_hint
+from utils.logger import logger
+
+
+# Stop deleting this long before the function timeout so progress can be saved
+JOB_TIMEOUT_SEC = 540
+JOB_TIME_BUDGET_SEC = 480
+
+
+@firestore_fn.on_document_written(
+    document="deletionJobs/{jobId}",
+    region="asia-southeast1",
+    memory=512,
+    timeout_sec=JOB_TIMEOUT_SEC
+)
+def process_deletion_job(event: firestore_fn.Event[firestore_fn.Change[firestore_fn.DocumentSnapshot]]) -> None:
+    """
+    Run a cascading entity deletion job in the background.
+    
+    Trigger: Firestore document write on deletionJobs/{jobId}
+    
+    Only acts when the job status is 'pending'. The job is claimed by moving
+    it to 'running' in a transaction, so a duplicate delivery of the trigger
+    exits instead of deleting alongside it. The entity's reviews are deleted
+    in batches, with progress saved to the job document after each batch.
+    If the time budget runs out, the job is set back to 'pending', which
+    fires this trigger again to resume. Once every review is gone the
+    entity document itself is deleted. A job whose trigger was dropped is
+    re-fired by the resume_deletion_jobs schedule.
+    """
+    job_id = event.params.get('jobId')
+    after = event.data.after
+    
+    if not after or not after.exists:
+        return
+    
+    if after.to_dict().get('status') != 'pending':
+        return
+    
+    db = firestore.client()
+    job_ref = db.collection(DELETION_JOBS_COLLECTION).document(job_id)
+    deadline = time.monotonic() + JOB_TIME_BUDGET_SEC
+    worker_id = uuid.uuid4().hex
+    
+    job_data = claim_deletion_job(db.transaction(), job_ref, worker_id)
+    if job_data is None:
+        logger.info("Deletion job already claimed", job_id=job_id)
+        return
+    
+    entity_id = job_data.get('entityId')
+    already_deleted = job_data.get('deletedReviews', 0)
+    
+    try:
+        logger.info("Deletion job started", job_id=job_id, entity_id=entity_id, worker_id=worker_id)
+        
+        def save_progress(deleted_count):
+            job_ref.update({
+                'deletedReviews': already_deleted + deleted_count,
+                'updatedAt': firestore.SERVER_TIMESTAMP
+            })
+        
+        deleted_count, finished = delete_entity_reviews(
+            entity_id,
+            deadline=deadline,
+            on_progress=save_progress
+        )
+        
+        if not finished:
+            # Hand the rest to a fresh invocation
+            job_ref.update({'status': 'pending', 'updatedAt': firestore.SERVER_TIMESTAMP})
+            logger.info(
+                "Deletion job paused, re-queued",
+                job_id=job_id,
+                entity_id=entity_id,
+                deleted_reviews=already_deleted + deleted_count
+            )
+            return
+        
+        delete_entity_document(entity_id, job_data.get('entityType'))
+        log_purge_hint(
+            entity_keys(entity_id, job_data.get('entityType')) + [entity_reviews_key(entity_id)],
+            entity_id=entity_id,
+            job_id=job_id
+        )
+        
+        job_ref.update({
+            'status': 'completed',
+            'deletedReviews': already_deleted + deleted_count,
+            'completedAt': firestore.SERVER_TIMESTAMP,
+            'updatedAt': firestore.SERVER_TIMESTAMP
+        })
+        
+        logger.info(
+            "Deletion job completed",
+            job_id=job_id,
+            entity_id=entity_id,
+            deleted_reviews=already_deleted + deleted_count
+        )
+    
+    except Exception as e:
+        logger.error(
+            "Error processing deletion job",
+            error=e,
+            job_id=job_id,
+            entity_id=entity_id
+        )
+        job_ref.update({
+            'status': 'failed',
+            'error': str(e),
+            'updatedAt': firestore.SERVER_TIMESTAMP
+        })
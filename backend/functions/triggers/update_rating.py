@@ -1,6 +1,34 @@
 from firebase_functions import firestore_fn
-from firebase_admin import firestore
+from config.prompts import NO_REVIEWS_SUMMARY, ERROR_SUMMARY
+from utils.extractive_summarizer import ExtractiveSummarizer
 from utils.logger import logger
+from utils.http_cache import entity_keys, log_purge_hint
+from repositories import get_entity_repository, get_review_repository
+
+
+# Review fields that feed into the AI summary
+SUMMARY_FIELDS = ('rating', 'description', 'tags')
+
+
+def review_content_changed(before, after):
+    """Whether a review write changed anything the summary is built from"""
+    before_data = before.to_dict() if before and before.exists else None
+    after_data = after.to_dict() if after and after.exists else None
+    
+    # Created or deleted
+    if before_data is None or after_data is None:
+        return True
+    
+    # Updated - vote count changes alone do not affect the summary
+    return any(before_data.get(field) != after_data.get(field) for field in SUMMARY_FIELDS)
+
+
+def needs_instant_summary(entity_data):
+    """Whether the entity has no real summary yet, or only a local one"""
+    return (
+        entity_data.get('reviewSummary') in (None, NO_REVIEWS_SUMMARY, ERROR_SUMMARY)
+        or entity_data.get('summarySource') == ExtractiveSummarizer.name
+    )
 
 
 @firestore_fn.on_document_written(
@@ -18,6 +46,9 @@ def update_entity_rating(event: firestore_fn.Event[firestore_fn.Change[firestore
     2. Queries all reviews for that entity
     3. Calculates the average rating and count
     4. Updates the entity document with new avgRating and ratingCount
+    5. Marks the entity summaryStale if the review's content changed
+    6. Writes an instant local extractive summary if the entity has no AI
+       summary yet; the next summary run replaces it
     """
     # Initialize entity_id outside try block to avoid unbound variable error
     entity_id = None
@@ -52,17 +83,31 @@ def update_entity_rating(event: firestore_fn.Event[firestore_fn.Change[firestore
             logger.warning("Could not determine entityId from review", review_id=event.params['reviewId'])
             return
         
+        entities = get_entity_repository()
+        
+        # Skip recomputation while the entity is being cascade-deleted,
+        # otherwise every cascaded review delete would re-aggregate it
+        entity_doc = entities.get(entity_id)
+        entity_data = entity_doc.to_dict() if entity_doc is not None else None
+        if not entity_data or entity_data.get('deleting'):
+            logger.info(
+                "Entity deleted or being deleted, skipping rating update",
+                entity_id=entity_id,
+                review_id=event.params['reviewId']
+            )
+            return
+        
         # Get all reviews for this entity
-        db = firestore.client()
-        reviews_ref = db.collection('reviews')
-        reviews = reviews_ref.where('entityId', '==', entity_id).stream()
+        reviews = get_review_repository().for_entity(entity_id).stream()
         
         # Calculate average rating and count
         total_rating = 0
         review_count = 0
+        review_list = []
         
         for review in reviews:
             review_data = review.to_dict()
+            review_list.append(review_data)
             rating = review_data.get('rating', 0)
             if rating is not None:
                 total_rating += rating
@@ -72,11 +117,26 @@ def update_entity_rating(event: firestore_fn.Event[firestore_fn.Change[firestore
         avg_rating = round(total_rating / review_count, 2) if review_count > 0 else 0
         
         # Update the entity document
-        entity_ref = db.collection('entities').document(entity_id)
-        entity_ref.update({
+        entity_update = {
             'avgRating': avg_rating,
             'ratingCount': review_count
-        })
+        }
+        
+        # Flag the entity for the next incremental summary run
+        if review_content_changed(before, after):
+            entity_update['summaryStale'] = True
+            
+            # Local summary in milliseconds, so the entity does not show an
+            # empty summary until the next scheduled run
+            if review_list and needs_instant_summary(entity_data):
+                entity_update['reviewSummary'] = ExtractiveSummarizer().summarize(entity_data, review_list)
+                entity_update['summarySource'] = ExtractiveSummarizer.name
+        
+        entities.update(entity_id, entity_update)
+        
+        # Cached entity responses only go stale if something they show changed
+        if any(entity_data.get(field) != value for field, value in entity_update.items()):
+            log_purge_hint(entity_keys(entity_id, entity_data.get('type')), entity_id=entity_id)
         
         logger.info(
             "Entity rating updated",
@@ -85,7 +145,7 @@ def update_entity_rating(event: firestore_fn.Event[firestore_fn.Change[firestore
             rating_count=review_count,
             review_id=event.params['reviewId']
         )
-        
+    
     except Exception as e:
         logger.error(
             "Error updating entity rating",
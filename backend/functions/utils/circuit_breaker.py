@@ -0,0 +1,111 @@
+"""
+Thread-safe circuit breaker
+Stops calling a dependency that keeps failing, so an outage fails fast instead
+of every caller waiting out its own timeouts and retries.
+"""
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a call while the circuit is open"""
+    
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker with closed, open and half-open states
+    
+    After `failure_threshold` consecutive failures the circuit opens and
+    every call fails immediately for `reset_timeout` seconds. Then a single
+    trial call is let through (half-open): success closes the circuit,
+    failure opens it again.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        if failure_threshold < 1:
+            raise ValueError("Circuit breaker failure threshold must be at least 1")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    def is_open(self) -> bool:
+        """True while calls are being rejected"""
+        return self.state == self.OPEN
+    
+    def before_call(self):
+        """
+        Reserve permission for a call
+        
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with the
+                              trial call already in flight
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial_in_flight:
+                raise CircuitOpenError(self.name, max(0.0, remaining))
+            
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+    
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+    
+    def call(self, func, *args, is_failure=None, **kwargs):
+        """
+        Call func through the breaker
+        
+        Args:
+            func: Callable to run
+            is_failure: Optional predicate on a raised exception; exceptions it
+                        rejects (e.g. bad requests) do not count as failures
+        
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_failure is None or is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
@@ -0,0 +1,215 @@
+"""
+Cascading entity deletion
+Deletes an entity together with all of its reviews. Small entities are deleted
+inline; large ones are handed to a resumable background job tracked by a
+progress document in deletionJobs/{jobId}. Entities and reviews go through
+the repositories; the job documents are always in Firestore.
+"""
+import time
+from firebase_admin import firestore
+from repositories import get_entity_repository, get_review_repository
+from utils.logger import logger
+
+
+DELETION_JOBS_COLLECTION = 'deletionJobs'
+
+# Entities with at most this many reviews are deleted within the request
+SYNC_DELETE_MAX_REVIEWS = 300
+
+# Number of review IDs fetched per page while deleting
+REVIEW_DELETE_PAGE_SIZE = 500
+
+# A pending or running job whose progress has not moved for this long is
+# considered dead (its trigger was dropped or its worker died)
+STALE_JOB_SECONDS = 600
+
+
+def count_entity_reviews(entity_id):
+    """Count an entity's reviews (a server-side aggregation query on Firestore)"""
+    return get_review_repository().count_for_entity(entity_id)
+
+
+def mark_entity_deleting(entity_id, job_id=None):
+    """
+    Flag an entity as being deleted
+    
+    The rating trigger skips recomputation for reviews of a flagged entity,
+    so cascaded review deletes do not each re-aggregate the entity.
+    """
+    update = {'deleting': True}
+    if job_id:
+        update['deletionJobId'] = job_id
+    get_entity_repository().update(entity_id, update)
+
+
+def delete_entity_reviews(entity_id, deadline=None, on_progress=None):
+    """
+    Delete an entity's reviews page by page
+    
+    Args:
+        entity_id: Entity whose reviews are deleted
+        deadline: Optional time.monotonic() value after which to stop early
+        on_progress: Optional callback(deleted_so_far) called after each page
+    
+    Returns:
+        tuple: (deleted_count, finished) - finished is False if the deadline hit
+    """
+    reviews = get_review_repository()
+    deleted_count = 0
+    
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            return deleted_count, False
+        
+        page_count = reviews.delete_page_for_entity(entity_id, REVIEW_DELETE_PAGE_SIZE)
+        if not page_count:
+            return deleted_count, True
+        
+        deleted_count += page_count
+        
+        if on_progress:
+            on_progress(deleted_count)
+
+
+def delete_entity_document(entity_id, entity_type):
+    """Delete the entity document and remove it from the name index together"""
+    get_entity_repository().delete(entity_id, entity_type)
+
+
+def delete_entity_cascade(entity_id, entity_type):
+    """
+    Delete an entity and all of its reviews within the current request
+    
+    Returns:
+        int: Number of reviews deleted
+    """
+    mark_entity_deleting(entity_id)
+    deleted_count, _ = delete_entity_reviews(entity_id)
+    delete_entity_document(entity_id, entity_type)
+    return deleted_count
+
+
+def start_deletion_job(db, entity_id, entity_data, review_count):
+    """
+    Create a background deletion job for an entity
+    
+    The job document is processed by the process_deletion_job trigger.
+    
+    Returns:
+        str: Job ID
+    """
+    job_ref = db.collection(DELETION_JOBS_COLLECTION).document()
+    
+    # Flag the entity before the job exists so the rating trigger never sees
+    # a cascaded delete for an unflagged entity
+    mark_entity_deleting(entity_id, job_ref.id)
+    
+    job_ref.set({
+        'entityId': entity_id,
+        'entityType': entity_data.get('type'),
+        'entityName': entity_data.get('name'),
+        'status': 'pending',
+        'totalReviews': review_count,
+        'deletedReviews': 0,
+        'createdAt': firestore.SERVER_TIMESTAMP,
+        'updatedAt': firestore.SERVER_TIMESTAMP
+    })
+    
+    logger.info(
+        "Entity deletion job created",
+        job_id=job_ref.id,
+        entity_id=entity_id,
+        review_count=review_count
+    )
+    
+    return job_ref.id
+
+
+@firestore.transactional
+def claim_deletion_job(transaction, job_ref, worker_id):
+    """
+    Move a pending job to running for one worker
+    
+    The trigger can be delivered more than once; only the delivery that
+    claims the job runs it.
+    
+    Returns:
+        dict or None: Job data, or None if the job is not pending
+    """
+    job_doc = job_ref.get(transaction=transaction)
+    if not job_doc.exists:
+        return None
+    
+    job_data = job_doc.to_dict()
+    if job_data.get('status') != 'pending':
+        return None
+    
+    transaction.update(job_ref, {
+        'status': 'running',
+        'workerId': worker_id,
+        'claimedAt': firestore.SERVER_TIMESTAMP,
+        'updatedAt': firestore.SERVER_TIMESTAMP
+    })
+    return job_data
+
+
+def is_stale_deletion_job(job_data):
+    """Whether a pending or running job has made no progress for STALE_JOB_SECONDS"""
+    updated_at = job_data.get('updatedAt')
+    return (
+        job_data.get('status') in ('pending', 'running')
+        and updated_at is not None
+        and time.time() - updated_at.timestamp() > STALE_JOB_SECONDS
+    )
+
+
+def requeue_deletion_job(job_ref):
+    """Set a job back to pending; the write re-fires the job trigger"""
+    job_ref.update({'status': 'pending', 'updatedAt': firestore.SERVER_TIMESTAMP})
+
+
+def resume_deletion_job_if_stale(db, job_id, retry_failed=True):
+    """
+    Re-queue a deletion job that failed, whose trigger was dropped or whose
+    worker died mid-run
+    
+    Args:
+        retry_failed: Also re-queue a failed job
+    
+    Returns:
+        dict or None: Current job data, or None if the job does not exist
+    """
+    job_ref = db.collection(DELETION_JOBS_COLLECTION).document(job_id)
+    job_doc = job_ref.get()
+    
+    if not job_doc.exists:
+        return None
+    
+    job_data = job_doc.to_dict()
+    
+    if is_stale_deletion_job(job_data) or (retry_failed and job_data.get('status') == 'failed'):
+        requeue_deletion_job(job_ref)
+        logger.warning("Resuming deletion job", job_id=job_id, previous_status=job_data.get('status'))
+        job_data['status'] = 'pending'
+    
+    return job_data
+
+
+def resume_stale_deletion_jobs(db):
+    """
+    Re-queue every stale pending or running job
+    
+    Returns:
+        list: IDs of the re-queued jobs
+    """
+    query = db.collection(DELETION_JOBS_COLLECTION).where('status', 'in', ['pending', 'running'])
+    
+    resumed = []
+    for job_doc in query.stream():
+        if is_stale_deletion_job(job_doc.to_dict()):
+            requeue_deletion_job(job_doc.reference)
+            resumed.append(job_doc.id)
+    
+    if resumed:
+        logger.warning("Resumed stale deletion jobs", job_ids=resumed)
+    return resumed
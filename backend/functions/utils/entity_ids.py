@@ -0,0 +1,195 @@
+"""
+Entity ID allocation backed by per-type counter documents
+Each entity type has a counter at entityCounters/{TYPE} holding the last
+allocated numeric index, so allocating an ID is a single document read and
+write inside the transaction that creates the entity.
+"""
+from firebase_admin import firestore
+from utils.logger import logger
+
+
+COUNTERS_COLLECTION = 'entityCounters'
+
+# Prefix for each entity type
+ENTITY_ID_PREFIXES = {
+    'CANTEEN': 'C',
+    'DORM': 'D',
+    'CLASSROOM': 'CR',
+    'PROFESSOR': 'P',
+    'TOILET': 'T'
+}
+
+# Zero-padding width of the numeric part for each entity type
+ENTITY_ID_WIDTHS = {
+    'CANTEEN': 2,
+    'DORM': 2,
+    'CLASSROOM': 3,
+    'PROFESSOR': 3,
+    'TOILET': 3
+}
+
+
+def format_entity_id(entity_type, index):
+    """Format a numeric index as an entity ID (e.g. P001, C01, CR001)"""
+    prefix = ENTITY_ID_PREFIXES[entity_type]
+    width = ENTITY_ID_WIDTHS[entity_type]
+    return f"{prefix}{index:0{width}d}"
+
+
+def parse_entity_index(entity_type, doc_id):
+    """
+    Extract the numeric index from an entity ID
+    
+    Returns:
+        int or None: The index, or None if the ID does not follow the type's format
+    """
+    prefix = ENTITY_ID_PREFIXES[entity_type]
+    if not doc_id.startswith(prefix):
+        return None
+    try:
+        return int(doc_id[len(prefix):])
+    except ValueError:
+        return None
+
+
+def find_max_entity_index(db, entity_type, transaction=None):
+    """
+    Scan all entities of a type for the highest numeric index
+    
+    This is O(N) in the number of entities and is only used to seed a
+    missing counter document or resync one that fell behind.
+    """
+    query = (
+        db.collection('entities')
+        .where('type', '==', entity_type)
+        .select([])
+        .stream(transaction=transaction)
+    )
+    
+    max_index = 0
+    for doc in query:
+        index = parse_entity_index(entity_type, doc.id)
+        if index is not None:
+            max_index = max(max_index, index)
+    
+    return max_index
+
+
+def find_taken_entity_ids(transaction, db, entity_ids):
+    """Return the entity IDs that already have a document (one batched read)"""
+    entities_ref = db.collection('entities')
+    snapshots = db.get_all([entities_ref.document(entity_id) for entity_id in entity_ids], transaction=transaction)
+    return [snapshot.id for snapshot in snapshots if snapshot.exists]
+
+
+def reserve_entity_id_ranges(transaction, db, counts, check_taken=False):
+    """
+    Reserve contiguous ranges of entity IDs for several types inside a transaction
+    
+    Reads each type's counter document and advances it by the requested count.
+    Because the counters are read and written in the same transaction,
+    concurrent callers are serialized by Firestore and can never receive
+    overlapping ranges. All counters are read before any write, as Firestore
+    transactions require.
+    
+    Args:
+        transaction: Active Firestore transaction
+        db: Firestore client
+        counts: Dict mapping entity type to the number of IDs to reserve
+        check_taken: Read the candidate IDs first and move a type's range
+                     past its highest existing ID if any is taken (a counter
+                     that fell behind), so callers that write the IDs in
+                     several batches never fail part-way
+    
+    Returns:
+        dict: Entity type -> reserved entity IDs in ascending order
+    """
+    counters_ref = db.collection(COUNTERS_COLLECTION)
+    
+    last_indexes = {}
+    seeded = set()
+    for entity_type in counts:
+        counter_doc = counters_ref.document(entity_type).get(transaction=transaction)
+        
+        if counter_doc.exists:
+            last_indexes[entity_type] = counter_doc.get('lastIndex') or 0
+        else:
+            # Counter not migrated yet - seed it from the existing IDs once,
+            # scanning inside the transaction so the seed is consistent
+            last_indexes[entity_type] = find_max_entity_index(db, entity_type, transaction=transaction)
+            seeded.add(entity_type)
+            logger.warning(
+                "Entity counter missing, seeded from existing entities",
+                entity_type=entity_type,
+                last_index=last_indexes[entity_type]
+            )
+    
+    if check_taken:
+        for entity_type, count in counts.items():
+            last_index = last_indexes[entity_type]
+            candidate_ids = [
+                format_entity_id(entity_type, index)
+                for index in range(last_index + 1, last_index + count + 1)
+            ]
+            taken_ids = find_taken_entity_ids(transaction, db, candidate_ids)
+            if taken_ids:
+                last_indexes[entity_type] = max(
+                    last_index,
+                    find_max_entity_index(db, entity_type, transaction=transaction)
+                )
+                logger.warning(
+                    "Entity counter behind existing IDs, resynced",
+                    entity_type=entity_type,
+                    taken_ids=taken_ids[:10],
+                    last_index=last_indexes[entity_type]
+                )
+    
+    reserved = {}
+    for entity_type, count in counts.items():
+        last_index = last_indexes[entity_type]
+        counter = {
+            'type': entity_type,
+            'lastIndex': last_index + count
+        }
+        if entity_type in seeded:
+            # create() makes a concurrent seed of the same counter fail
+            # instead of both writing the same range
+            transaction.create(counters_ref.document(entity_type), counter)
+        else:
+            transaction.set(counters_ref.document(entity_type), counter)
+        reserved[entity_type] = [
+            format_entity_id(entity_type, index)
+            for index in range(last_index + 1, last_index + count + 1)
+        ]
+    
+    return reserved
+
+
+def reserve_entity_ids(transaction, db, entity_type, count=1):
+    """
+    Reserve a contiguous range of entity IDs for one type inside a transaction
+    
+    Returns:
+        list: Reserved entity IDs in ascending order
+    """
+    return reserve_entity_id_ranges(transaction, db, {entity_type: count})[entity_type]
+
+
+@firestore.transactional
+def resync_entity_counter(transaction, db, entity_type):
+    """
+    Move a type's counter past the highest existing entity ID
+    
+    Used when an allocated ID turns out to be taken (e.g. entities seeded
+    with explicit IDs). The counter never moves backwards.
+    
+    Returns:
+        int: The counter's new lastIndex
+    """
+    counter_ref = db.collection(COUNTERS_COLLECTION).document(entity_type)
+    counter_doc = counter_ref.get(transaction=transaction)
+    current = (counter_doc.get('lastIndex') if counter_doc.exists else 0) or 0
+    
+    last_index = max(current, find_max_entity_index(db, entity_type, transaction=transaction))
+    transaction.set(counter_ref, {'type': entity_type, 'lastIndex': last_index})
+    return last_index
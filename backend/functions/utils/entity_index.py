@@ -0,0 +1,204 @@
+"""
+Normalized entity name index for near-duplicate detection
+Each entity type has one index document at entityNameIndex/{TYPE} holding a
+map of entity ID -> normalized name and location, so checking a new name
+against every existing entity of the type costs a single document read.
+"""
+import math
+import re
+import unicodedata
+from firebase_admin import firestore
+
+
+NAME_INDEX_COLLECTION = 'entityNameIndex'
+
+# Trigram similarity at or above which two names are considered duplicates
+DUPLICATE_SIMILARITY = 0.8
+
+# Trigram similarity at or above which a possible duplicate is reported as a warning
+WARNING_SIMILARITY = 0.5
+
+# Entities with matching names further apart than this are not duplicates
+# (e.g. "Level 1 Toilet" in two different buildings)
+DUPLICATE_MAX_DISTANCE_M = 250
+
+# Maximum number of possible duplicates reported back to the client
+MAX_REPORTED_MATCHES = 5
+
+# Words that do not distinguish entity names
+STOPWORDS = {'the', 'a', 'an', 'of', 'and', 'at'}
+
+
+class DuplicateEntityError(Exception):
+    """Raised when a new entity is a likely duplicate of an existing one"""
+    
+    def __init__(self, match):
+        super().__init__(f"Entity looks like a duplicate of '{match['id']}'")
+        self.match = match
+
+
+def normalize_entity_name(name):
+    """
+    Normalize an entity name for comparison
+    
+    Casefolds, strips accents and punctuation, drops stopwords and collapses
+    whitespace, so "The Deck!" and "deck" normalize to the same key.
+    """
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[^0-9a-z]+', ' ', text.casefold())
+    words = [word for word in text.split() if word not in STOPWORDS]
+    return ' '.join(words)
+
+
+def name_numbers(normalized_name):
+    """
+    Return the numbers in a normalized name, in order
+    
+    Names that differ only by a number ("UTown Auditorium 1" / "2") are
+    distinct entities even though their trigrams are nearly identical.
+    """
+    return re.findall(r'[0-9]+', normalized_name)
+
+
+def name_trigrams(normalized_name):
+    """Return the set of character trigrams of a normalized name"""
+    padded = f"  {normalized_name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(trigrams_a, trigrams_b):
+    """Jaccard similarity between two trigram sets"""
+    if not trigrams_a or not trigrams_b:
+        return 0.0
+    shared = len(trigrams_a & trigrams_b)
+    return shared / (len(trigrams_a) + len(trigrams_b) - shared)
+
+
+def distance_meters(lat_a, lng_a, lat_b, lng_b):
+    """Great-circle distance between two coordinates in meters"""
+    earth_radius_m = 6371000
+    phi_a = math.radians(lat_a)
+    phi_b = math.radians(lat_b)
+    delta_phi = math.radians(lat_b - lat_a)
+    delta_lambda = math.radians(lng_b - lng_a)
+    h = (
+        math.sin(delta_phi / 2) ** 2
+        + math.cos(phi_a) * math.cos(phi_b) * math.sin(delta_lambda / 2) ** 2
+    )
+    return 2 * earth_radius_m * math.asin(math.sqrt(h))
+
+
+def location_coordinates(location):
+    """Extract (latitude, longitude) from a GeoPoint or dict, or None"""
+    if location is None:
+        return None
+    if hasattr(location, 'latitude'):
+        return location.latitude, location.longitude
+    if isinstance(location, dict) and 'latitude' in location and 'longitude' in location:
+        return location['latitude'], location['longitude']
+    return None
+
+
+def build_index_entry(entity_doc):
+    """Build the name index entry stored for an entity"""
+    entry = {
+        'name': entity_doc.get('name', ''),
+        'key': normalize_entity_name(entity_doc.get('name', ''))
+    }
+    coordinates = location_coordinates(entity_doc.get('location'))
+    if coordinates:
+        entry['lat'], entry['lng'] = coordinates
+    return entry
+
+
+def find_similar_entities(index_entries, name, location=None):
+    """
+    Score existing entities in a type's name index against a new name
+    
+    Args:
+        index_entries: Dict of entity ID -> index entry
+        name: Name of the new entity
+        location: Optional GeoPoint or dict of the new entity
+    
+    Returns:
+        list: Matches with similarity >= WARNING_SIMILARITY, best first. Each
+              match is a dict with id, name, similarity, distanceMeters and
+              duplicate (True when the match should block creation).
+    """
+    key = normalize_entity_name(name)
+    trigrams = name_trigrams(key)
+    numbers = name_numbers(key)
+    coordinates = location_coordinates(location)
+    
+    matches = []
+    for entity_id, entry in index_entries.items():
+        entry_key = entry.get('key', '')
+        if entry_key == key:
+            similarity = 1.0
+        else:
+            similarity = trigram_similarity(trigrams, name_trigrams(entry_key))
+        
+        if similarity < WARNING_SIMILARITY:
+            continue
+        
+        distance = None
+        if coordinates and 'lat' in entry and 'lng' in entry:
+            distance = distance_meters(coordinates[0], coordinates[1], entry['lat'], entry['lng'])
+        
+        # Names with different numbers are only reported as warnings
+        duplicate = (
+            similarity >= DUPLICATE_SIMILARITY
+            and name_numbers(entry_key) == numbers
+            and (distance is None or distance <= DUPLICATE_MAX_DISTANCE_M)
+        )
+        
+        matches.append({
+            'id': entity_id,
+            'name': entry.get('name', ''),
+            'similarity': round(similarity, 3),
+            'distanceMeters': round(distance) if distance is not None else None,
+            'duplicate': duplicate
+        })
+    
+    matches.sort(key=lambda match: (not match['duplicate'], -match['similarity']))
+    return matches[:MAX_REPORTED_MATCHES]
+
+
+def get_name_index_ref(db, entity_type):
+    """Return the name index document reference for an entity type"""
+    return db.collection(NAME_INDEX_COLLECTION).document(entity_type)
+
+
+def read_name_index(db, entity_type, transaction=None):
+    """Read a type's name index entries (entity ID -> entry)"""
+    index_doc = get_name_index_ref(db, entity_type).get(transaction=transaction)
+    if not index_doc.exists:
+        return {}
+    return index_doc.to_dict().get('entries', {})
+
+
+def index_entities(writer, db, entity_type, entity_docs_by_id):
+    """
+    Add entities to a type's name index
+    
+    Args:
+        writer: Firestore transaction or write batch
+        db: Firestore client
+        entity_type: Entity type shared by all entities
+        entity_docs_by_id: Dict of entity ID -> entity document
+    """
+    entries = {
+        entity_id: build_index_entry(entity_doc)
+        for entity_id, entity_doc in entity_docs_by_id.items()
+    }
+    writer.set(get_name_index_ref(db, entity_type), {'entries': entries}, merge=True)
+
+
+def unindex_entity(writer, db, entity_type, entity_id):
+    """Remove an entity from a type's name index"""
+    writer.set(
+        get_name_index_ref(db, entity_type),
+        {'entries': {entity_id: firestore.DELETE_FIELD}},
+        merge=True
+    )
@@ -0,0 +1,175 @@
+"""
+Local extractive summarizer
+Scores every review sentence by TF-IDF cosine similarity to the centroid of
+all sentences (vectorized with NumPy) and returns the most central, mutually
+non-redundant sentences. Needs no network calls, so it serves as the fallback
+when OpenAI is unavailable and as the instant first summary of an entity.
+
+NumPy is imported on first use, so modules that only reference
+ExtractiveSummarizer (e.g. the rating trigger) load without it.
+"""
+import re
+from utils.summarizer_backend import SummarizerBackend
+
+
+# Sentences in the summary (fewer are picked when the rest are redundant)
+MAX_SUMMARY_SENTENCES = 3
+
+# Sentences shorter than this many words carry too little to summarize with
+MIN_SENTENCE_WORDS = 4
+
+# Candidate sentences are capped (most voted reviews first) to bound the cost
+MAX_CANDIDATE_SENTENCES = 400
+
+# Vocabulary is capped to the most frequent terms
+MAX_VOCABULARY = 2000
+
+# A sentence this similar to one already picked is skipped as redundant
+REDUNDANCY_THRESHOLD = 0.6
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers him his how i if
+in into is it its itself just me more most my no nor not now of off on once only
+or other our out over own same she should so some such than that the their them
+then there these they this those through to too under until up very was we were
+what when where which while who whom why will with would you your
+""".split())
+
+
+def split_sentences(text):
+    """Split review text into trimmed sentences"""
+    return [sentence.strip() for sentence in SENTENCE_SPLIT.split(text or '') if sentence.strip()]
+
+
+def tokenize(sentence):
+    """Lowercase content words of a sentence"""
+    return [token for token in TOKEN_PATTERN.findall(sentence.lower()) if token not in STOPWORDS]
+
+
+def collect_sentences(reviews):
+    """
+    Gather candidate sentences, most voted reviews first
+    
+    Returns:
+        tuple: (sentences, token lists) of equal length
+    """
+    ordered = sorted(reviews, key=lambda review: review.get('voteCount') or 0, reverse=True)
+    
+    sentences = []
+    token_lists = []
+    for review in ordered:
+        for sentence in split_sentences(review.get('description')):
+            tokens = tokenize(sentence)
+            if len(sentence.split()) < MIN_SENTENCE_WORDS or not tokens:
+                continue
+            sentences.append(sentence)
+            token_lists.append(tokens)
+            if len(sentences) >= MAX_CANDIDATE_SENTENCES:
+                return sentences, token_lists
+    
+    return sentences, token_lists
+
+
+def tfidf_matrix(token_lists):
+    """
+    Build an L2-normalized TF-IDF matrix (sentences x terms)
+    
+    Returns:
+        numpy.ndarray: float32 matrix, one row per sentence
+    """
+    import numpy as np
+    
+    frequencies = {}
+    for tokens in token_lists:
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+    
+    vocabulary = sorted(frequencies, key=frequencies.get, reverse=True)[:MAX_VOCABULARY]
+    term_index = {term: index for index, term in enumerate(vocabulary)}
+    
+    rows = []
+    cols = []
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            col = term_index.get(token)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    
+    counts = np.zeros((len(token_lists), len(vocabulary)), dtype=np.float32)
+    np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+    
+    term_frequency = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1.0)
+    document_frequency = np.count_nonzero(counts, axis=0)
+    inverse_frequency = np.log((1.0 + len(token_lists)) / (1.0 + document_frequency)) + 1.0
+    
+    weights = term_frequency * inverse_frequency.astype(np.float32)
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return weights / np.maximum(norms, 1e-12)
+
+
+def select_central_sentences(matrix, count):
+    """
+    Pick the sentences closest to the centroid, skipping near-duplicates
+    
+    Returns:
+        list: Row indices of the picked sentences, most central first
+    """
+    import numpy as np
+    
+    centroid = matrix.mean(axis=0)
+    centroid /= max(float(np.linalg.norm(centroid)), 1e-12)
+    scores = matrix @ centroid
+    
+    picked = []
+    for index in np.argsort(-scores):
+        if picked and float(np.max(matrix[picked] @ matrix[index])) > REDUNDANCY_THRESHOLD:
+            continue
+        picked.append(int(index))
+        if len(picked) == count:
+            break
+    
+    return picked
+
+
+def extractive_summary(entity_data, reviews):
+    """
+    Summarize reviews with their most representative sentences
+    
+    Args:
+        entity_data: Entity document data (dict)
+        reviews: List of review dicts
+    
+    Returns:
+        str: Rating line followed by up to 3 review sentences
+    """
+    ratings = [review['rating'] for review in reviews if review.get('rating') is not None]
+    avg_rating = sum(ratings) / len(ratings) if ratings else entity_data.get('avgRating', 0)
+    review_word = 'review' if len(reviews) == 1 else 'reviews'
+    header = f"Rated {avg_rating:.1f}/5 across {len(reviews)} {review_word}."
+    
+    sentences, token_lists = collect_sentences(reviews)
+    if not sentences:
+        return header
+    
+    picked = select_central_sentences(
+        tfidf_matrix(token_lists),
+        min(MAX_SUMMARY_SENTENCES, len(sentences))
+    )
+    
+    quoted = ' '.join(f'"{sentences[index]}"' for index in picked)
+    return f"{header} Reviewers say: {quoted}"
+
+
+class ExtractiveSummarizer(SummarizerBackend):
+    """Local TF-IDF centroid extractive summarizer"""
+    
+    name = 'extractive'
+    
+    def summarize(self, entity_data, reviews):
+        return extractive_summary(entity_data, reviews)
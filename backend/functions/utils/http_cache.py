@@ -0,0 +1,145 @@
+"""
+HTTP caching headers and CDN purge hints
+Read endpoints mark successful responses cacheable with the lifetimes in
+config/http_cache.py, tag them with surrogate keys, and answer
+If-None-Match revalidations with 304. Writes announce which keys they made
+stale, as a response header and as a "cache_purge" log line, so a CDN edge
+worker or a log sink can purge them.
+
+Surrogate keys:
+    entity/<id>        one entity
+    entities/<type>    entity lists filtered by type
+    entities           unfiltered entity lists
+    reviews/<id>       review lists of one entity
+"""
+import hashlib
+from firebase_functions import https_fn
+from config.http_cache import CACHE_VARY, HTTP_CACHE_ENABLED, get_cache_policy
+from utils.logger import logger
+
+
+# Space-separated surrogate keys of a cacheable response
+SURROGATE_KEY_HEADER = 'Surrogate-Key'
+
+# The same keys comma-separated, for CDNs that read Cache-Tag instead
+CACHE_TAG_HEADER = 'Cache-Tag'
+
+# Space-separated surrogate keys a write made stale
+PURGE_HEADER = 'X-Cache-Purge'
+
+ALL_ENTITIES_KEY = 'entities'
+
+
+def entity_key(entity_id):
+    return f"entity/{entity_id}"
+
+
+def entity_type_key(entity_type):
+    return f"entities/{entity_type}"
+
+
+def entity_reviews_key(entity_id):
+    return f"reviews/{entity_id}"
+
+
+def entity_keys(entity_id, entity_type=None):
+    """Keys of every cached response an entity appears in"""
+    keys = [entity_key(entity_id), ALL_ENTITIES_KEY]
+    if entity_type:
+        keys.append(entity_type_key(entity_type))
+    return keys
+
+
+def build_cache_control(policy):
+    """Cache-Control value for a policy from get_cache_policy()"""
+    if policy is None:
+        return 'no-store'
+    return (
+        f"public, max-age={policy['max_age']}, s-maxage={policy['s_maxage']}, "
+        f"stale-while-revalidate={policy['stale_while_revalidate']}"
+    )
+
+
+def compute_etag(body):
+    """Strong validator of a response body"""
+    return '"' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value covers etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = [value.strip().removeprefix('W/') for value in if_none_match.split(',')]
+    return etag in candidates
+
+
+def cache_headers(endpoint, surrogate_keys, body):
+    """
+    Caching headers for a successful response of endpoint
+    
+    Returns:
+        dict: Cache-Control, Vary, ETag and surrogate key headers (empty when
+              HTTP caching is disabled)
+    """
+    if not HTTP_CACHE_ENABLED:
+        return {}
+    
+    policy = get_cache_policy(endpoint)
+    headers = {'Cache-Control': build_cache_control(policy)}
+    if policy is None:
+        return headers
+    
+    headers.update({
+        'Vary': CACHE_VARY,
+        'ETag': compute_etag(body),
+        SURROGATE_KEY_HEADER: ' '.join(surrogate_keys),
+        CACHE_TAG_HEADER: ','.join(surrogate_keys)
+    })
+    return headers
+
+
+def cacheable_response(req, body, endpoint, surrogate_keys, headers):
+    """
+    Build a 200 response with caching headers, or a 304 without a body when
+    the client's If-None-Match already matches
+    """
+    headers = {**headers, **cache_headers(endpoint, surrogate_keys, body)}
+    etag = headers.get('ETag')
+    
+    if etag and req.method in ('GET', 'HEAD') and etag_matches(req.headers.get('If-None-Match'), etag):
+        return https_fn.Response('', status=304, headers=headers)
+    
+    return https_fn.Response(body, status=200, headers=headers)
+
+
+def log_purge_hint(surrogate_keys, **context):
+    """
+    Announce that cached responses tagged with surrogate_keys are stale
+    
+    Used directly by triggers, which have no response to add a header to.
+    
+    Returns:
+        list: The keys, sorted and deduplicated (empty when HTTP caching is
+              disabled)
+    """
+    if not HTTP_CACHE_ENABLED:
+        return []
+    
+    keys = sorted(set(surrogate_keys))
+    if keys:
+        logger.info("Cache purge hint", event='cache_purge', surrogate_keys=keys, **context)
+    return keys
+
+
+def purge_headers(surrogate_keys, **context):
+    """
+    Response headers (and a log line) announcing which keys a write made stale
+    
+    Returns:
+        dict: The purge header, or nothing if there is nothing to purge
+    """
+    keys = log_purge_hint(surrogate_keys, **context)
+    return {PURGE_HEADER: ' '.join(keys)} if keys else {}
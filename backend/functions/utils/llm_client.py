@@ -0,0 +1,347 @@
+"""
+LLM client interface used for summary generation
+Provides single chat completions and offline batch jobs behind one interface.
+OpenAIClient talks to the OpenAI API (chat completions and the Batch API);
+LocalLLMClient is a file-based stand-in for local runs and testing that needs
+no API key and makes no network calls.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import uuid
+from utils.circuit_breaker import CircuitBreaker
+from utils.logger import logger
+from utils.retry import retry_with_backoff
+
+
+# Which client get_llm_client() returns: 'openai' or 'local'
+LLM_CLIENT = os.environ.get('LLM_CLIENT', 'openai')
+
+# Directory the local client writes batch files to
+LLM_LOCAL_DIR = os.environ.get('LLM_LOCAL_DIR', os.path.join(tempfile.gettempdir(), 'ratemynus-llm'))
+
+# HTTP settings of the shared OpenAI client
+OPENAI_TIMEOUT_SEC = float(os.environ.get('OPENAI_TIMEOUT_SEC', '30'))
+OPENAI_CONNECT_TIMEOUT_SEC = float(os.environ.get('OPENAI_CONNECT_TIMEOUT_SEC', '5'))
+OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', '32'))
+OPENAI_KEEPALIVE_SEC = float(os.environ.get('OPENAI_KEEPALIVE_SEC', '60'))
+
+# Retries of rate-limited (429), server error (5xx) and connection failures
+OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', '4'))
+OPENAI_BACKOFF_BASE_SEC = float(os.environ.get('OPENAI_BACKOFF_BASE_SEC', '0.5'))
+OPENAI_BACKOFF_MAX_SEC = float(os.environ.get('OPENAI_BACKOFF_MAX_SEC', '20'))
+
+# Consecutive failed calls that open the circuit, and how long it stays open
+OPENAI_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('OPENAI_CIRCUIT_FAILURE_THRESHOLD', '5'))
+OPENAI_CIRCUIT_RESET_SEC = float(os.environ.get('OPENAI_CIRCUIT_RESET_SEC', '60'))
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+
+# Batch statuses reported by get_batch()
+BATCH_PENDING = 'pending'
+BATCH_COMPLETED = 'completed'
+BATCH_FAILED = 'failed'
+
+
+def is_retryable_openai_error(error):
+    """True for rate limits, server errors, timeouts and connection failures"""
+    import openai
+    
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    status_code = getattr(error, 'status_code', None)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+def openai_retry_after(error):
+    """Seconds requested by a Retry-After header on an OpenAI error, if any"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def build_batch_line(request):
+    """
+    Build one line of a chat-completions batch input file
+    
+    Args:
+        request: Dict with custom_id, messages, model, max_tokens, temperature
+    
+    Returns:
+        str: JSON line in the OpenAI Batch API input format
+    """
+    return json.dumps({
+        'custom_id': request['custom_id'],
+        'method': 'POST',
+        'url': BATCH_ENDPOINT,
+        'body': {
+            'model': request['model'],
+            'messages': request['messages'],
+            'max_tokens': request['max_tokens'],
+            'temperature': request['temperature']
+        }
+    }, ensure_ascii=False)
+
+
+def parse_batch_output(text):
+    """
+    Parse a batch output file into completion texts
+    
+    Args:
+        text: JSONL contents in the OpenAI Batch API output format
+    
+    Returns:
+        dict: custom_id -> completion text, or None if that request failed
+    """
+    results = {}
+    
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        
+        record = json.loads(line)
+        response = record.get('response') or {}
+        
+        if record.get('error') or response.get('status_code') != 200:
+            results[record['custom_id']] = None
+            continue
+        
+        choices = response.get('body', {}).get('choices') or []
+        content = choices[0]['message']['content'] if choices else None
+        results[record['custom_id']] = content.strip() if content else None
+    
+    return results
+
+
+class LLMClient:
+    """
+    Interface for chat completion providers
+    
+    complete() returns the completion text or raises; before_attempt, if
+    given, is called before every request sent (including retries), e.g. to
+    take a rate limiter token. submit_batch() returns
+    a batch ID that get_batch() later resolves to a status and, once the batch
+    is finished, a dict of custom_id -> completion text (None on failure).
+    """
+    
+    name = 'base'
+    
+    def complete(self, messages, model, max_tokens, temperature, before_attempt=None):
+        raise NotImplementedError
+    
+    def submit_batch(self, requests):
+        raise NotImplementedError
+    
+    def get_batch(self, batch_id):
+        raise NotImplementedError
+
+
+class OpenAIClient(LLMClient):
+    """
+    OpenAI API client for chat completions and the Batch API
+    
+    Every call goes through the shared circuit breaker and is retried with
+    exponential backoff on rate limits and transient failures. The SDK's own
+    retries are disabled so the two do not multiply.
+    """
+    
+    name = 'openai'
+    
+    def __init__(self):
+        self._openai = None
+        self._lock = threading.Lock()
+        self.breaker = CircuitBreaker(
+            'openai',
+            failure_threshold=OPENAI_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=OPENAI_CIRCUIT_RESET_SEC
+        )
+    
+    def _client(self):
+        """Return the pooled OpenAI SDK client, creating it on first use"""
+        with self._lock:
+            if self._openai is None:
+                import httpx
+                from openai import OpenAI, DefaultHttpxClient
+                
+                api_key = os.environ.get('OPENAI_API_KEY')
+                if not api_key:
+                    raise ValueError("OPENAI_API_KEY environment variable not set")
+                
+                timeout = httpx.Timeout(OPENAI_TIMEOUT_SEC, connect=OPENAI_CONNECT_TIMEOUT_SEC)
+                http_client = DefaultHttpxClient(
+                    timeout=timeout,
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                        keepalive_expiry=OPENAI_KEEPALIVE_SEC
+                    )
+                )
+                self._openai = OpenAI(
+                    api_key=api_key,
+                    http_client=http_client,
+                    timeout=timeout,
+                    max_retries=0
+                )
+            return self._openai
+    
+    def _call(self, description, func, *args, before_attempt=None, **kwargs):
+        """Run an API call through the circuit breaker with retries"""
+        def attempt():
+            if before_attempt:
+                before_attempt()
+            return self.breaker.call(func, *args, is_failure=is_retryable_openai_error, **kwargs)
+        
+        return retry_with_backoff(
+            attempt,
+            is_retryable=is_retryable_openai_error,
+            max_retries=OPENAI_MAX_RETRIES,
+            base_delay=OPENAI_BACKOFF_BASE_SEC,
+            max_delay=OPENAI_BACKOFF_MAX_SEC,
+            retry_after=openai_retry_after,
+            description=description
+        )
+    
+    def complete(self, messages, model, max_tokens, temperature, before_attempt=None):
+        response = self._call(
+            "chat_completion",
+            self._client().chat.completions.create,
+            before_attempt=before_attempt,
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content.strip()
+    
+    def submit_batch(self, requests):
+        client = self._client()
+        batch_file = '\n'.join(build_batch_line(request) for request in requests).encode('utf-8')
+        
+        input_file = self._call(
+            "batch_upload",
+            client.files.create,
+            file=('summaries.jsonl', batch_file),
+            purpose='batch'
+        )
+        batch = self._call(
+            "batch_create",
+            client.batches.create,
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window='24h'
+        )
+        
+        logger.info(
+            "OpenAI batch submitted",
+            batch_id=batch.id,
+            input_file_id=input_file.id,
+            request_count=len(requests)
+        )
+        
+        return batch.id
+    
+    def get_batch(self, batch_id):
+        client = self._client()
+        batch = self._call("batch_retrieve", client.batches.retrieve, batch_id)
+        
+        if batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            return {'status': BATCH_PENDING}
+        
+        # Expired and cancelled batches can still carry partial output
+        results = {}
+        if batch.output_file_id:
+            output = self._call("batch_output", client.files.content, batch.output_file_id)
+            results = parse_batch_output(output.text)
+        
+        return {
+            'status': BATCH_COMPLETED if batch.status == 'completed' else BATCH_FAILED,
+            'results': results
+        }
+
+
+class LocalLLMClient(LLMClient):
+    """
+    File-based stand-in for OpenAIClient
+    
+    Completions are deterministic placeholder texts derived from the prompt.
+    Batches are written as input/output JSONL files under LLM_LOCAL_DIR in the
+    same formats the Batch API uses, and complete immediately.
+    """
+    
+    name = 'local'
+    
+    def __init__(self, directory=LLM_LOCAL_DIR):
+        self.directory = directory
+    
+    def complete(self, messages, model, max_tokens, temperature, before_attempt=None):
+        if before_attempt:
+            before_attempt()
+        digest = hashlib.sha256(
+            json.dumps(messages, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()[:12]
+        prompt_chars = sum(len(message['content']) for message in messages)
+        return f"Local summary {digest} ({model}, {prompt_chars} prompt characters)."
+    
+    def _path(self, batch_id, kind):
+        return os.path.join(self.directory, f"{batch_id}.{kind}.jsonl")
+    
+    def submit_batch(self, requests):
+        os.makedirs(self.directory, exist_ok=True)
+        batch_id = f"local-{uuid.uuid4().hex}"
+        
+        with open(self._path(batch_id, 'input'), 'w', encoding='utf-8') as input_file:
+            for request in requests:
+                input_file.write(build_batch_line(request) + '\n')
+        
+        with open(self._path(batch_id, 'output'), 'w', encoding='utf-8') as output_file:
+            for request in requests:
+                content = self.complete(
+                    request['messages'],
+                    request['model'],
+                    request['max_tokens'],
+                    request['temperature']
+                )
+                output_file.write(json.dumps({
+                    'custom_id': request['custom_id'],
+                    'response': {
+                        'status_code': 200,
+                        'body': {'choices': [{'message': {'role': 'assistant', 'content': content}}]}
+                    },
+                    'error': None
+                }, ensure_ascii=False) + '\n')
+        
+        logger.info("Local batch written", batch_id=batch_id, request_count=len(requests))
+        
+        return batch_id
+    
+    def get_batch(self, batch_id):
+        output_path = self._path(batch_id, 'output')
+        if not os.path.exists(output_path):
+            return {'status': BATCH_FAILED, 'results': {}}
+        
+        with open(output_path, encoding='utf-8') as output_file:
+            return {'status': BATCH_COMPLETED, 'results': parse_batch_output(output_file.read())}
+
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """
+    Return the shared LLM client selected by the LLM_CLIENT environment variable
+    
+    One instance is kept per function instance, so the HTTP connection pool
+    and circuit breaker state are reused across entities and invocations.
+    """
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client = LocalLLMClient() if LLM_CLIENT == 'local' else OpenAIClient()
+        return _llm_client
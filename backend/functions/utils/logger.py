@@ -3,81 +3,203 @@ Logging utility for Firebase Cloud Functions
 Provides structured logging that integrates with Google Cloud Logging
 """
 
-import logging
+import atexit
+import contextvars
 import json
-from datetime import datetime
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
 from typing import Optional
 
 
+# Minimum level that is emitted (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+
+# Hand records to a background writer thread instead of writing them inline
+LOG_QUEUE = os.environ.get('LOG_QUEUE', 'false').lower() == 'true'
+
+# Records waiting for the writer thread; further records are dropped
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+
+
+# Fields added to every record logged in the current context, e.g. the
+# trace of the request being handled (see utils.tracing)
+log_context = contextvars.ContextVar('log_context', default=None)
+
+# Records of the request being handled, held back until its outcome decides
+# which are written (see utils.tracing and config/log_sampling.py)
+log_buffer = contextvars.ContextVar('log_buffer', default=None)
+
+# Records held back per request; later records are written straight away
+MAX_BUFFERED_RECORDS = 500
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one line of JSON for Cloud Logging
+    
+    The context fields passed to StructuredLogger travel on the record and
+    are only serialized here, so records that are filtered out never pay
+    for timestamps or JSON encoding.
+    """
+    
+    def format(self, record):
+        entry = {
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "logger": record.name
+        }
+        
+        for key, value in getattr(record, "fields", {}).items():
+            entry.setdefault(key, value)
+        
+        # Values json cannot encode (datetimes, exceptions, ...) are logged as strings
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks the logging thread
+    
+    Records are put on a bounded queue; when it is full the record is
+    dropped and counted. Records are queued as-is, so formatting happens on
+    the writer thread rather than in the request.
+    """
+    
+    def __init__(self, queue_size: int = LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.dropped_count = 0
+        self._lock = threading.Lock()
+    
+    def prepare(self, record):
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped_count += 1
+
+
+class LogQueueListener(logging.handlers.QueueListener):
+    """Queue listener whose stop marker waits for room in a full queue"""
+    
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
 class StructuredLogger:
     """
     Custom logger that outputs structured logs for Cloud Logging
     """
     
-    def __init__(self, name: str = "ratemynus-backend"):
+    def __init__(self, name: str = "ratemynus-backend", level: str = LOG_LEVEL, queued: bool = LOG_QUEUE):
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.INFO)
+        self.logger.setLevel(level)
+        
+        # Records are written once here, not again by the root logger
+        self.logger.propagate = False
         
         # Remove existing handlers to avoid duplicates
         self.logger.handlers.clear()
         
-        # Create console handler with structured formatting
+        # Console handler writing one JSON object per line
         handler = logging.StreamHandler()
-        handler.setLevel(logging.INFO)
+        handler.setFormatter(JsonFormatter())
+        self._stream_handler = handler
         
-        # Use JSON formatter for structured logging
-        formatter = logging.Formatter(
-            '{"severity": "%(levelname)s", "time": "%(asctime)s", "message": "%(message)s"}'
-        )
-        handler.setFormatter(formatter)
+        # Optionally write from a background thread; queued records are
+        # flushed when the instance shuts down
+        self._queue_handler = None
+        self._listener = None
+        if queued:
+            self._queue_handler = DroppingQueueHandler()
+            self._listener = LogQueueListener(self._queue_handler.queue, handler)
+            self._listener.start()
+            atexit.register(self.close)
+            handler = self._queue_handler
         
         self.logger.addHandler(handler)
     
-    def _log(self, level: str, message: str, **kwargs):
+    @property
+    def dropped_count(self) -> int:
+        """Records dropped because the log queue was full"""
+        return self._queue_handler.dropped_count if self._queue_handler else 0
+    
+    def close(self):
         """
-        Internal method to log with additional context
+        Stop the background writer after it has written every queued record
+        
+        Reports how many records were dropped. Logging after close() writes
+        inline again.
         """
-        log_data = {
-            "message": message,
-            "timestamp": datetime.utcnow().isoformat(),
-            **kwargs
-        }
+        if self._listener is None:
+            return
         
-        log_message = json.dumps(log_data)
+        self._listener.stop()
+        self._listener = None
+        self.logger.removeHandler(self._queue_handler)
+        self.logger.addHandler(self._stream_handler)
         
-        if level == "DEBUG":
-            self.logger.debug(log_message)
-        elif level == "INFO":
-            self.logger.info(log_message)
-        elif level == "WARNING":
-            self.logger.warning(log_message)
-        elif level == "ERROR":
-            self.logger.error(log_message)
-        elif level == "CRITICAL":
-            self.logger.critical(log_message)
+        if self._queue_handler.dropped_count:
+            self.warning("Log records dropped, queue was full", dropped_count=self._queue_handler.dropped_count)
+        self._stream_handler.flush()
+    
+    def _log(self, level: int, message: str, fields: dict):
+        """
+        Internal method to log with additional context
+        
+        The level is checked before anything else is done, and the record
+        is built directly, skipping the stack walk logging does to find the
+        caller's file and line (not part of the JSON output).
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        context = log_context.get()
+        if context:
+            fields = {**context, **fields}
+        record = self.logger.makeRecord(
+            self.logger.name, level, "", 0, message, None, None, extra={"fields": fields}
+        )
+        buffer = log_buffer.get()
+        if buffer is not None and len(buffer) < MAX_BUFFERED_RECORDS:
+            buffer.append(record)
+            return
+        self.logger.handle(record)
+    
+    def write(self, record: logging.LogRecord):
+        """Write a record held back in log_buffer"""
+        self.logger.handle(record)
     
     def debug(self, message: str, **kwargs):
         """Log debug message with optional context"""
-        self._log("DEBUG", message, **kwargs)
+        self._log(logging.DEBUG, message, kwargs)
     
     def info(self, message: str, **kwargs):
         """Log info message with optional context"""
-        self._log("INFO", message, **kwargs)
+        self._log(logging.INFO, message, kwargs)
     
     def warning(self, message: str, **kwargs):
         """Log warning message with optional context"""
-        self._log("WARNING", message, **kwargs)
+        self._log(logging.WARNING, message, kwargs)
     
     def error(self, message: str, error: Optional[Exception] = None, **kwargs):
         """Log error message with optional exception details"""
-        if error:
+        if isinstance(error, BaseException):
             kwargs["error_type"] = type(error).__name__
             kwargs["error_message"] = str(error)
-        self._log("ERROR", message, **kwargs)
+        elif error:
+            kwargs["error_message"] = str(error)
+        self._log(logging.ERROR, message, kwargs)
     
     def critical(self, message: str, **kwargs):
         """Log critical message with optional context"""
-        self._log("CRITICAL", message, **kwargs)
+        self._log(logging.CRITICAL, message, kwargs)
     
     def log_request(self, method: str, path: str, **kwargs):
         """Log HTTP request details"""
@@ -120,7 +242,7 @@ def get_logger(name: Optional[str] = None) -> StructuredLogger:
     
     Args:
         name: Optional logger name
-        
+    
     Returns:
         StructuredLogger instance
     """
@@ -0,0 +1,333 @@
+"""
+In-process metrics registry
+Counters and fixed-bucket latency histograms kept per function instance, with
+export as Prometheus text or JSON (see api/metrics.py) and an optional
+periodic structured log dump.
+
+Memory is bounded: histograms have fixed buckets, and each metric keeps at
+most MAX_SERIES_PER_METRIC label combinations; further ones are folded
+into a single series labelled "__overflow__". Recording takes one lock
+per series and no allocation once the series exists.
+"""
+import atexit
+import bisect
+import os
+import threading
+import time
+from utils.logger import logger
+
+
+# Seconds between structured metric dumps to the log; 0 disables them
+METRICS_DUMP_INTERVAL_SEC = float(os.environ.get('METRICS_DUMP_INTERVAL_SEC', '60'))
+
+# Label combinations kept per metric
+MAX_SERIES_PER_METRIC = 200
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket
+# counts everything slower
+LATENCY_BUCKETS_MS = (
+    1, 2.5, 5, 10, 25, 50, 75, 100, 150, 250, 400, 600, 800,
+    1000, 1500, 2500, 5000, 10000, 30000
+)
+
+OVERFLOW_LABEL = '__overflow__'
+
+
+class CounterSeries:
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+    
+    def snapshot(self):
+        return {'value': self.value}
+
+
+class HistogramSeries:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+    
+    def quantile(self, counts, count, q):
+        """
+        Estimate a quantile by linear interpolation inside its bucket
+        
+        Values in the last, unbounded bucket are reported as the largest
+        bucket bound.
+        """
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return float(self.buckets[-1])
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return round(lower + (upper - lower) * (rank - seen) / bucket_count, 2)
+            seen += bucket_count
+        return float(self.buckets[-1])
+    
+    def snapshot(self):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+            count = self.count
+        return {
+            'count': count,
+            'sum': round(total, 3),
+            'p50': self.quantile(counts, count, 0.50),
+            'p95': self.quantile(counts, count, 0.95),
+            'p99': self.quantile(counts, count, 0.99),
+            'buckets': counts
+        }
+
+
+class Metric:
+    """A named metric with one series per label combination"""
+    
+    def __init__(self, name, kind, description, label_names, buckets=None):
+        self.name = name
+        self.kind = kind
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    def _new_series(self):
+        return HistogramSeries(self.buckets) if self.kind == 'histogram' else CounterSeries()
+    
+    def labels(self, **labels):
+        """Return the series for a label combination, creating it if needed"""
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        series = self._series.get(key)
+        if series is not None:
+            return series
+        
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= MAX_SERIES_PER_METRIC:
+                    key = (OVERFLOW_LABEL,) * len(self.label_names)
+                    series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = self._new_series()
+            return series
+    
+    def series(self):
+        with self._lock:
+            return list(self._series.items())
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of counters, histograms and gauge callbacks
+    """
+    
+    def __init__(self):
+        self._metrics = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._dump_thread = None
+        self.started_at = time.time()
+    
+    def _metric(self, name, kind, description, label_names, buckets=None):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = Metric(name, kind, description, label_names, buckets)
+        return metric
+    
+    def counter(self, name, description='', label_names=()):
+        return self._metric(name, 'counter', description, label_names)
+    
+    def histogram(self, name, description='', label_names=(), buckets=LATENCY_BUCKETS_MS):
+        return self._metric(name, 'histogram', description, label_names, buckets)
+    
+    def gauge(self, name, callback, description=''):
+        """
+        Register a gauge read at export time
+        
+        Args:
+            callback: Returns a number, or a dict of label value -> number
+                      (exported with a "key" label)
+        """
+        with self._lock:
+            self._gauges[name] = (callback, description)
+    
+    def snapshot(self):
+        """
+        All metric values as plain data
+        
+        Returns:
+            dict: name -> {type, description, series: [{labels, ...values}]}
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            gauges = list(self._gauges.items())
+        
+        data = {}
+        for metric in metrics:
+            data[metric.name] = {
+                'type': metric.kind,
+                'description': metric.description,
+                'series': [
+                    {'labels': dict(zip(metric.label_names, key)), **series.snapshot()}
+                    for key, series in metric.series()
+                ]
+            }
+            if metric.kind == 'histogram':
+                data[metric.name]['buckets'] = list(metric.buckets)
+        
+        for name, (callback, description) in gauges:
+            try:
+                value = callback()
+            except Exception as e:
+                logger.warning("Error reading gauge", gauge=name, error=str(e))
+                continue
+            if isinstance(value, dict):
+                series = [{'labels': {'key': key}, 'value': item} for key, item in value.items()]
+            else:
+                series = [{'labels': {}, 'value': value}]
+            data[name] = {'type': 'gauge', 'description': description, 'series': series}
+        
+        return data
+    
+    def to_json(self):
+        return {
+            'uptime_sec': round(time.time() - self.started_at, 1),
+            'metrics': self.snapshot()
+        }
+    
+    def to_prometheus(self):
+        """Render the Prometheus text exposition format"""
+        lines = []
+        for name, metric in sorted(self.snapshot().items()):
+            if metric['description']:
+                lines.append(f"# HELP {name} {metric['description']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            
+            for series in metric['series']:
+                labels = series['labels']
+                if metric['type'] != 'histogram':
+                    if series['value'] is not None:
+                        lines.append(f"{name}{format_labels(labels)} {series['value']}")
+                    continue
+                
+                cumulative = 0
+                for bound, count in zip(list(metric['buckets']) + ['+Inf'], series['buckets']):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels({**labels, 'le': bound})} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {series['sum']}")
+                lines.append(f"{name}_count{format_labels(labels)} {series['count']}")
+        
+        return '\n'.join(lines) + '\n'
+    
+    def dump(self):
+        """Log a compact snapshot: counters, gauges and histogram quantiles"""
+        summary = {}
+        for name, metric in self.snapshot().items():
+            summary[name] = [
+                {key: value for key, value in series.items() if key != 'buckets'}
+                for series in metric['series']
+            ]
+        logger.info("Metrics snapshot", metrics=summary)
+    
+    def start_periodic_dump(self, interval_sec=METRICS_DUMP_INTERVAL_SEC):
+        """Dump every interval_sec on a daemon thread, and once at shutdown (idempotent)"""
+        if interval_sec <= 0 or self._dump_thread is not None:
+            return
+        
+        with self._lock:
+            if self._dump_thread is not None:
+                return
+            
+            def run():
+                while True:
+                    time.sleep(interval_sec)
+                    self.dump()
+            
+            self._dump_thread = threading.Thread(target=run, name='metrics-dump', daemon=True)
+            self._dump_thread.start()
+            atexit.register(self.dump)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + '}'
+
+
+# Shared registry for this function instance
+metrics = MetricsRegistry()
+
+REQUEST_DURATION = metrics.histogram(
+    'http_request_duration_ms',
+    'HTTP handler latency in milliseconds',
+    ('endpoint', 'status')
+)
+FIRESTORE_OPERATIONS = metrics.counter(
+    'firestore_operations_total',
+    'Firestore calls by collection and kind (read, write or query)',
+    ('collection', 'kind')
+)
+SPAN_DURATION = metrics.histogram(
+    'span_duration_ms',
+    'Duration of traced steps in milliseconds',
+    ('span',)
+)
+LLM_CALLS = metrics.counter(
+    'llm_calls_total',
+    'LLM completion calls by client and outcome',
+    ('client', 'outcome')
+)
+LOG_RECORDS = metrics.counter(
+    'log_records_total',
+    'Log lines of traced requests kept or dropped by log sampling',
+    ('endpoint', 'outcome')
+)
+
+metrics.gauge('log_records_dropped', lambda: logger.dropped_count, 'Log records dropped by the log queue')
+
+# Firestore span operations (last part of "firestore.<collection>.<operation>")
+# by kind; anything else counts as a write
+FIRESTORE_READ_OPERATIONS = frozenset({'get', 'readback'})
+FIRESTORE_QUERY_OPERATIONS = frozenset({'query', 'count', 'stream'})
+
+
+def record_span(name, duration_ms):
+    """Record a finished span, counting Firestore operations by kind"""
+    SPAN_DURATION.labels(span=name).observe(duration_ms)
+    
+    if name.startswith('firestore.'):
+        _, collection, operation = (name.split('.', 2) + ['', ''])[:3]
+        if operation in FIRESTORE_READ_OPERATIONS:
+            kind = 'read'
+        elif operation in FIRESTORE_QUERY_OPERATIONS:
+            kind = 'query'
+        else:
+            kind = 'write'
+        FIRESTORE_OPERATIONS.labels(collection=collection, kind=kind).inc()
@@ -0,0 +1,68 @@
+"""
+Thread-safe token bucket rate limiter
+Used to keep concurrent OpenAI calls within the account's request quota
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket that refills continuously at a fixed rate
+    
+    Tokens accumulate up to `capacity`, so short bursts are allowed while the
+    long-run rate never exceeds `rate` tokens per second.
+    """
+    
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        """Add tokens for the time elapsed since the last refill (lock held)"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+    
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if available without waiting"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+    
+    def acquire(self, tokens: float = 1, timeout: float = None) -> bool:
+        """
+        Block until tokens are available
+        
+        Args:
+            tokens: Number of tokens to take
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+        
+        Returns:
+            bool: True if the tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            
+            time.sleep(wait)
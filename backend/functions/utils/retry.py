@@ -0,0 +1,62 @@
+"""
+Retry with exponential backoff and full jitter
+"""
+import random
+import time
+from utils.logger import logger
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """
+    Delay before retry number `attempt` (0-based)
+    
+    Full jitter: a random delay between zero and the exponential cap, so
+    clients that failed together do not retry in lockstep.
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry_with_backoff(func, is_retryable, max_retries=3, base_delay=0.5, max_delay=20.0,
+                       retry_after=None, description=None):
+    """
+    Call func, retrying retryable exceptions with exponential backoff
+    
+    Args:
+        func: Zero-argument callable
+        is_retryable: Predicate deciding whether an exception is worth retrying
+        max_retries: Retries after the first attempt
+        base_delay: Cap of the first backoff delay in seconds
+        max_delay: Upper bound for any single delay in seconds
+        retry_after: Optional function returning a server-requested delay in
+                     seconds for an exception (e.g. a Retry-After header), or None
+        description: Name of the operation for logging
+    
+    Returns:
+        The return value of func
+    
+    Raises:
+        The last exception once retries are exhausted or it is not retryable
+    """
+    attempt = 0
+    
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            requested = retry_after(e) if retry_after else None
+            if requested is not None:
+                delay = min(max_delay, max(delay, requested))
+            
+            attempt += 1
+            logger.warning(
+                "Retrying after error",
+                operation=description,
+                attempt=attempt,
+                delay_sec=round(delay, 2),
+                error=str(e)
+            )
+            time.sleep(delay)
@@ -0,0 +1,124 @@
+"""
+Token budgeting and representative review selection for summarization
+Keeps the prompt size (and therefore latency and cost) of a summary bounded
+no matter how many reviews an entity has.
+"""
+import math
+from datetime import datetime, timezone
+
+
+# Rough characters-per-token ratio for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+# Recency weight halves every this many days
+RECENCY_HALF_LIFE_DAYS = 180
+
+
+def estimate_tokens(text):
+    """Estimate the token count of a text locally, without a tokenizer"""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def review_score(review, now=None):
+    """
+    Score how representative a review is within its rating group
+    
+    Combines community votes (log-scaled so a few popular reviews do not
+    dominate) with recency (exponential decay).
+    """
+    now = now or datetime.now(timezone.utc)
+    votes = max(0, review.get('voteCount') or 0)
+    
+    recency = 0.5
+    created_at = review.get('createdAt')
+    if isinstance(created_at, datetime):
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        age_days = max(0.0, (now - created_at).total_seconds() / 86400)
+        recency = 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+    
+    return math.log1p(votes) + recency
+
+
+def select_representative_reviews(reviews, token_budget, review_tokens):
+    """
+    Pick reviews that fit in a token budget while preserving the rating spread
+    
+    Reviews are grouped by rating and each group is ranked by review_score.
+    Groups are then drawn from in proportion to their share of all reviews,
+    so the selection keeps the same mix of positive and negative opinions.
+    
+    Args:
+        reviews: List of review dicts
+        token_budget: Maximum total estimated tokens of the selection
+        review_tokens: Function returning the estimated tokens of one review
+    
+    Returns:
+        list: Selected reviews, highest scoring first
+    """
+    now = datetime.now(timezone.utc)
+    
+    groups = {}
+    for review in reviews:
+        groups.setdefault(review.get('rating'), []).append(review)
+    
+    for group in groups.values():
+        group.sort(key=lambda review: review_score(review, now), reverse=True)
+    
+    total = len(reviews)
+    taken = {rating: 0 for rating in groups}
+    selected = []
+    used_tokens = 0
+    
+    while True:
+        # Next group is the one furthest below its proportional share
+        candidates = [rating for rating in groups if taken[rating] < len(groups[rating])]
+        if not candidates:
+            break
+        
+        rating = min(
+            candidates,
+            key=lambda rating: taken[rating] / (len(groups[rating]) / total)
+        )
+        review = groups[rating][taken[rating]]
+        taken[rating] += 1
+        
+        tokens = review_tokens(review)
+        if used_tokens + tokens > token_budget:
+            # Skip reviews that do not fit, a shorter one may still
+            continue
+        
+        selected.append(review)
+        used_tokens += tokens
+    
+    return selected
+
+
+def chunk_reviews(reviews, token_budget, review_tokens):
+    """
+    Split reviews into consecutive chunks that each fit in a token budget
+    
+    A single review larger than the budget gets a chunk of its own.
+    
+    Returns:
+        list: List of review lists
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    
+    for review in reviews:
+        tokens = review_tokens(review)
+        if current and current_tokens + tokens > token_budget:
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append(review)
+        current_tokens += tokens
+    
+    if current:
+        chunks.append(current)
+    
+    return chunks
@@ -1,25 +1,130 @@
 """
 Utility functions for generating review summaries using OpenAI
 """
+import hashlib
+import json
 import os
-from openai import OpenAI
-from firebase_admin import firestore
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from google.api_core.exceptions import FailedPrecondition
 from config.prompts import (
     SYSTEM_PROMPT,
     REVIEW_SUMMARY_PROMPT,
+    CHUNK_SUMMARY_PROMPT,
+    FINAL_SUMMARY_PROMPT,
     REVIEW_FORMAT,
     NO_REVIEWS_SUMMARY,
     ERROR_SUMMARY
 )
+from utils.circuit_breaker import CircuitOpenError
+from utils.extractive_summarizer import ExtractiveSummarizer
 from utils.logger import logger
+from repositories import get_entity_repository, get_review_repository
+from utils.llm_client import get_llm_client
+from utils.rate_limiter import TokenBucket
+from utils.summary_cache import compute_summary_cache_key, summary_cache
+from utils.metrics import LLM_CALLS
+from utils.tracing import span
+from utils.summarizer_backend import SummarizerBackend
+from utils.review_selection import (
+    CHARS_PER_TOKEN,
+    estimate_tokens,
+    select_representative_reviews,
+    chunk_reviews
+)
+
+
+# Backend that produces summaries: 'openai' or 'extractive'
+SUMMARY_BACKEND = os.environ.get('SUMMARY_BACKEND', 'openai')
+
+# Backend used when the primary one fails ('none' stores ERROR_SUMMARY).
+# Fallback summaries are stored without a watermark, so the entity stays
+# stale and gets a primary summary on a later run
+SUMMARY_FALLBACK_BACKEND = os.environ.get('SUMMARY_FALLBACK_BACKEND', 'extractive')
+
+# Number of entities summarized in parallel (1 = one after another)
+SUMMARY_CONCURRENCY = int(os.environ.get('SUMMARY_CONCURRENCY', '1'))
+
+# OpenAI request quota shared by all summary workers in this instance
+OPENAI_REQUESTS_PER_MINUTE = float(os.environ.get('OPENAI_REQUESTS_PER_MINUTE', '500'))
+
+# Requests that may start at once after an idle period (defaults to one
+# second of the quota). The limiter is sized from the quota only, never from
+# the concurrency, so runs with more workers share the same request rate
+OPENAI_REQUEST_BURST = float(
+    os.environ.get('OPENAI_REQUEST_BURST', max(1.0, OPENAI_REQUESTS_PER_MINUTE / 60))
+)
+
+# Model configuration (hardcoded for simplicity)
+SUMMARY_MODEL = 'gpt-4o-mini'
+SUMMARY_MAX_TOKENS = 200
+SUMMARY_TEMPERATURE = 0.3
+
+# Estimated tokens of review text allowed in a single prompt; entities over
+# this are summarized with map-reduce over a representative selection
+PROMPT_TOKEN_BUDGET = int(os.environ.get('SUMMARY_PROMPT_TOKEN_BUDGET', '3000'))
+
+# Maximum number of chunk summaries (map calls) per entity
+MAX_SUMMARY_CHUNKS = int(os.environ.get('SUMMARY_MAX_CHUNKS', '4'))
+
+# Estimated tokens of one review's description sent to the LLM; longer
+# descriptions are truncated so a single review always fits in a chunk
+MAX_REVIEW_TOKENS = min(
+    int(os.environ.get('SUMMARY_MAX_REVIEW_TOKENS', '500')),
+    PROMPT_TOKEN_BUDGET // 2
+)
+
+# How reviews are loaded for a run: 'per_entity' runs one query per entity,
+# 'grouped' streams the reviews collection once and groups it by entity,
+# 'auto' groups only when the run covers GROUPED_FETCH_MIN_ENTITIES entities
+SUMMARY_REVIEW_FETCH = os.environ.get('SUMMARY_REVIEW_FETCH', 'auto')
+REVIEW_FETCH_MODES = ('auto', 'per_entity', 'grouped')
+
+# Below this many entities per run (e.g. ?limit=10 or a few stale entities),
+# per-entity queries read less than streaming every review
+GROUPED_FETCH_MIN_ENTITIES = int(os.environ.get('SUMMARY_GROUPED_FETCH_MIN_ENTITIES', '200'))
 
+# Review fields the summarizer reads; nothing else is fetched
+REVIEW_SUMMARY_FIELDS = ['rating', 'description', 'tags', 'createdAt', 'voteCount']
 
-def get_openai_client():
-    """Initialize OpenAI client with API key from environment"""
-    api_key = os.environ.get('OPENAI_API_KEY')
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY environment variable not set")
-    return OpenAI(api_key=api_key)
+# Attempts per summary write in write_entity_summaries before giving up
+SUMMARY_WRITE_MAX_ATTEMPTS = 5
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the shared token bucket limiting OpenAI requests per minute"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = TokenBucket(
+                rate=OPENAI_REQUESTS_PER_MINUTE / 60,
+                capacity=OPENAI_REQUEST_BURST
+            )
+        return _rate_limiter
+
+
+def truncate_review_text(text, max_tokens=None):
+    """Cut a review description down to an estimated token limit"""
+    max_chars = (max_tokens or MAX_REVIEW_TOKENS) * CHARS_PER_TOKEN
+    if not text or len(text) <= max_chars:
+        return text or ''
+    return text[:max_chars - 3].rstrip() + '...'
+
+
+def format_review(index, review):
+    """Format a single review for the LLM"""
+    tags_str = ", ".join(review.get('tags', [])) if review.get('tags') else "None"
+    return REVIEW_FORMAT.format(
+        index=index,
+        rating=review.get('rating', 0),
+        description=truncate_review_text(review.get('description', '')),
+        tags=tags_str
+    )
 
 
 def format_reviews_for_prompt(reviews):
@@ -27,109 +132,328 @@ def format_reviews_for_prompt(reviews):
     formatted_reviews = []
     
     for idx, review in enumerate(reviews, 1):
-        tags_str = ", ".join(review.get('tags', [])) if review.get('tags') else "None"
-        formatted_review = REVIEW_FORMAT.format(
-            index=idx,
-            rating=review.get('rating', 0),
-            description=review.get('description', ''),
-            tags=tags_str
-        )
-        formatted_reviews.append(formatted_review)
+        formatted_reviews.append(format_review(idx, review))
     
     return "\n".join(formatted_reviews)
 
 
+def review_prompt_tokens(review):
+    """Estimate the prompt tokens one formatted review takes"""
+    return estimate_tokens(format_review(0, review)) + 1
+
+
+def build_summary_messages(user_prompt):
+    """Build the chat messages for a summary prompt"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def complete_chat(user_prompt, entity_id=None):
+    """
+    Run one chat completion for a summary prompt, going through the cache
+    
+    Args:
+        user_prompt: Formatted user prompt
+        entity_id: Entity ID for logging
+    
+    Returns:
+        str: Completion text
+    
+    Raises:
+        Exception: If the OpenAI call fails
+    """
+    messages = build_summary_messages(user_prompt)
+    
+    # Identical inputs produce the same summary - reuse a cached one
+    cache_key = compute_summary_cache_key(SUMMARY_MODEL, SUMMARY_TEMPERATURE, SUMMARY_MAX_TOKENS, messages)
+    cached_summary = summary_cache.get(cache_key)
+    if cached_summary is not None:
+        logger.info(
+            "Summary served from cache",
+            entity_id=entity_id,
+            cache_key=cache_key
+        )
+        return cached_summary
+    
+    client = get_llm_client()
+    
+    logger.info(
+        "Generating summary with OpenAI",
+        entity_id=entity_id,
+        prompt_tokens_estimate=estimate_tokens(user_prompt),
+        model=SUMMARY_MODEL,
+        client=client.name
+    )
+    
+    # Every request sent, retries included, waits for a slot in the quota
+    try:
+        with span('llm.complete', client=client.name, entity_id=entity_id):
+            summary = client.complete(
+                messages,
+                model=SUMMARY_MODEL,
+                max_tokens=SUMMARY_MAX_TOKENS,
+                temperature=SUMMARY_TEMPERATURE,
+                before_attempt=get_rate_limiter().acquire
+            )
+    except Exception:
+        LLM_CALLS.labels(client=client.name, outcome='error').inc()
+        raise
+    LLM_CALLS.labels(client=client.name, outcome='success').inc()
+    summary_cache.set(cache_key, summary, model=SUMMARY_MODEL)
+    
+    return summary
+
+
+def build_summary_prompt(entity_data, reviews, review_count):
+    """Build the single-prompt summary request for a set of reviews"""
+    return REVIEW_SUMMARY_PROMPT.format(
+        entity_name=entity_data.get('name', 'Unknown'),
+        entity_type=entity_data.get('type', 'Unknown'),
+        avg_rating=entity_data.get('avgRating', 0),
+        review_count=review_count,
+        reviews_text=format_reviews_for_prompt(reviews)
+    )
+
+
+def generate_map_reduce_summary(entity_data, reviews):
+    """
+    Summarize an entity with more reviews than fit in one prompt
+    
+    Selects representative reviews (by votes, recency and rating spread) up to
+    MAX_SUMMARY_CHUNKS prompts' worth, summarizes each chunk, then combines
+    the chunk summaries. At most MAX_SUMMARY_CHUNKS + 1 calls are made,
+    each within PROMPT_TOKEN_BUDGET, however many reviews the entity has;
+    review descriptions are truncated to MAX_REVIEW_TOKENS so no single
+    review can overflow a chunk.
+    """
+    entity_id = entity_data.get('id')
+    entity_name = entity_data.get('name', 'Unknown')
+    entity_type = entity_data.get('type', 'Unknown')
+    
+    selected = select_representative_reviews(
+        reviews,
+        PROMPT_TOKEN_BUDGET * MAX_SUMMARY_CHUNKS,
+        review_prompt_tokens
+    )
+    chunks = chunk_reviews(selected, PROMPT_TOKEN_BUDGET, review_prompt_tokens)[:MAX_SUMMARY_CHUNKS]
+    selected_count = sum(len(chunk) for chunk in chunks)
+    
+    logger.info(
+        "Summarizing with map-reduce",
+        entity_id=entity_id,
+        review_count=len(reviews),
+        selected_count=selected_count,
+        chunk_count=len(chunks)
+    )
+    
+    if not chunks:
+        # Nothing fit the budget - never pay for a final call with no input
+        return NO_REVIEWS_SUMMARY
+    
+    if len(chunks) == 1:
+        return complete_chat(build_summary_prompt(entity_data, chunks[0], len(reviews)), entity_id)
+    
+    chunk_summaries = []
+    for part, chunk in enumerate(chunks, 1):
+        chunk_prompt = CHUNK_SUMMARY_PROMPT.format(
+            part=part,
+            part_count=len(chunks),
+            entity_name=entity_name,
+            entity_type=entity_type,
+            reviews_text=format_reviews_for_prompt(chunk)
+        )
+        chunk_summaries.append(f"Part {part}:\n{complete_chat(chunk_prompt, entity_id)}")
+    
+    final_prompt = FINAL_SUMMARY_PROMPT.format(
+        entity_name=entity_name,
+        entity_type=entity_type,
+        avg_rating=entity_data.get('avgRating', 0),
+        review_count=len(reviews),
+        selected_count=selected_count,
+        chunk_summaries="\n\n".join(chunk_summaries)
+    )
+    
+    return complete_chat(final_prompt, entity_id)
+
+
 def generate_summary_with_openai(entity_data, reviews):
     """
     Generate a summary of reviews using OpenAI API
     
+    Reviews that fit in PROMPT_TOKEN_BUDGET are summarized in one call;
+    larger review sets go through generate_map_reduce_summary.
+    
     Args:
         entity_data: Entity document data (dict)
         reviews: List of review documents (list of dicts)
     
     Returns:
         str: Generated summary text
+    
+    Raises:
+        Exception: If the OpenAI calls fail
     """
     if not reviews or len(reviews) == 0:
         return NO_REVIEWS_SUMMARY
     
+    review_tokens = sum(review_prompt_tokens(review) for review in reviews)
+    
+    if review_tokens <= PROMPT_TOKEN_BUDGET:
+        prompt = build_summary_prompt(entity_data, reviews, len(reviews))
+        return complete_chat(prompt, entity_data.get('id'))
+    
+    return generate_map_reduce_summary(entity_data, reviews)
+
+
+class OpenAISummarizer(SummarizerBackend):
+    """Abstractive summaries from the OpenAI chat completions API"""
+    
+    name = 'openai'
+    
+    def summarize(self, entity_data, reviews):
+        return generate_summary_with_openai(entity_data, reviews)
+
+
+SUMMARIZER_BACKENDS = {
+    OpenAISummarizer.name: OpenAISummarizer(),
+    ExtractiveSummarizer.name: ExtractiveSummarizer()
+}
+
+
+def get_summarizer_backend(name):
+    """Return the summarizer backend registered under name, or None"""
+    return SUMMARIZER_BACKENDS.get(name)
+
+
+def has_usable_summary(entity_data):
+    """Whether the entity already has a real summary worth keeping"""
+    return entity_data.get('reviewSummary') not in (None, NO_REVIEWS_SUMMARY, ERROR_SUMMARY)
+
+
+def generate_summary(entity_data, reviews):
+    """
+    Generate a summary with the primary backend, falling back on failure
+    
+    Args:
+        entity_data: Entity document data (dict)
+        reviews: List of review documents (list of dicts)
+    
+    Returns:
+        tuple: (summary, backend name) - the name is None for ERROR_SUMMARY
+    
+    Raises:
+        CircuitOpenError: If OpenAI is down and the entity already has a
+                          summary, which is better kept than replaced
+    """
+    entity_id = entity_data.get('id')
+    primary = get_summarizer_backend(SUMMARY_BACKEND)
+    
     try:
-        client = get_openai_client()
-        
-        # Model configuration (hardcoded for simplicity)
-        model = 'gpt-4o-mini'
-        max_tokens = 200
-        temperature = 0.3
-        
-        # Format reviews for the prompt
-        reviews_text = format_reviews_for_prompt(reviews)
-        
-        # Build the prompt
-        prompt = REVIEW_SUMMARY_PROMPT.format(
-            entity_name=entity_data.get('name', 'Unknown'),
-            entity_type=entity_data.get('type', 'Unknown'),
-            avg_rating=entity_data.get('avgRating', 0),
-            review_count=len(reviews),
-            reviews_text=reviews_text
-        )
-        
-        logger.info(
-            "Generating summary with OpenAI",
-            entity_id=entity_data.get('id'),
-            review_count=len(reviews),
-            model=model
-        )
-        
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=max_tokens,
-            temperature=temperature
-        )
-        
-        summary = response.choices[0].message.content.strip()
+        summary = primary.summarize(entity_data, reviews)
         
         logger.info(
             "Summary generated successfully",
-            entity_id=entity_data.get('id'),
+            entity_id=entity_id,
+            backend=primary.name,
             summary_length=len(summary)
         )
         
-        return summary
-        
+        return summary, primary.name
+    
+    except CircuitOpenError as e:
+        if has_usable_summary(entity_data):
+            raise
+        logger.warning("Summary backend unavailable", entity_id=entity_id, backend=primary.name, error=str(e))
+    
     except Exception as e:
         logger.error(
-            "Error generating summary with OpenAI",
-            entity_id=entity_data.get('id'),
+            "Error generating summary",
+            entity_id=entity_id,
+            backend=primary.name,
             error=str(e)
         )
-        return ERROR_SUMMARY
+    
+    fallback = get_summarizer_backend(SUMMARY_FALLBACK_BACKEND)
+    if fallback is None or fallback is primary:
+        return ERROR_SUMMARY, None
+    
+    try:
+        summary = fallback.summarize(entity_data, reviews)
+        logger.info("Fallback summary generated", entity_id=entity_id, backend=fallback.name)
+        return summary, fallback.name
+    
+    except Exception as e:
+        logger.error("Error generating fallback summary", entity_id=entity_id, backend=fallback.name, error=str(e))
+        return ERROR_SUMMARY, None
+
+
+def compute_review_set_hash(reviews):
+    """
+    Hash the parts of a review set that feed into the summary
+    
+    Vote counts and other metadata are left out, so only changes that could
+    alter the summary change the hash.
+    """
+    review_keys = sorted(
+        json.dumps(
+            [review.get('rating'), review.get('description', ''), sorted(review.get('tags') or [])],
+            ensure_ascii=False
+        )
+        for review in reviews
+    )
+    return hashlib.sha256('\n'.join(review_keys).encode('utf-8')).hexdigest()
+
+
+def build_summary_watermark(reviews):
+    """Build the watermark recording which review set a summary was built from"""
+    created_times = [review['createdAt'] for review in reviews if review.get('createdAt')]
+    return {
+        'contentHash': compute_review_set_hash(reviews),
+        'reviewCount': len(reviews),
+        # ISO string, so the watermark stays JSON-serializable
+        'latestReviewAt': max(created_times).isoformat() if created_times else None
+    }
+
+
+def build_summary_update(summary, watermark=None, source=None):
+    """Build the entity fields written for a summary"""
+    update = {'reviewSummary': summary}
+    if source is not None:
+        update['summarySource'] = source
+    if watermark is not None:
+        update['summaryWatermark'] = watermark
+        update['summaryStale'] = False
+    return update
 
 
-def update_entity_summary(db, entity_id, summary):
+def update_entity_summary(entity_id, summary, watermark=None, last_update_time=None, source=None):
     """
     Update entity document with generated summary
     
     Args:
-        db: Firestore client
         entity_id: Entity document ID
         summary: Generated summary text
+        watermark: Optional summary watermark; when given the entity is also
+                   marked as no longer stale
+        last_update_time: Optional entity update time the summary was based on;
+                          the write fails with FailedPrecondition if the entity
+                          has changed since
+        source: Optional name of the backend that produced the summary
     """
     try:
-        entities_ref = db.collection('entities')
-        entities_ref.document(entity_id).update({
-            'reviewSummary': summary
-        })
+        update = build_summary_update(summary, watermark, source)
+        get_entity_repository().update(entity_id, update, last_update_time)
         
         logger.info(
             "Entity summary updated",
             entity_id=entity_id
         )
-        
+    
+    except FailedPrecondition:
+        raise
+    
     except Exception as e:
         logger.error(
             "Error updating entity summary",
@@ -139,70 +463,395 @@ def update_entity_summary(db, entity_id, summary):
         raise
 
 
-def generate_summaries_for_all_entities(limit=None):
+def get_entity_reviews(entity_id):
+    """Fetch the summary fields of one entity's reviews"""
+    reviews_query = (
+        get_review_repository()
+        .for_entity(entity_id)
+        .select(REVIEW_SUMMARY_FIELDS)
+        .stream()
+    )
+    return [review.to_dict() for review in reviews_query]
+
+
+def load_reviews_by_entity(entity_ids=None):
     """
-    Generate summaries for all entities in the database
+    Stream the reviews collection once and group it by entity
+    
+    Replaces one query per entity with a single query for the whole run.
+    Only the summary fields are fetched, and reviews of entities outside
+    entity_ids are dropped while streaming.
     
     Args:
-        limit: Optional maximum number of entities to process
+        entity_ids: Optional set of entity IDs to keep
     
     Returns:
-        dict: Summary statistics (success_count, error_count, skipped_count)
+        dict: entity_id -> list of review dicts
     """
-    db = firestore.client()
-    entities_ref = db.collection('entities')
-    reviews_ref = db.collection('reviews')
+    reviews_by_entity = defaultdict(list)
+    streamed_count = 0
     
-    # Get all entities
-    query = entities_ref
-    if limit:
-        query = query.limit(limit)
+    reviews_query = get_review_repository().query().select(['entityId'] + REVIEW_SUMMARY_FIELDS).stream()
+    for review_doc in reviews_query:
+        streamed_count += 1
+        review = review_doc.to_dict()
+        entity_id = review.pop('entityId', None)
+        if entity_ids is not None and entity_id not in entity_ids:
+            continue
+        reviews_by_entity[entity_id].append(review)
     
-    entities = query.stream()
+    logger.log_firestore_operation(
+        "stream_grouped",
+        "reviews",
+        streamed_count=streamed_count,
+        entity_count=len(reviews_by_entity)
+    )
     
-    stats = {
-        'success_count': 0,
-        'error_count': 0,
-        'skipped_count': 0
-    }
+    return reviews_by_entity
+
+
+def summary_unchanged(entity_data, update):
+    """Whether the entity already holds every field of a summary update"""
+    return all(entity_data.get(field) == value for field, value in update.items())
+
+
+class SummaryWriter:
+    """
+    Queues entity summary writes on the entity repository's bulk writer
     
-    for entity_doc in entities:
+    On Firestore, writes are sent in the background in batches instead of
+    one round trip per entity. Each write is conditional on the entity's update time, like
+    update_entity_summary; entities that changed since are recorded as
+    deferred (and stay stale) instead of failing the whole set. Updates
+    identical to the stored fields are skipped. Safe to share between
+    worker threads.
+    """
+    
+    def __init__(self):
+        self.queued_count = 0
+        self.identical_count = 0
+        self._lock = threading.Lock()
+        self._writer = get_entity_repository().writer(max_attempts=SUMMARY_WRITE_MAX_ATTEMPTS)
+    
+    @property
+    def deferred_ids(self):
+        return self._writer.deferred_ids
+    
+    @property
+    def failed_ids(self):
+        return self._writer.failed_ids
+    
+    def update(self, entity_id, summary, watermark=None, last_update_time=None, source=None, current=None):
+        """
+        Queue a summary write
+        
+        Args:
+            current: Optional stored entity data; the write is skipped if it
+                     already holds the same values
+        
+        Returns:
+            bool: False if the write was skipped as identical
+        """
+        update = build_summary_update(summary, watermark, source)
+        
+        if current is not None and summary_unchanged(current, update):
+            with self._lock:
+                self.identical_count += 1
+            return False
+        
+        self._writer.update(entity_id, update, last_update_time)
+        with self._lock:
+            self.queued_count += 1
+        return True
+    
+    def close(self):
+        """
+        Flush all queued writes and wait for them
+        
+        Returns:
+            dict: written, identical, deferred and failed counts
+        """
+        self._writer.close()
+        
+        stats = {
+            'written_count': self.queued_count - len(self.deferred_ids) - len(self.failed_ids),
+            'identical_count': self.identical_count,
+            'deferred_count': len(self.deferred_ids),
+            'failed_count': len(self.failed_ids)
+        }
+        
+        logger.log_firestore_operation("bulk_update", "entities", **stats)
+        
+        return stats
+
+
+def write_entity_summaries(writes, source=None):
+    """
+    Write many entity summaries through a SummaryWriter
+    
+    Args:
+        writes: List of (entity_id, summary, watermark, last_update_time)
+        source: Optional name of the backend that produced the summaries
+    
+    Returns:
+        tuple: (written_count, deferred_ids, failed_ids)
+    """
+    writer = SummaryWriter()
+    for entity_id, summary, watermark, last_update_time in writes:
+        writer.update(entity_id, summary, watermark, last_update_time, source)
+    
+    stats = writer.close()
+    return stats['written_count'], writer.deferred_ids, writer.failed_ids
+
+
+def summarize_entity(entity_doc, incremental=False, reviews=None, writer=None):
+    """
+    Generate and store the summary for a single entity
+    
+    Args:
+        entity_doc: Entity Document
+        incremental: Skip the OpenAI call when the review set is unchanged
+                     since the stored summary watermark
+        reviews: Optional preloaded review dicts; queried when omitted
+        writer: Optional SummaryWriter to queue the write on; without one the
+                entity is updated directly
+    
+    Returns:
+        str: Outcome - 'success', 'fallback' (fallback backend used),
+             'error' (no summary could be generated), 'skipped' (no reviews),
+             'unchanged' (watermark matched) or 'deferred' (entity changed
+             mid-run)
+    """
+    entity_id = entity_doc.id
+    entity_data = entity_doc.to_dict()
+    entity_data['id'] = entity_id
+    
+    # Get reviews for this entity
+    if reviews is None:
+        reviews = get_entity_reviews(entity_id)
+    
+    watermark = build_summary_watermark(reviews)
+    stored_watermark = entity_data.get('summaryWatermark') or {}
+    
+    def write_summary(summary, summary_watermark, source=None):
+        if writer is not None:
+            writer.update(entity_id, summary, summary_watermark, entity_doc.update_time, source, current=entity_data)
+        else:
+            update_entity_summary(entity_id, summary, summary_watermark, entity_doc.update_time, source)
+    
+    try:
+        # Skip if no reviews
+        if not reviews or len(reviews) == 0:
+            logger.info("No reviews found, skipping", entity_id=entity_id)
+            write_summary(NO_REVIEWS_SUMMARY, watermark)
+            return 'skipped'
+        
+        # Reviews unchanged since the last summary (e.g. only votes changed)
+        if (
+            incremental
+            and stored_watermark.get('contentHash') == watermark['contentHash']
+            and entity_data.get('reviewSummary') not in (None, ERROR_SUMMARY)
+            and entity_data.get('summarySource', SUMMARY_BACKEND) == SUMMARY_BACKEND
+        ):
+            logger.info("Reviews unchanged since last summary, skipping", entity_id=entity_id)
+            write_summary(entity_data['reviewSummary'], watermark)
+            return 'unchanged'
+        
+        # Generate summary
+        summary, source = generate_summary(entity_data, reviews)
+        final = source == SUMMARY_BACKEND
+        
+        # Update entity - failed and fallback summaries keep the entity stale
+        # so it is retried
+        write_summary(summary, watermark if final else None, source)
+        
+        if source is None:
+            return 'error'
+        return 'success' if final else 'fallback'
+    
+    except FailedPrecondition:
+        # A review was written while summarizing - the entity stays stale
+        # and is picked up again by the next run. With a writer, deferrals
+        # are only known once it is closed
+        logger.info("Entity changed during summarization, deferring", entity_id=entity_id)
+        return 'deferred'
+
+
+# Per-entity outcome counters kept for every run
+OUTCOME_COUNTS = (
+    'success_count',
+    'fallback_count',
+    'error_count',
+    'skipped_count',
+    'unchanged_count',
+    'deferred_count',
+    'aborted_count'
+)
+
+
+def summarize_entities(entity_docs, incremental=False, concurrency=1, reviews_by_entity=None,
+                        deadline=None, processed_ids=None):
+    """
+    Summarize a sequence of entities, optionally on a thread pool
+    
+    Args:
+        entity_docs: Iterable of entity Documents
+        incremental: Passed through to summarize_entity
+        concurrency: Number of entities processed in parallel
+        reviews_by_entity: Optional preloaded reviews from load_reviews_by_entity
+        deadline: Optional time.monotonic() value after which no new entity
+                  is started (entities already started still finish)
+        processed_ids: Optional set to add the IDs of processed entities to.
+                       Entities start in order, so with a deadline these are
+                       a prefix of entity_docs
+    
+    Returns:
+        tuple: (per-worker statistics keyed by thread name, SummaryWriter stats)
+    """
+    # Each worker thread only updates its own stats dict, so only creating
+    # a worker's entry needs the lock
+    worker_stats = {}
+    worker_stats_lock = threading.Lock()
+    
+    # Summary writes from all workers go through one writer; the outcome of
+    # each queued write is remembered so deferrals can be re-counted
+    writer = SummaryWriter()
+    written_outcomes = {}
+    
+    def get_worker_stats():
+        worker_name = threading.current_thread().name
+        stats = worker_stats.get(worker_name)
+        if stats is None:
+            with worker_stats_lock:
+                stats = worker_stats.setdefault(
+                    worker_name,
+                    {**{key: 0 for key in OUTCOME_COUNTS}, 'busy_ms': 0.0}
+                )
+        return stats
+    
+    def process(entity_doc):
+        if deadline is not None and time.monotonic() >= deadline:
+            return
+        
+        start_time = time.time()
         try:
-            entity_id = entity_doc.id
-            entity_data = entity_doc.to_dict()
-            entity_data['id'] = entity_id
-            
-            # Get reviews for this entity
-            reviews_query = reviews_ref.where('entityId', '==', entity_id).stream()
-            reviews = [review.to_dict() for review in reviews_query]
-            
-            # Skip if no reviews
-            if not reviews or len(reviews) == 0:
-                logger.info("No reviews found, skipping", entity_id=entity_id)
-                update_entity_summary(db, entity_id, NO_REVIEWS_SUMMARY)
-                stats['skipped_count'] += 1
-                continue
-            
-            # Generate summary
-            summary = generate_summary_with_openai(entity_data, reviews)
-            
-            # Update entity
-            update_entity_summary(db, entity_id, summary)
-            
-            stats['success_count'] += 1
-            
+            reviews = reviews_by_entity.get(entity_doc.id, []) if reviews_by_entity is not None else None
+            outcome = summarize_entity(entity_doc, incremental=incremental, reviews=reviews, writer=writer)
+        except CircuitOpenError as e:
+            # Fails fast during an outage; the entity keeps its previous
+            # summary and stays stale for the next run
+            logger.warning("OpenAI unavailable, entity not summarized", entity_id=entity_doc.id, error=str(e))
+            outcome = 'aborted'
         except Exception as e:
             logger.error(
                 "Error processing entity",
-                entity_id=entity_id if 'entity_id' in locals() else 'unknown',
+                entity_id=entity_doc.id,
                 error=str(e)
             )
-            stats['error_count'] += 1
-            continue
+            outcome = 'error'
+        
+        stats = get_worker_stats()
+        stats[f'{outcome}_count'] += 1
+        stats['busy_ms'] += (time.time() - start_time) * 1000
+        written_outcomes[entity_doc.id] = (stats, outcome)
+        if processed_ids is not None:
+            processed_ids.add(entity_doc.id)
+    
+    if concurrency == 1:
+        for entity_doc in entity_docs:
+            process(entity_doc)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='summarizer') as executor:
+            # Consume the iterator so worker exceptions are not silently dropped
+            list(executor.map(process, entity_docs))
+    
+    write_stats = writer.close()
+    
+    # Writes rejected when flushed move their entity to deferred (entity
+    # changed mid-run) or error
+    for entity_ids, outcome in ((writer.deferred_ids, 'deferred'), (writer.failed_ids, 'error')):
+        for entity_id in entity_ids:
+            stats, original_outcome = written_outcomes[entity_id]
+            stats[f'{original_outcome}_count'] -= 1
+            stats[f'{outcome}_count'] += 1
+    
+    return worker_stats, write_stats
+
+
+def total_outcome_counts(worker_stats):
+    """Sum the outcome counters over all workers"""
+    return {
+        key: sum(worker[key] for worker in worker_stats.values())
+        for key in OUTCOME_COUNTS
+    }
+
+
+def generate_summaries_for_all_entities(limit=None, concurrency=None, incremental=False, review_fetch=None):
+    """
+    Generate summaries for all entities in the database
+    
+    Args:
+        limit: Optional maximum number of entities to process
+        concurrency: Number of entities processed in parallel
+                     (defaults to SUMMARY_CONCURRENCY)
+        incremental: Only process entities marked summaryStale by the rating
+                     trigger, and skip OpenAI calls for unchanged review sets
+        review_fetch: 'per_entity', 'grouped' or 'auto'
+                      (defaults to SUMMARY_REVIEW_FETCH)
+    
+    Returns:
+        dict: Summary statistics (success_count, error_count, skipped_count)
+              plus per-worker statistics under 'workers'
+    """
+    concurrency = max(1, concurrency or SUMMARY_CONCURRENCY)
+    
+    # Get all entities, or only those whose reviews changed since their summary
+    query = get_entity_repository().query()
+    if incremental:
+        query = query.where('summaryStale', '==', True)
+    if limit:
+        query = query.limit(limit)
+    
+    review_fetch = review_fetch or SUMMARY_REVIEW_FETCH
+    if review_fetch == 'auto' and limit and limit < GROUPED_FETCH_MIN_ENTITIES:
+        review_fetch = 'per_entity'
+    
+    reviews_by_entity = None
+    if review_fetch == 'per_entity':
+        entities = query.stream()
+    else:
+        entities = list(query.stream())
+        if review_fetch == 'auto':
+            review_fetch = 'grouped' if len(entities) >= GROUPED_FETCH_MIN_ENTITIES else 'per_entity'
+    
+    if review_fetch == 'grouped':
+        # Two queries per run regardless of catalog size: entities, then reviews
+        reviews_by_entity = load_reviews_by_entity({entity_doc.id for entity_doc in entities})
+    
+    worker_stats, write_stats = summarize_entities(
+        entities,
+        incremental=incremental,
+        concurrency=concurrency,
+        reviews_by_entity=reviews_by_entity
+    )
+    
+    stats = {
+        **total_outcome_counts(worker_stats),
+        'concurrency': concurrency,
+        'incremental': incremental,
+        'review_fetch': review_fetch,
+        'writes': write_stats,
+        'cache': summary_cache.stats()
+    }
     
     logger.info(
         "Summary generation completed",
         **stats
     )
     
+    stats['workers'] = {
+        name: {**worker, 'busy_ms': round(worker['busy_ms'], 1)}
+        for name, worker in sorted(worker_stats.items())
+    }
+    
     return stats
@@ -0,0 +1,25 @@
+"""
+Interface for pluggable review summarizer backends
+"""
+
+
+class SummarizerBackend:
+    """
+    Produces a review summary for one entity
+    
+    summarize() returns the summary text or raises; callers decide what to
+    store on failure.
+    """
+    
+    name = 'base'
+    
+    def summarize(self, entity_data, reviews):
+        """
+        Args:
+            entity_data: Entity document data (dict, with 'id')
+            reviews: List of review dicts (non-empty)
+        
+        Returns:
+            str: Summary text
+        """
+        raise NotImplementedError
@@ -0,0 +1,285 @@
+"""
+Batch-API mode for scheduled summary generation
+Instead of one synchronous completion per entity, each scheduled run collects
+the results of previously submitted batches and applies them, then writes
+the prompts for all stale entities into one batch file and submits it. The
+batch ID and the state needed to apply its results are kept in
+summaryBatches/{batchId}.
+"""
+import os
+from firebase_admin import firestore
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from config.prompts import NO_REVIEWS_SUMMARY, ERROR_SUMMARY
+from utils.llm_client import get_llm_client, BATCH_PENDING, BATCH_COMPLETED
+from utils.logger import logger
+from repositories import get_entity_repository
+from utils.review_selection import select_representative_reviews
+from utils.summarizer import (
+    SUMMARY_MODEL,
+    SUMMARY_MAX_TOKENS,
+    SUMMARY_TEMPERATURE,
+    PROMPT_TOKEN_BUDGET,
+    build_summary_prompt,
+    build_summary_messages,
+    build_summary_watermark,
+    get_entity_reviews,
+    review_prompt_tokens,
+    write_entity_summaries
+)
+from utils.summary_cache import compute_summary_cache_key, summary_cache
+
+
+SUMMARY_BATCHES_COLLECTION = 'summaryBatches'
+
+# Entities per batch; the per-entity state has to fit in one batch document
+MAX_BATCH_ENTITIES = int(os.environ.get('SUMMARY_BATCH_MAX_ENTITIES', '2000'))
+
+
+def build_batch_prompt(entity_data, reviews):
+    """
+    Build the single prompt used for an entity in batch mode
+    
+    Batches are one round trip, so map-reduce is not available. Entities over
+    the prompt budget are summarized from one prompt's worth of
+    representative reviews instead.
+    """
+    total_tokens = sum(review_prompt_tokens(review) for review in reviews)
+    if total_tokens > PROMPT_TOKEN_BUDGET:
+        reviews_for_prompt = select_representative_reviews(reviews, PROMPT_TOKEN_BUDGET, review_prompt_tokens)
+    else:
+        reviews_for_prompt = reviews
+    return build_summary_prompt(entity_data, reviews_for_prompt, len(reviews))
+
+
+def get_pending_batch_entity_ids(db):
+    """Return the IDs of entities already waiting on a submitted batch"""
+    entity_ids = set()
+    pending_batches = (
+        db.collection(SUMMARY_BATCHES_COLLECTION)
+        .where('status', '==', 'submitted')
+        .stream()
+    )
+    for batch_doc in pending_batches:
+        entity_ids.update((batch_doc.to_dict().get('entities') or {}).keys())
+    return entity_ids
+
+
+def submit_summary_batch(db, limit=None, client=None):
+    """
+    Submit one batch with prompts for every stale entity
+    
+    Entities without reviews, with an unchanged review set, or with a cached
+    summary are written directly and not sent. Entities already in a
+    submitted batch are left for that batch.
+    
+    Args:
+        db: Firestore client
+        limit: Optional maximum number of entities to consider
+        client: LLM client (defaults to get_llm_client())
+    
+    Returns:
+        dict: Statistics, including batch_id (None if nothing was submitted)
+    """
+    client = client or get_llm_client()
+    pending_ids = get_pending_batch_entity_ids(db)
+    
+    query = get_entity_repository().query().where('summaryStale', '==', True)
+    query = query.limit(min(limit, MAX_BATCH_ENTITIES) if limit else MAX_BATCH_ENTITIES)
+    
+    requests = []
+    batch_entities = {}
+    direct_writes = []
+    stats = {
+        'submitted_count': 0,
+        'pending_count': 0,
+        'skipped_count': 0,
+        'unchanged_count': 0,
+        'cached_count': 0
+    }
+    
+    for entity_doc in query.stream():
+        entity_id = entity_doc.id
+        if entity_id in pending_ids:
+            stats['pending_count'] += 1
+            continue
+        
+        entity_data = entity_doc.to_dict()
+        entity_data['id'] = entity_id
+        
+        reviews = get_entity_reviews(entity_id)
+        
+        watermark = build_summary_watermark(reviews)
+        stored_watermark = entity_data.get('summaryWatermark') or {}
+        
+        if not reviews:
+            direct_writes.append((entity_id, NO_REVIEWS_SUMMARY, watermark, entity_doc.update_time))
+            stats['skipped_count'] += 1
+            continue
+        
+        if (
+            stored_watermark.get('contentHash') == watermark['contentHash']
+            and entity_data.get('reviewSummary') not in (None, ERROR_SUMMARY)
+            and entity_data.get('summarySource', 'openai') == 'openai'
+        ):
+            direct_writes.append((entity_id, entity_data['reviewSummary'], watermark, entity_doc.update_time))
+            stats['unchanged_count'] += 1
+            continue
+        
+        messages = build_summary_messages(build_batch_prompt(entity_data, reviews))
+        cache_key = compute_summary_cache_key(SUMMARY_MODEL, SUMMARY_TEMPERATURE, SUMMARY_MAX_TOKENS, messages)
+        
+        cached_summary = summary_cache.get(cache_key)
+        if cached_summary is not None:
+            direct_writes.append((entity_id, cached_summary, watermark, entity_doc.update_time))
+            stats['cached_count'] += 1
+            continue
+        
+        requests.append({
+            'custom_id': entity_id,
+            'messages': messages,
+            'model': SUMMARY_MODEL,
+            'max_tokens': SUMMARY_MAX_TOKENS,
+            'temperature': SUMMARY_TEMPERATURE
+        })
+        # Update times are stored as RFC 3339 strings - Firestore timestamps
+        # only keep microseconds, which would break the write precondition
+        batch_entities[entity_id] = {
+            'updateTime': entity_doc.update_time.rfc3339(),
+            'watermark': watermark,
+            'cacheKey': cache_key
+        }
+    
+    if direct_writes:
+        _, deferred_ids, _ = write_entity_summaries(direct_writes)
+        stats['deferred_count'] = len(deferred_ids)
+    
+    stats['batch_id'] = None
+    if requests:
+        batch_id = client.submit_batch(requests)
+        db.collection(SUMMARY_BATCHES_COLLECTION).document(batch_id).set({
+            'batchId': batch_id,
+            'provider': client.name,
+            'status': 'submitted',
+            'model': SUMMARY_MODEL,
+            'requestCount': len(requests),
+            'entities': batch_entities,
+            'createdAt': firestore.SERVER_TIMESTAMP,
+            'updatedAt': firestore.SERVER_TIMESTAMP
+        })
+        stats['batch_id'] = batch_id
+        stats['submitted_count'] = len(requests)
+    
+    logger.info("Summary batch submission completed", **stats)
+    
+    return stats
+
+
+def apply_summary_batch(db, batch_doc, results):
+    """
+    Apply the results of a finished batch to its entities
+    
+    Every returned summary is cached first, so an entity that changed since
+    submission (and is therefore resubmitted) is served from the cache if
+    its prompt turns out identical.
+    
+    Returns:
+        dict: Counts of applied, deferred and failed entities
+    """
+    batch_data = batch_doc.to_dict()
+    writes = []
+    failed_count = 0
+    
+    for entity_id, entry in (batch_data.get('entities') or {}).items():
+        summary = results.get(entity_id)
+        if not summary:
+            # Entity stays stale and goes into the next batch
+            failed_count += 1
+            continue
+        
+        summary_cache.set(entry['cacheKey'], summary, model=batch_data.get('model'))
+        writes.append((
+            entity_id,
+            summary,
+            entry['watermark'],
+            DatetimeWithNanoseconds.from_rfc3339(entry['updateTime'])
+        ))
+    
+    applied_count, deferred_ids, failed_ids = write_entity_summaries(writes, source='openai')
+    
+    return {
+        'applied_count': applied_count,
+        'deferred_count': len(deferred_ids),
+        'failed_count': failed_count + len(failed_ids)
+    }
+
+
+def collect_summary_batches(db, client=None):
+    """
+    Check every submitted batch and apply the ones that have finished
+    
+    Returns:
+        dict: Aggregate statistics over the collected batches
+    """
+    client = client or get_llm_client()
+    stats = {
+        'batches_pending': 0,
+        'batches_applied': 0,
+        'batches_failed': 0,
+        'applied_count': 0,
+        'deferred_count': 0,
+        'failed_count': 0
+    }
+    
+    submitted_batches = (
+        db.collection(SUMMARY_BATCHES_COLLECTION)
+        .where('status', '==', 'submitted')
+        .stream()
+    )
+    
+    for batch_doc in submitted_batches:
+        batch_id = batch_doc.id
+        try:
+            batch = client.get_batch(batch_id)
+            if batch['status'] == BATCH_PENDING:
+                stats['batches_pending'] += 1
+                continue
+            
+            counts = apply_summary_batch(db, batch_doc, batch.get('results') or {})
+            status = 'applied' if batch['status'] == BATCH_COMPLETED else 'failed'
+            
+            batch_doc.reference.update({
+                'status': status,
+                'appliedCount': counts['applied_count'],
+                'deferredCount': counts['deferred_count'],
+                'failedCount': counts['failed_count'],
+                'completedAt': firestore.SERVER_TIMESTAMP,
+                'updatedAt': firestore.SERVER_TIMESTAMP
+            })
+            
+            stats[f'batches_{status}'] += 1
+            for key, value in counts.items():
+                stats[key] += value
+            
+            logger.info("Summary batch collected", batch_id=batch_id, status=status, **counts)
+        
+        except Exception as e:
+            # Leave the batch submitted so the next run retries it
+            logger.error("Error collecting summary batch", batch_id=batch_id, error=str(e))
+    
+    return stats
+
+
+def run_summary_batch_cycle(limit=None):
+    """
+    One scheduled batch-mode run: apply finished batches, then submit a new one
+    
+    Returns:
+        dict: Collection statistics under 'collected', submission under 'submitted'
+    """
+    db = firestore.client()
+    client = get_llm_client()
+    
+    collected = collect_summary_batches(db, client)
+    submitted = submit_summary_batch(db, limit=limit, client=client)
+    
+    return {'collected': collected, 'submitted': submitted}
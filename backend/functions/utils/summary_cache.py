@@ -0,0 +1,187 @@
+"""
+Content-addressed cache for generated review summaries
+Summaries are keyed by a hash of everything that determines the OpenAI output
+(prompt version, model, sampling parameters and the fully formatted messages),
+so identical inputs are never paid for twice. Lookups go to an in-memory LRU
+tier first and then to a persistent store: the summaryCache Firestore
+collection, or none with DATA_BACKEND=memory.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from firebase_admin import firestore
+from config.prompts import PROMPT_VERSION
+from repositories.provider import DATA_BACKEND
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+SUMMARY_CACHE_COLLECTION = 'summaryCache'
+
+# Maximum number of summaries kept in memory per instance
+MEMORY_CACHE_SIZE = int(os.environ.get('SUMMARY_CACHE_MEMORY_SIZE', '1000'))
+
+# Persistent entries expire after this many days (enforced by a Firestore TTL
+# policy on the expiresAt field)
+PERSISTENT_CACHE_TTL_DAYS = int(os.environ.get('SUMMARY_CACHE_TTL_DAYS', '30'))
+
+
+def compute_summary_cache_key(model, temperature, max_tokens, messages):
+    """
+    Hash the inputs that determine a summary into a cache key
+    
+    Args:
+        model: OpenAI model name
+        temperature: Sampling temperature
+        max_tokens: Completion token limit
+        messages: Chat messages sent to the model
+    
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {
+            'promptVersion': PROMPT_VERSION,
+            'model': model,
+            'temperature': temperature,
+            'maxTokens': max_tokens,
+            'messages': messages
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class FirestoreSummaryCacheStore:
+    """Persistent summary cache tier in the summaryCache collection"""
+    
+    def __init__(self, db=None):
+        # Without a client, firestore.client() is looked up on every call
+        self._db = db
+    
+    @property
+    def db(self):
+        return self._db or firestore.client()
+    
+    def get(self, key):
+        """Return the stored entry as a dict, or None"""
+        cache_doc = self.db.collection(SUMMARY_CACHE_COLLECTION).document(key).get()
+        return cache_doc.to_dict() if cache_doc.exists else None
+    
+    def set(self, key, entry):
+        self.db.collection(SUMMARY_CACHE_COLLECTION).document(key).set(entry)
+
+
+def create_summary_cache_store():
+    """Persistent store for the DATA_BACKEND in use (None keeps memory only)"""
+    if DATA_BACKEND == 'memory':
+        return None
+    return FirestoreSummaryCacheStore()
+
+
+class SummaryCache:
+    """
+    Two-tier summary cache: in-memory LRU in front of a persistent store
+    
+    The store is anything with get(key) -> dict or None and set(key, entry),
+    or None to keep summaries in memory only. Tests and benchmarks can swap
+    it on the shared instance.
+    """
+    
+    def __init__(self, memory_size: int = MEMORY_CACHE_SIZE, store=None):
+        self.memory_size = memory_size
+        self.store = store
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'persistent_hits': 0, 'misses': 0}
+    
+    def _remember(self, key, summary):
+        """Insert into the in-memory tier, evicting the least recently used entry"""
+        with self._lock:
+            self._memory[key] = summary
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+    
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+    
+    def get(self, key):
+        """
+        Look up a cached summary
+        
+        Returns:
+            str or None: The cached summary, or None on a miss
+        """
+        with self._lock:
+            summary = self._memory.get(key)
+            if summary is not None:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return summary
+        
+        if self.store is not None:
+            try:
+                cache_data = self.store.get(key)
+                if cache_data is not None:
+                    # Entries from an older prompt version are never served
+                    if cache_data.get('promptVersion') == PROMPT_VERSION:
+                        summary = cache_data.get('summary')
+                        self._remember(key, summary)
+                        self._count('persistent_hits')
+                        return summary
+            except Exception as e:
+                # The cache is an optimization - fall through to a miss
+                logger.warning("Error reading summary cache", cache_key=key, error=str(e))
+        
+        self._count('misses')
+        return None
+    
+    def set(self, key, summary, model=None):
+        """Store a summary in both tiers"""
+        self._remember(key, summary)
+        
+        if self.store is None:
+            return
+        
+        try:
+            now = datetime.now(timezone.utc)
+            self.store.set(key, {
+                'summary': summary,
+                'promptVersion': PROMPT_VERSION,
+                'model': model,
+                'createdAt': now,
+                'expiresAt': now + timedelta(days=PERSISTENT_CACHE_TTL_DAYS)
+            })
+        except Exception as e:
+            logger.warning("Error writing summary cache", cache_key=key, error=str(e))
+    
+    def stats(self):
+        """Return a copy of the hit/miss counters"""
+        with self._lock:
+            return dict(self._stats)
+    
+    def clear(self):
+        """Drop the in-memory tier and reset the counters"""
+        with self._lock:
+            self._memory.clear()
+            self._stats = {key: 0 for key in self._stats}
+
+
+# Shared cache instance for this function instance
+summary_cache = SummaryCache(store=create_summary_cache_store())
+
+
+def summary_cache_hit_ratio():
+    stats = summary_cache.stats()
+    lookups = sum(stats.values())
+    return round((stats['memory_hits'] + stats['persistent_hits']) / lookups, 4) if lookups else None
+
+
+metrics.gauge('summary_cache_lookups', summary_cache.stats, 'Summary cache lookups by result')
+metrics.gauge('summary_cache_hit_ratio', summary_cache_hit_ratio, 'Share of summary cache lookups that hit')
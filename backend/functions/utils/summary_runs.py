@@ -0,0 +1,349 @@
+"""
+Checkpointed, sharded summary runs
+A run splits the entities to summarize into shards of contiguous document ID
+ranges. Each shard is processed by its own task queue invocation and saves a
+cursor (the last entity ID done) after every page, or after the last entity
+finished when the time budget runs out mid-page, so a shard that runs out of
+time or is killed resumes where it stopped instead of starting over.
+
+Run state lives in summaryRuns/{runId}, shard state in
+summaryRuns/{runId}/shards/{shardId}.
+"""
+import itertools
+import os
+import time
+from firebase_admin import firestore
+from utils.logger import logger
+from repositories import get_entity_repository
+from utils.summarizer import (
+    OUTCOME_COUNTS,
+    SUMMARY_CONCURRENCY,
+    summarize_entities,
+    total_outcome_counts
+)
+from utils.task_queue import get_task_queue
+
+
+SUMMARY_RUNS_COLLECTION = 'summaryRuns'
+
+# Task queue function that processes shards
+SHARD_TASK_FUNCTION = 'process_summary_shard'
+
+# Entities per shard
+SUMMARY_SHARD_SIZE = int(os.environ.get('SUMMARY_SHARD_SIZE', '500'))
+
+# Entities summarized between checkpoints
+SHARD_PAGE_SIZE = 50
+
+# Shard invocations stop starting new entities after this long, leaving room
+# within the 540s function timeout for entities in flight (including their
+# OpenAI retries) to finish, the checkpoint to be saved and the re-enqueue
+SHARD_TIME_BUDGET_SEC = 420
+
+# A shard whose checkpoint has not moved for this long is considered dead
+STALE_SHARD_SECONDS = 900
+
+# Firestore batch write limit
+MAX_BATCH_WRITES = 500
+
+
+def get_shard_queue():
+    """Return the task queue that dispatches shards"""
+    return get_task_queue(SHARD_TASK_FUNCTION, local_handler=handle_summary_shard_task)
+
+
+def shard_task_id(run_id, shard_id, generation):
+    """Task ID for one shard invocation; keeps retried enqueues idempotent"""
+    return f"{run_id}-{shard_id}-{generation}"
+
+
+def enqueue_shard(queue, run_id, shard_id, generation):
+    queue.enqueue(
+        {'runId': run_id, 'shardId': shard_id, 'generation': generation},
+        task_id=shard_task_id(run_id, shard_id, generation)
+    )
+
+
+def build_entity_query(incremental):
+    """Entities of a run, in document ID order so ranges and cursors are stable"""
+    query = get_entity_repository().query()
+    if incremental:
+        query = query.where('summaryStale', '==', True)
+    return query.order_by('__name__')
+
+
+def plan_shards(incremental, shard_size=SUMMARY_SHARD_SIZE):
+    """
+    Split the run's entities into contiguous ID ranges
+    
+    Only document IDs are fetched (no fields).
+    
+    Returns:
+        list: (start_id, end_id, entity_count) tuples, both bounds inclusive
+    """
+    shards = []
+    shard_ids = []
+    
+    for entity_doc in build_entity_query(incremental).select([]).stream():
+        shard_ids.append(entity_doc.id)
+        if len(shard_ids) == shard_size:
+            shards.append((shard_ids[0], shard_ids[-1], len(shard_ids)))
+            shard_ids = []
+    
+    if shard_ids:
+        shards.append((shard_ids[0], shard_ids[-1], len(shard_ids)))
+    
+    return shards
+
+
+def get_active_run(db):
+    """Return the snapshot of the run still in progress, or None"""
+    runs = (
+        db.collection(SUMMARY_RUNS_COLLECTION)
+        .where('status', '==', 'running')
+        .limit(1)
+        .stream()
+    )
+    return next(iter(runs), None)
+
+
+def resume_stale_shards(db, run_ref):
+    """
+    Re-enqueue unfinished shards whose checkpoint has not moved recently
+    
+    Covers invocations that died without re-enqueueing themselves, after
+    Cloud Tasks retries are exhausted.
+    
+    Returns:
+        int: Number of shards re-enqueued
+    """
+    queue = get_shard_queue()
+    resumed = 0
+    
+    for shard_doc in run_ref.collection('shards').where('status', '!=', 'completed').stream():
+        shard_data = shard_doc.to_dict()
+        updated_at = shard_data.get('updatedAt')
+        if updated_at is not None and time.time() - updated_at.timestamp() <= STALE_SHARD_SECONDS:
+            continue
+        
+        generation = shard_data.get('generation', 0) + 1
+        shard_doc.reference.update({
+            'status': 'pending',
+            'generation': generation,
+            'updatedAt': firestore.SERVER_TIMESTAMP
+        })
+        enqueue_shard(queue, run_ref.id, shard_doc.id, generation)
+        resumed += 1
+    
+    if resumed:
+        logger.warning("Resumed stale summary shards", run_id=run_ref.id, shard_count=resumed)
+    
+    return resumed
+
+
+def start_summary_run(incremental=True, concurrency=None):
+    """
+    Start a sharded summary run, or resume the one still in progress
+    
+    Returns:
+        dict: run_id, whether an existing run was resumed, and shard counts
+    """
+    db = firestore.client()
+    
+    active_run = get_active_run(db)
+    if active_run is not None:
+        resumed = resume_stale_shards(db, active_run.reference)
+        return {
+            'run_id': active_run.id,
+            'resumed': True,
+            'shard_count': active_run.to_dict().get('shardCount', 0),
+            'resumed_shards': resumed
+        }
+    
+    shards = plan_shards(incremental)
+    run_ref = db.collection(SUMMARY_RUNS_COLLECTION).document()
+    entity_count = sum(count for _, _, count in shards)
+    
+    writes = [(run_ref, {
+        'status': 'running' if shards else 'completed',
+        'incremental': incremental,
+        'concurrency': max(1, concurrency or SUMMARY_CONCURRENCY),
+        'shardCount': len(shards),
+        'shardsCompleted': 0,
+        'entityCount': entity_count,
+        'createdAt': firestore.SERVER_TIMESTAMP,
+        'updatedAt': firestore.SERVER_TIMESTAMP
+    })]
+    for index, (start_id, end_id, count) in enumerate(shards):
+        writes.append((run_ref.collection('shards').document(f"{index:05d}"), {
+            'startAt': start_id,
+            'endAt': end_id,
+            'entityCount': count,
+            'cursor': None,
+            'status': 'pending',
+            'generation': 0,
+            'processedCount': 0,
+            'stats': {key: 0 for key in OUTCOME_COUNTS},
+            'updatedAt': firestore.SERVER_TIMESTAMP
+        }))
+    
+    for i in range(0, len(writes), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for ref, data in writes[i:i + MAX_BATCH_WRITES]:
+            batch.set(ref, data)
+        batch.commit()
+    
+    queue = get_shard_queue()
+    for index in range(len(shards)):
+        enqueue_shard(queue, run_ref.id, f"{index:05d}", 0)
+    
+    logger.info(
+        "Summary run started",
+        run_id=run_ref.id,
+        shard_count=len(shards),
+        entity_count=entity_count,
+        incremental=incremental
+    )
+    
+    return {
+        'run_id': run_ref.id,
+        'resumed': False,
+        'shard_count': len(shards),
+        'entity_count': entity_count
+    }
+
+
+@firestore.transactional
+def complete_shard_in_transaction(transaction, run_ref, shard_ref):
+    """
+    Mark a shard done, count it towards the run and complete the run once
+    every shard is done
+    
+    Counting and the completion check share one transaction, so two shards
+    finishing together cannot both (or neither) see the final count.
+    
+    Returns:
+        bool: Whether this shard completed the run
+    """
+    run_data = run_ref.get(transaction=transaction).to_dict() or {}
+    shard_data = shard_ref.get(transaction=transaction).to_dict() or {}
+    
+    # A duplicate invocation must not count the shard twice
+    if shard_data.get('status') == 'completed':
+        return False
+    
+    shards_completed = run_data.get('shardsCompleted', 0) + 1
+    run_completed = shards_completed >= run_data.get('shardCount', 0)
+    
+    run_update = {'shardsCompleted': shards_completed, 'updatedAt': firestore.SERVER_TIMESTAMP}
+    if run_completed:
+        run_update.update({'status': 'completed', 'completedAt': firestore.SERVER_TIMESTAMP})
+    
+    transaction.update(shard_ref, {'status': 'completed', 'updatedAt': firestore.SERVER_TIMESTAMP})
+    transaction.update(run_ref, run_update)
+    return run_completed
+
+
+def complete_shard(db, run_ref, shard_ref):
+    """Mark a shard done, completing the run if it was the last one"""
+    if complete_shard_in_transaction(db.transaction(), run_ref, shard_ref):
+        logger.info("Summary run completed", run_id=run_ref.id)
+
+
+def run_summary_shard(db, run_id, shard_id, generation, deadline):
+    """
+    Process one shard from its checkpoint until done or out of time
+    
+    Args:
+        db: Firestore client
+        run_id: Run document ID
+        shard_id: Shard document ID
+        generation: Invocation generation from the task payload; tasks from an
+                    older generation are duplicates and do nothing
+        deadline: time.monotonic() value after which no new entity is started
+    
+    Returns:
+        str: 'completed', 'paused' (re-enqueued) or 'ignored'
+    """
+    run_ref = db.collection(SUMMARY_RUNS_COLLECTION).document(run_id)
+    shard_ref = run_ref.collection('shards').document(shard_id)
+    
+    shard_doc = shard_ref.get()
+    run_doc = run_ref.get()
+    if not shard_doc.exists or not run_doc.exists:
+        return 'ignored'
+    
+    shard_data = shard_doc.to_dict()
+    if shard_data.get('status') == 'completed' or shard_data.get('generation', 0) != generation:
+        return 'ignored'
+    
+    run_data = run_doc.to_dict()
+    incremental = run_data.get('incremental', True)
+    concurrency = run_data.get('concurrency', 1)
+    
+    shard_ref.update({'status': 'running', 'updatedAt': firestore.SERVER_TIMESTAMP})
+    cursor = shard_data.get('cursor')
+    
+    while True:
+        if time.monotonic() >= deadline:
+            # Hand the rest of the shard to a fresh invocation
+            shard_ref.update({
+                'status': 'pending',
+                'generation': generation + 1,
+                'updatedAt': firestore.SERVER_TIMESTAMP
+            })
+            enqueue_shard(get_shard_queue(), run_id, shard_id, generation + 1)
+            logger.info("Summary shard paused, re-queued", run_id=run_id, shard_id=shard_id, cursor=cursor)
+            return 'paused'
+        
+        query = build_entity_query(incremental)
+        if cursor:
+            query = query.where('__name__', '>', cursor)
+        else:
+            query = query.where('__name__', '>=', shard_data['startAt'])
+        query = query.where('__name__', '<=', shard_data['endAt'])
+        
+        page = query.limit(SHARD_PAGE_SIZE).get()
+        if not page:
+            break
+        
+        # Summary writes are flushed before the checkpoint moves past them
+        processed_ids = set()
+        worker_stats, _ = summarize_entities(
+            page,
+            incremental=incremental,
+            concurrency=concurrency,
+            deadline=deadline,
+            processed_ids=processed_ids
+        )
+        counts = total_outcome_counts(worker_stats)
+        
+        # Entities are started in order, so the processed ones are a prefix
+        # of the page; the rest were not started before the deadline
+        finished = list(itertools.takewhile(lambda entity_doc: entity_doc.id in processed_ids, page))
+        if not finished:
+            continue
+        cursor = finished[-1].id
+        
+        # Checkpoint after every page (or the part of it done in time)
+        shard_ref.update({
+            'cursor': cursor,
+            'processedCount': firestore.Increment(len(finished)),
+            **{f'stats.{key}': firestore.Increment(value) for key, value in counts.items()},
+            'updatedAt': firestore.SERVER_TIMESTAMP
+        })
+    
+    complete_shard(db, run_ref, shard_ref)
+    logger.info("Summary shard completed", run_id=run_id, shard_id=shard_id)
+    return 'completed'
+
+
+def handle_summary_shard_task(payload):
+    """Run a shard task payload within the shard time budget"""
+    return run_summary_shard(
+        firestore.client(),
+        payload['runId'],
+        payload['shardId'],
+        payload.get('generation', 0),
+        deadline=time.monotonic() + SHARD_TIME_BUDGET_SEC
+    )
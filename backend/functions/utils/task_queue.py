@@ -0,0 +1,129 @@
+"""
+Task queue abstraction for fanning work out across function invocations
+CloudTaskQueue enqueues to a Cloud Tasks queue backing a task queue function
+(tasks_fn.on_task_dispatched); LocalTaskQueue is an in-process stand-in that
+runs tasks on a background thread, for local runs and testing.
+"""
+import os
+import queue
+import threading
+from utils.logger import logger
+
+
+# Which queue get_task_queue() returns: 'cloud' or 'local'
+TASK_QUEUE = os.environ.get('TASK_QUEUE', 'cloud')
+
+# Region the task queue functions are deployed to
+TASK_QUEUE_REGION = 'asia-southeast1'
+
+
+class TaskQueue:
+    """Interface for enqueueing JSON-serializable task payloads"""
+    
+    def enqueue(self, payload, task_id=None, delay_seconds=None):
+        """
+        Enqueue one task
+        
+        Args:
+            payload: JSON-serializable dict passed to the task handler
+            task_id: Optional ID; enqueueing the same ID twice is a no-op
+            delay_seconds: Optional delay before the task is dispatched
+        """
+        raise NotImplementedError
+
+
+class CloudTaskQueue(TaskQueue):
+    """Cloud Tasks queue of a deployed task queue function"""
+    
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self._queue = None
+    
+    def enqueue(self, payload, task_id=None, delay_seconds=None):
+        from firebase_admin import functions
+        from firebase_admin.exceptions import AlreadyExistsError
+        
+        if self._queue is None:
+            self._queue = functions.task_queue(
+                f"locations/{TASK_QUEUE_REGION}/functions/{self.function_name}"
+            )
+        
+        try:
+            self._queue.enqueue(
+                payload,
+                functions.TaskOptions(task_id=task_id, schedule_delay_seconds=delay_seconds)
+            )
+        except AlreadyExistsError:
+            logger.info("Task already enqueued", function=self.function_name, task_id=task_id)
+
+
+class LocalTaskQueue(TaskQueue):
+    """
+    In-process stand-in for CloudTaskQueue
+    
+    Tasks are handed to `handler` on a single background worker thread.
+    Delays are ignored. Duplicate task IDs are dropped like in Cloud Tasks.
+    """
+    
+    def __init__(self, function_name, handler):
+        self.function_name = function_name
+        self.handler = handler
+        self._tasks = queue.Queue()
+        self._seen_task_ids = set()
+        self._lock = threading.Lock()
+        self._worker = None
+    
+    def _run(self):
+        while True:
+            payload = self._tasks.get()
+            try:
+                self.handler(payload)
+            except Exception as e:
+                logger.error("Local task failed", error=e, function=self.function_name)
+            finally:
+                self._tasks.task_done()
+    
+    def enqueue(self, payload, task_id=None, delay_seconds=None):
+        with self._lock:
+            if task_id is not None:
+                if task_id in self._seen_task_ids:
+                    return
+                self._seen_task_ids.add(task_id)
+            
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name=f"tasks-{self.function_name}",
+                    daemon=True
+                )
+                self._worker.start()
+        
+        self._tasks.put(payload)
+    
+    def join(self):
+        """Block until every enqueued task, including ones they enqueue, is done"""
+        self._tasks.join()
+
+
+_local_queues = {}
+_local_queues_lock = threading.Lock()
+
+
+def get_task_queue(function_name, local_handler=None):
+    """
+    Return the task queue for a task queue function
+    
+    Args:
+        function_name: Name of the tasks_fn function that handles the tasks
+        local_handler: Callable(payload) used by the local stand-in
+    
+    Returns:
+        TaskQueue: CloudTaskQueue, or a shared LocalTaskQueue when TASK_QUEUE=local
+    """
+    if TASK_QUEUE != 'local':
+        return CloudTaskQueue(function_name)
+    
+    with _local_queues_lock:
+        if function_name not in _local_queues:
+            _local_queues[function_name] = LocalTaskQueue(function_name, local_handler)
+        return _local_queues[function_name]
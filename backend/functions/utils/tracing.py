@@ -0,0 +1,248 @@
+"""
+Lightweight per-request tracing
+A trace is started for each HTTP request by the @traced decorator and kept in
+a context variable. Code on the request path times its steps with
+`with span("firestore.reviews.get"):`. When the request finishes, the spans
+are logged as one structured line and returned in a Server-Timing header.
+
+The trace ID comes from an incoming W3C `traceparent` header (or Cloud
+Run's X-Cloud-Trace-Context) when there is one, so log lines of the same
+request across services share it. Outside a traced request span() does
+nothing. Work handed to other threads is not traced.
+
+Log lines of a traced request are sampled as set in config/log_sampling.py.
+The decision uses the trace ID, so a request keeps or drops a level in every
+service that shares the sampling configuration.
+"""
+import contextvars
+import functools
+import logging
+import os
+import re
+import secrets
+import time
+from contextlib import contextmanager
+from config.log_sampling import LOG_SAMPLING_ENABLED, get_sample_rate, get_slow_request_ms
+from utils.logger import log_buffer, log_context, logger
+from utils.metrics import LOG_RECORDS, REQUEST_DURATION, metrics, record_span
+
+
+# Project used to link log lines to Cloud Trace
+GOOGLE_CLOUD_PROJECT = os.environ.get('GOOGLE_CLOUD_PROJECT') or os.environ.get('GCLOUD_PROJECT')
+
+# Spans kept per request; later spans are only counted
+MAX_SPANS = 100
+
+TRACEPARENT_PATTERN = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+CLOUD_TRACE_PATTERN = re.compile(r'^([0-9a-fA-F]{32})(?:/(\d+))?(?:;o=([01]))?$')
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+class Trace:
+    """Spans recorded while handling one request"""
+    
+    def __init__(self, name, trace_id=None, parent_span_id=None, sampled=True):
+        self.name = name
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.sampled = sampled
+        self.spans = []
+        self.dropped_spans = 0
+        self.start = time.perf_counter()
+    
+    def add_span(self, name, duration_ms, attributes):
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped_spans += 1
+            return
+        self.spans.append((name, duration_ms, attributes))
+    
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+    
+    def traceparent(self):
+        """traceparent header value naming this request as the parent"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+    
+    def span_totals(self):
+        """
+        Total duration and count per span name, in first-seen order
+        
+        Returns:
+            dict: name -> (duration_ms, count)
+        """
+        totals = {}
+        for name, duration_ms, _ in self.spans:
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + duration_ms, count + 1)
+        return totals
+    
+    def server_timing(self, total_ms):
+        """Server-Timing header value: one entry per span name, plus the total"""
+        entries = []
+        for name, (duration_ms, count) in self.span_totals().items():
+            entry = f"{name};dur={duration_ms:.1f}"
+            if count > 1:
+                entry += f';desc="{count} calls"'
+            entries.append(entry)
+        entries.append(f"total;dur={total_ms:.1f}")
+        return ', '.join(entries)
+
+
+def parse_traceparent(headers):
+    """
+    Read the caller's trace context
+    
+    Returns:
+        tuple: (trace_id, parent_span_id, sampled), or (None, None, True)
+    """
+    match = TRACEPARENT_PATTERN.match((headers.get('traceparent') or '').strip().lower())
+    if match:
+        version, trace_id, parent_span_id, flags = match.groups()
+        if version != 'ff' and trace_id != '0' * 32 and parent_span_id != '0' * 16:
+            return trace_id, parent_span_id, bool(int(flags, 16) & 1)
+    
+    match = CLOUD_TRACE_PATTERN.match((headers.get('X-Cloud-Trace-Context') or '').strip())
+    if match:
+        trace_id, span_id, sampled = match.groups()
+        parent_span_id = f"{int(span_id):016x}"[-16:] if span_id else None
+        return trace_id.lower(), parent_span_id, sampled != '0'
+    
+    return None, None, True
+
+
+def current_trace():
+    """The trace of the request being handled, or None"""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a span of the current trace
+    
+    The duration is also recorded in the metrics registry, inside a traced
+    request or not.
+    
+    Args:
+        name: Span name; Server-Timing needs a token, so use letters,
+              digits, '.', '_' or '-' (e.g. "firestore.reviews.query")
+        attributes: Extra fields logged with the span
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        record_span(name, duration_ms)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, duration_ms, attributes)
+
+
+def trace_log_fields(trace):
+    """Fields that tie log lines to the trace"""
+    fields = {'trace_id': trace.trace_id, 'span_id': trace.span_id}
+    if GOOGLE_CLOUD_PROJECT:
+        fields['logging.googleapis.com/trace'] = f"projects/{GOOGLE_CLOUD_PROJECT}/traces/{trace.trace_id}"
+        fields['logging.googleapis.com/spanId'] = trace.span_id
+    return fields
+
+
+def log_trace(trace, status, total_ms):
+    """Log the spans of a finished request as one structured line"""
+    logger.info(
+        "Request trace",
+        endpoint=trace.name,
+        response_status=status,
+        duration_ms=round(total_ms, 1),
+        parent_span_id=trace.parent_span_id,
+        spans=[
+            {'name': name, 'duration_ms': round(duration_ms, 2), **attributes}
+            for name, duration_ms, attributes in trace.spans
+        ],
+        dropped_spans=trace.dropped_spans
+    )
+
+
+def sample_position(trace_id):
+    """Place a trace ID in [0, 1); lines are kept when the rate is above it"""
+    return int(trace_id[-8:], 16) / 0x100000000
+
+
+def write_sampled_logs(trace, records, status, total_ms):
+    """
+    Write the held-back log lines of a finished request
+    
+    Everything is kept for failed or slow requests, and ERROR and above
+    always; other lines are kept when the request's trace ID is sampled for
+    their level. Each written line gets a sample_weight field.
+    """
+    keep_all = status >= 500 or total_ms >= get_slow_request_ms(trace.name)
+    position = sample_position(trace.trace_id)
+    
+    kept = 0
+    for record in records:
+        weight = 1
+        if not keep_all and record.levelno < logging.ERROR:
+            rate = get_sample_rate(trace.name, record.levelname)
+            if position >= rate:
+                continue
+            weight = round(1 / rate, 3)
+        record.fields['sample_weight'] = weight
+        logger.write(record)
+        kept += 1
+    
+    if kept:
+        LOG_RECORDS.labels(endpoint=trace.name, outcome='kept').inc(kept)
+    if len(records) > kept:
+        LOG_RECORDS.labels(endpoint=trace.name, outcome='sampled_out').inc(len(records) - kept)
+
+
+def traced(handler):
+    """
+    Trace an HTTP handler
+    
+    Place it under @https_fn.on_request(). Adds Server-Timing,
+    Timing-Allow-Origin and traceparent headers to the response, and the
+    trace ID to every log line written while the handler runs, and records
+    the handler latency per endpoint and status. Log lines are held back
+    and sampled once the response status and latency are known.
+    """
+    @functools.wraps(handler)
+    def wrapper(req, *args, **kwargs):
+        metrics.start_periodic_dump()
+        trace_id, parent_span_id, sampled = parse_traceparent(req.headers)
+        trace = Trace(handler.__name__, trace_id, parent_span_id, sampled)
+        
+        trace_token = _current_trace.set(trace)
+        context_token = log_context.set({**(log_context.get() or {}), **trace_log_fields(trace)})
+        records = [] if LOG_SAMPLING_ENABLED else None
+        buffer_token = log_buffer.set(records)
+        status = 500
+        try:
+            try:
+                response = handler(req, *args, **kwargs)
+            except Exception:
+                REQUEST_DURATION.labels(endpoint=trace.name, status=500).observe(trace.elapsed_ms())
+                raise
+            
+            status = response.status_code
+            total_ms = trace.elapsed_ms()
+            REQUEST_DURATION.labels(endpoint=trace.name, status=status).observe(total_ms)
+            response.headers['Server-Timing'] = trace.server_timing(total_ms)
+            response.headers['Timing-Allow-Origin'] = '*'
+            response.headers['traceparent'] = trace.traceparent()
+            
+            if req.method != 'OPTIONS':
+                log_trace(trace, status, total_ms)
+            return response
+        finally:
+            log_buffer.reset(buffer_token)
+            if records:
+                write_sampled_logs(trace, records, status, trace.elapsed_ms())
+            log_context.reset(context_token)
+            _current_trace.reset(trace_token)
+    
+    return wrapper
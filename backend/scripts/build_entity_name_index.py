@@ -0,0 +1,70 @@
+"""
+Build the duplicate-detection name index from the existing entities
+Run once after deploying near-duplicate detection, and again after seeding
+entities via the other seed scripts.
+Usage: GOOGLE_CLOUD_PROJECT=your-project-id python build_entity_name_index.py
+"""
+
+import os
+import re
+import sys
+import unicodedata
+from google.cloud import firestore
+
+
+# Must match STOPWORDS and normalize_entity_name in functions/utils/entity_index.py
+STOPWORDS = {'the', 'a', 'an', 'of', 'and', 'at'}
+
+
+def normalize_entity_name(name):
+    """Casefold, strip accents, punctuation and stopwords from a name"""
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[^0-9a-z]+', ' ', text.casefold())
+    return ' '.join(word for word in text.split() if word not in STOPWORDS)
+
+
+def build_entity_name_index():
+    """Scan all entities once and rewrite entityNameIndex/{TYPE}"""
+    
+    project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
+    if not project_id:
+        print("Error: GOOGLE_CLOUD_PROJECT environment variable is required")
+        print("Usage: GOOGLE_CLOUD_PROJECT=your-project-id python build_entity_name_index.py")
+        sys.exit(1)
+    
+    db = firestore.Client(project=project_id)
+    
+    print(f"Connecting to Firestore project: {project_id}")
+    print("Scanning entities...")
+    
+    entries_by_type = {}
+    
+    for doc in db.collection('entities').select(['name', 'type', 'location']).stream():
+        entity_data = doc.to_dict() or {}
+        entity_type = entity_data.get('type')
+        if not entity_type:
+            continue
+        
+        entry = {
+            'name': entity_data.get('name', ''),
+            'key': normalize_entity_name(entity_data.get('name', ''))
+        }
+        location = entity_data.get('location')
+        if hasattr(location, 'latitude'):
+            entry['lat'] = location.latitude
+            entry['lng'] = location.longitude
+        
+        entries_by_type.setdefault(entity_type, {})[doc.id] = entry
+    
+    # Overwrite each index document so entries for deleted entities are dropped
+    index_ref = db.collection('entityNameIndex')
+    for entity_type, entries in entries_by_type.items():
+        index_ref.document(entity_type).set({'entries': entries})
+        print(f"Indexed {entity_type}: {len(entries)} entities")
+    
+    print("\n✅ Successfully built entity name index")
+
+
+if __name__ == "__main__":
+    build_entity_name_index()
@@ -0,0 +1,52 @@
+"""
+Mark every entity as needing a new review summary
+Run once after deploying incremental summarization so the first scheduled run
+summarizes every entity and records its summary watermark.
+Usage: GOOGLE_CLOUD_PROJECT=your-project-id python mark_summaries_stale.py
+"""
+
+import os
+import sys
+from google.cloud import firestore
+
+
+# Firestore allows at most 500 writes per batch commit
+BATCH_SIZE = 500
+
+
+def mark_summaries_stale():
+    """Set summaryStale on all entities"""
+    
+    project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
+    if not project_id:
+        print("Error: GOOGLE_CLOUD_PROJECT environment variable is required")
+        print("Usage: GOOGLE_CLOUD_PROJECT=your-project-id python mark_summaries_stale.py")
+        sys.exit(1)
+    
+    db = firestore.Client(project=project_id)
+    
+    print(f"Connecting to Firestore project: {project_id}")
+    
+    batch = db.batch()
+    pending = 0
+    count = 0
+    
+    for doc in db.collection('entities').select([]).stream():
+        batch.update(doc.reference, {'summaryStale': True})
+        pending += 1
+        count += 1
+        
+        if pending == BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+            print(f"Marked {count} entities...")
+    
+    if pending:
+        batch.commit()
+    
+    print(f"\n✅ Marked {count} entities for summary regeneration")
+
+
+if __name__ == "__main__":
+    mark_summaries_stale()
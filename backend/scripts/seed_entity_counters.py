@@ -0,0 +1,71 @@
+"""
+Seed per-type entity ID counters from the existing entity IDs
+Run once after deploying counter-based ID allocation, and again after seeding
+entities with explicit IDs via the other seed scripts.
+Usage: GOOGLE_CLOUD_PROJECT=your-project-id python seed_entity_counters.py
+"""
+
+import os
+import sys
+from google.cloud import firestore
+
+
+# Must match ENTITY_ID_PREFIXES in functions/utils/entity_ids.py
+PREFIX_MAP = {
+    'CANTEEN': 'C',
+    'DORM': 'D',
+    'CLASSROOM': 'CR',
+    'PROFESSOR': 'P',
+    'TOILET': 'T'
+}
+
+
+def seed_entity_counters():
+    """Scan all entities once and write the highest index per type to entityCounters"""
+
+    project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
+    if not project_id:
+        print("Error: GOOGLE_CLOUD_PROJECT environment variable is required")
+        print("Usage: GOOGLE_CLOUD_PROJECT=your-project-id python seed_entity_counters.py")
+        sys.exit(1)
+
+    db = firestore.Client(project=project_id)
+
+    print(f"Connecting to Firestore project: {project_id}")
+    print("Scanning entity IDs...")
+
+    max_index = {entity_type: 0 for entity_type in PREFIX_MAP}
+
+    for doc in db.collection('entities').select(['type']).stream():
+        entity_type = (doc.to_dict() or {}).get('type')
+        prefix = PREFIX_MAP.get(entity_type)
+        if not prefix or not doc.id.startswith(prefix):
+            continue
+        try:
+            index = int(doc.id[len(prefix):])
+        except ValueError:
+            continue
+        max_index[entity_type] = max(max_index[entity_type], index)
+
+    counters_ref = db.collection('entityCounters')
+
+    for entity_type, index in max_index.items():
+        counter_ref = counters_ref.document(entity_type)
+
+        @firestore.transactional
+        def update_counter(transaction):
+            # Never move a counter backwards, IDs may have been allocated since the scan
+            counter_doc = counter_ref.get(transaction=transaction)
+            current = counter_doc.get('lastIndex') if counter_doc.exists else 0
+            last_index = max(current or 0, index)
+            transaction.set(counter_ref, {'type': entity_type, 'lastIndex': last_index})
+            return last_index
+
+        last_index = update_counter(db.transaction())
+        print(f"Counter {entity_type}: lastIndex={last_index}")
+
+    print("\n✅ Successfully seeded entity counters")
+
+
+if __name__ == "__main__":
+    seed_entity_counters()